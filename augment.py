@@ -0,0 +1,64 @@
+"""
+Data augmentation por batches para entradas tipo imagen (digits: vectores de 64 = 8x8) (requiere PyTorch).
+
+`BatchAugmenter` transforma el batch completo con operaciones de tensor, sin bucles por muestra:
+una matriz afín por muestra (rotación aleatoria en ±`max_rotation` grados y desplazamiento en
+±`max_shift` píxeles) aplicada a todo el batch con `affine_grid` + `grid_sample`, y ruido
+gaussiano opcional. Usa el RNG global de torch, así que la semilla y los checkpoints (que
+guardan el estado del RNG) lo hacen reproducible.
+"""
+
+import math
+
+import torch
+import torch.nn.functional as F
+
+
+class BatchAugmenter:
+    """Aumenta batches (B, H*W) o (B, H, W) de imágenes.
+
+    max_shift: desplazamiento máximo en píxeles (uniforme, no entero).
+    max_rotation: rotación máxima en grados.
+    noise_std: desviación típica del ruido gaussiano añadido.
+    value_range: (mín, máx) al que se recorta el resultado con ruido (p. ej. (0, 1) para digits/16);
+        None recorta al mínimo y máximo del propio batch, para features con otra escala.
+    """
+
+    def __init__(self, image_shape=(8, 8), max_shift=1.0, max_rotation=10.0, noise_std=0.0, value_range=None):
+        self.image_shape = tuple(image_shape)
+        self.max_shift = float(max_shift)
+        self.max_rotation = float(max_rotation)
+        self.noise_std = float(noise_std)
+        self.value_range = tuple(value_range) if value_range is not None else None
+
+    @classmethod
+    def for_input_dim(cls, input_dim, **kwargs):
+        side = int(round(math.sqrt(input_dim)))
+        if side * side != input_dim:
+            raise ValueError(f"La augmentation necesita imágenes cuadradas; input_dim={input_dim} no lo es")
+        return cls(image_shape=(side, side), **kwargs)
+
+    @property
+    def enabled(self):
+        return self.max_shift > 0 or self.max_rotation > 0 or self.noise_std > 0
+
+    def __call__(self, x):
+        shape = x.shape
+        h, w = self.image_shape
+        imgs = x.reshape(-1, 1, h, w)
+        n = imgs.size(0)
+        if self.max_shift > 0 or self.max_rotation > 0:
+            angle = (torch.rand(n, device=x.device) * 2 - 1) * math.radians(self.max_rotation)
+            # affine_grid trabaja en coordenadas normalizadas [-1, 1]: un píxel son 2/size
+            shift = (torch.rand(n, 2, device=x.device) * 2 - 1) * self.max_shift
+            cos, sin = torch.cos(angle), torch.sin(angle)
+            theta = torch.stack([
+                torch.stack([cos, -sin, shift[:, 0] * 2 / w], dim=1),
+                torch.stack([sin, cos, shift[:, 1] * 2 / h], dim=1),
+            ], dim=1).to(imgs.dtype)
+            grid = F.affine_grid(theta, list(imgs.shape), align_corners=False)
+            imgs = F.grid_sample(imgs, grid, mode="bilinear", padding_mode="zeros", align_corners=False)
+        if self.noise_std > 0:
+            lo, hi = self.value_range if self.value_range is not None else (x.min().item(), x.max().item())
+            imgs = (imgs + torch.randn_like(imgs) * self.noise_std).clamp_(lo, hi)
+        return imgs.reshape(shape)
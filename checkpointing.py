@@ -0,0 +1,184 @@
+"""
+Utilidades de checkpointing para `train_torch` (requiere PyTorch).
+
+`AsyncCheckpointWriter` copia los state_dicts a memoria de CPU en el hilo de entrenamiento
+(rápido) y los serializa con `torch.save` en un hilo de fondo, de modo que la epoch no
+espera al disco. La cola está acotada: si el disco no da abasto, `save` bloquea en lugar de
+acumular snapshots sin límite. Cada fichero se escribe en `<ruta>.tmp` y se renombra de
+forma atómica, así que nunca queda un checkpoint a medio escribir con el nombre final.
+Los borrados y enlaces (`remove`, `link`) pasan por la misma cola y se aplican en orden.
+
+`CheckpointRetention` decide qué checkpoints periódicos conservar (los K últimos y los
+N mejores según la métrica monitorizada).
+"""
+
+import atexit
+import glob
+import os
+import queue
+import random
+import shutil
+import threading
+
+import numpy as np
+import torch
+
+
+def snapshot_to_cpu(obj):
+    """Copia profunda de un state_dict (o estructura anidada) con todos los tensores en CPU."""
+    if torch.is_tensor(obj):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return type(obj)((k, snapshot_to_cpu(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot_to_cpu(v) for v in obj)
+    return obj
+
+
+def capture_rng_state():
+    """Estado de los RNG de python, numpy y torch en un formato que `torch.load` (weights_only) acepta."""
+    np_state = np.random.get_state()
+    return {
+        "python": random.getstate(),
+        "numpy": (np_state[0], torch.from_numpy(np_state[1].copy()), int(np_state[2]), int(np_state[3]), float(np_state[4])),
+        "torch": torch.get_rng_state(),
+    }
+
+
+def restore_rng_state(state):
+    random.setstate(state["python"])
+    np_state = state["numpy"]
+    np.random.set_state((np_state[0], np_state[1].numpy(), *np_state[2:]))
+    torch.set_rng_state(state["torch"])
+
+
+def atomic_save(obj, path):
+    """`torch.save` a un fichero temporal y `os.replace` al nombre final."""
+    tmp_path = path + ".tmp"
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def atomic_link(src, dst):
+    """Hace que `dst` apunte al mismo contenido que `src` (hard link; copia si el sistema no lo permite)."""
+    tmp_path = dst + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def _remove_if_exists(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class AsyncCheckpointWriter:
+    """Escritor de checkpoints en segundo plano.
+
+    max_pending: snapshots en cola como máximo (0 = guardado síncrono en el hilo que llama).
+    Los errores de escritura se relanzan en la siguiente llamada a `save`, `flush` o `close`.
+    """
+
+    def __init__(self, max_pending=2):
+        self.max_pending = max_pending
+        self._error = None
+        self._thread = None
+        if max_pending > 0:
+            self._queue = queue.Queue(maxsize=max_pending)
+            self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+            self._thread.start()
+            # si el proceso termina sin close() (p. ej. por una excepción), vaciar la cola antes de salir
+            atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                fn, args = item
+                fn(*args)
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_pending(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Error escribiendo checkpoint: {error}") from error
+
+    def save(self, obj, path):
+        """Encola `obj` para guardarlo en `path`. El snapshot se toma ahora, así que el modelo puede seguir entrenando."""
+        self._submit(atomic_save, snapshot_to_cpu(obj), path)
+
+    def link(self, src, dst):
+        """Encola `dst` como enlace al checkpoint `src` (evita escribir dos veces el mismo estado)."""
+        self._submit(atomic_link, src, dst)
+
+    def remove(self, path):
+        """Encola el borrado de `path` (tras las escrituras ya encoladas)."""
+        self._submit(_remove_if_exists, path)
+
+    def _submit(self, fn, *args):
+        self._raise_pending()
+        if self._thread is None:
+            fn(*args)
+        else:
+            self._queue.put((fn, args))
+
+    def flush(self):
+        """Espera a que se escriban todos los checkpoints encolados."""
+        if self._thread is not None:
+            self._queue.join()
+        self._raise_pending()
+
+    def close(self):
+        """Vacía la cola y detiene el hilo de escritura. Se puede llamar varias veces."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            atexit.unregister(self.close)
+        self._raise_pending()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CheckpointRetention:
+    """Política de retención de checkpoints periódicos (`checkpoint_*.pt`).
+
+    keep_last: conservar los K checkpoints más recientes (el último siempre se conserva).
+    keep_best: conservar además los N mejores según la métrica (mode "max" o "min").
+    Con keep_last == keep_best == 0 no se borra nada (comportamiento original).
+    Los checkpoints que ya existían en el directorio cuentan como los más antiguos y sin métrica.
+    """
+
+    def __init__(self, save_dir, keep_last=0, keep_best=0, mode="max"):
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.mode = mode
+        existing = sorted(glob.glob(os.path.join(save_dir, "checkpoint_*.pt")), key=os.path.getmtime)
+        self.entries = [(p, None) for p in existing]
+
+    def add(self, path, metric=None):
+        """Registra un checkpoint nuevo y devuelve la lista de rutas que ya no hay que conservar."""
+        self.entries = [e for e in self.entries if e[0] != path] + [(path, metric)]
+        if self.keep_last <= 0 and self.keep_best <= 0:
+            return []
+        keep = {p for p, _ in self.entries[-max(self.keep_last, 1):]}
+        scored = [e for e in self.entries if e[1] is not None]
+        scored.sort(key=lambda e: e[1], reverse=(self.mode == "max"))
+        keep.update(p for p, _ in scored[:self.keep_best])
+        drop = [p for p, _ in self.entries if p not in keep]
+        self.entries = [e for e in self.entries if e[0] in keep]
+        return drop
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Destilación de `Net` a modelos más pequeños para servir (requiere PyTorch).
+
+Carga el teacher desde un checkpoint de `train.py` y entrena con `train_torch(teacher=...)` un
+estudiante por cada combinación de anchura (`--widths`) y profundidad (`--depths`), usando las
+soft targets del teacher a temperatura `--temperature` mezcladas con las etiquetas (`--alpha` es
+el peso de la parte de destilación). Al final mide para el teacher y cada estudiante la accuracy
+en test, los parámetros y la latencia en CPU (batch 1 y `--latency-batch`), imprime la tabla y
+la guarda en `distill_results.csv`. Con `--max-latency-us` y `--max-acc-drop` indica el modelo
+más pequeño que cumple ambos límites.
+
+Uso:
+    python train.py distill --teacher checkpoints/best_model.pt --widths 16,32,64 --depths 1,2 --epochs 20
+    python train.py distill --teacher checkpoints/best_model.pt --max-latency-us 15 --max-acc-drop 0.01
+"""
+
+import argparse
+import csv
+import itertools
+import os
+
+import torch
+
+from model_export import load_checkpoint_net
+from quantize import accuracy, latency_us
+
+
+def count_params(model):
+    return sum(p.numel() for p in model.parameters())
+
+
+def distill_students(teacher, data, widths, depths, out_dir, epochs=20, batch_size=64, lr=1e-3, patience=5, temperature=4.0,
+                     alpha=0.5, seed=0):
+    """Entrena un estudiante por cada (anchura, profundidad) en `out_dir/student_w{W}_d{D}`;
+    devuelve [(nombre, config, modelo)] con el mejor checkpoint (según validación) de cada uno."""
+    import train
+
+    students = []
+    for width, depth in itertools.product(widths, depths):
+        name = f"student_w{width}_d{depth}"
+        save_dir = os.path.join(out_dir, name)
+        print(f"[distill] {name}")
+        torch.manual_seed(seed)
+        train.train_torch(*data, epochs=epochs, batch_size=batch_size, lr=lr, hidden=width, depth=depth, patience=patience,
+                          save_dir=save_dir, seed=seed, teacher=teacher, distill_temperature=temperature, distill_alpha=alpha)
+        student, config = load_checkpoint_net(os.path.join(save_dir, "best_model.pt"))
+        students.append((name, config, student.eval()))
+    return students
+
+
+def evaluate_candidates(candidates, X_test, y_test, latency_batch=256):
+    """Fila de resultados (accuracy, parámetros, latencias) por cada (nombre, config, modelo)."""
+    rows = []
+    for name, config, model in candidates:
+        model.eval()
+        rows.append({
+            "model": name,
+            "hidden": config["hidden"],
+            "depth": config.get("depth", 1),
+            "params": count_params(model),
+            "test_acc": round(accuracy(model, X_test, y_test), 4),
+            "latency_b1_us": round(latency_us(model, X_test[:1], repeats=500), 1),
+            f"latency_b{latency_batch}_us": round(latency_us(model, X_test[:latency_batch], repeats=100), 1),
+        })
+    return rows
+
+
+def choose_model(rows, max_latency_us=None, max_acc_drop=None):
+    """El candidato con menos parámetros que cumple los límites de latencia (batch 1) y de pérdida de accuracy
+    respecto al teacher (primera fila). None si ninguno los cumple."""
+    teacher_acc = rows[0]["test_acc"]
+    ok = [r for r in rows
+          if (max_latency_us is None or r["latency_b1_us"] <= max_latency_us)
+          and (max_acc_drop is None or teacher_acc - r["test_acc"] <= max_acc_drop)]
+    return min(ok, key=lambda r: r["params"]) if ok else None
+
+
+def print_table(rows):
+    cols = list(rows[0].keys())
+    print(" | ".join(f"{c:>16}" for c in cols))
+    for r in rows:
+        print(" | ".join(f"{r[c]!s:>16}" for c in cols))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="train.py distill", description="Destilación del teacher a estudiantes más pequeños")
+    p.add_argument("--teacher", type=str, default="checkpoints/best_model.pt", help="Checkpoint del teacher")
+    p.add_argument("--widths", type=str, default="16,32,64", help="Neuronas por capa oculta de los estudiantes")
+    p.add_argument("--depths", type=str, default="1", help="Número de capas ocultas de los estudiantes")
+    p.add_argument("--temperature", type=float, default=4.0)
+    p.add_argument("--alpha", type=float, default=0.5, help="Peso de la loss de destilación frente a la de etiquetas")
+    p.add_argument("--epochs", type=int, default=20)
+    p.add_argument("--batch-size", type=int, default=64)
+    p.add_argument("--lr", type=float, default=1e-3)
+    p.add_argument("--patience", type=int, default=5)
+    p.add_argument("--val-size", type=float, default=0.1)
+    p.add_argument("--latency-batch", type=int, default=256)
+    p.add_argument("--threads", type=int, default=1, help="Hilos de torch al medir la latencia")
+    p.add_argument("--max-latency-us", type=float, default=None, help="Latencia máxima (batch 1) del modelo elegido")
+    p.add_argument("--max-acc-drop", type=float, default=None, help="Pérdida máxima de accuracy respecto al teacher")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", type=str, default="distill", help="Directorio de estudiantes y resultados")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    import train
+
+    data = train.load_data(test_size=0.2, val_size=args.val_size)
+    teacher, teacher_config = load_checkpoint_net(args.teacher)
+    students = distill_students(teacher, data, [int(w) for w in args.widths.split(",")], [int(d) for d in args.depths.split(",")],
+                               args.out, epochs=args.epochs, batch_size=args.batch_size, lr=args.lr, patience=args.patience,
+                               temperature=args.temperature, alpha=args.alpha, seed=args.seed)
+
+    torch.set_num_threads(args.threads)
+    X_test, y_test = data[2], data[5]
+    rows = evaluate_candidates([("teacher", teacher_config, teacher)] + students, X_test, y_test, latency_batch=args.latency_batch)
+    print_table(rows)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, "distill_results.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Resultados guardados en: {path}")
+
+    if args.max_latency_us is not None or args.max_acc_drop is not None:
+        best = choose_model(rows, args.max_latency_us, args.max_acc_drop)
+        if best is None:
+            print("Ningún modelo cumple los límites indicados.")
+        else:
+            print(f"Modelo más pequeño que cumple los límites: {best['model']} ({best['params']} parámetros, "
+                  f"acc {best['test_acc']}, {best['latency_b1_us']} us)")
+            if best["model"] != "teacher":
+                print(f"Checkpoint: {os.path.join(args.out, best['model'], 'best_model.pt')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,540 @@
+"""
+Inferencia por bloques para `predict.py`: lectura de la entrada, carga del modelo y escritura de
+predicciones sin cargar el fichero completo en memoria.
+
+Entradas (`open_input`), una fila por muestra con las features ya preprocesadas como en
+entrenamiento (o escaladas con `scale`, como `train.py --data-scale`):
+- `.npy`: memory-mapped; solo se leen las filas de cada bloque;
+- `.csv`: features numéricas separadas por comas (la cabecera, si existe, se detecta y se salta);
+- `.jsonl`: una lista de features por línea, o un objeto con la lista en `json_key`.
+
+Salidas (`open_output`): `.csv` (`row,pred,p0..pN`), `.jsonl` (`{"row", "pred", "proba"}`) o
+`.npy` (predicciones en el fichero y probabilidades en `<nombre>_proba.npy`). `open_output` necesita
+conocer el número de filas para la salida `.npy`, así que en un solo proceso solo admite entradas `.npy`;
+con entradas `.csv`/`.jsonl` hay que usar `run_sharded_inference` (`predict.py --workers`), que la
+construye a partir de partes binarias.
+
+Modelos (`load_predictor`): checkpoints de PyTorch, TorchScript (`.ts`, también int8), sklearn
+(`.joblib` con `scaler.joblib` al lado, o `.pkl`) y `.npz`/`.mlm` del motor NumPy (numpy_engine.py, sin
+torch ni sklearn). Todos exponen `predict_proba(X)` y `classes`.
+"""
+
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+INPUT_FORMATS = (".npy", ".csv", ".jsonl")
+OUTPUT_FORMATS = (".csv", ".jsonl", ".npy")
+
+
+def _ext(path):
+    ext = os.path.splitext(path)[1].lower()
+    return ".jsonl" if ext == ".ndjson" else ext
+
+
+# --- entradas ---
+# Todas las entradas aceptan un rango (filas para .npy, bytes alineados a líneas para .csv/.jsonl) y
+# `row_offset`, el número global de la primera fila, para que varios procesos lean partes del mismo fichero.
+
+class NpyInput:
+    """Matriz `.npy` (n_rows, n_features) leída por bloques desde un memmap (copy-on-write, como split_cache)."""
+
+    def __init__(self, path, scale=None, start=0, stop=None):
+        self.path = path
+        self.scale = scale
+        self._data = np.load(path, mmap_mode="c")
+        if self._data.ndim != 2:
+            raise ValueError(f"{path}: se esperaba una matriz 2D (filas, features) y tiene forma {self._data.shape}")
+        self.start = start
+        self.stop = self._data.shape[0] if stop is None else min(stop, self._data.shape[0])
+        self.n_rows = self.stop - self.start
+
+    def count_rows(self):
+        return self.n_rows
+
+    def iter_chunks(self, chunk_size):
+        for start in range(self.start, self.stop, chunk_size):
+            X = np.asarray(self._data[start:min(start + chunk_size, self.stop)], dtype=np.float32)
+            yield start, (X * self.scale if self.scale is not None else X)
+
+
+class _TextInput:
+    """Base de las entradas de texto: una fila por línea no vacía, leídas en binario dentro de `byte_range`."""
+
+    n_rows = None
+
+    def __init__(self, path, scale=None, byte_range=None, row_offset=0):
+        self.path = path
+        self.scale = scale
+        self.byte_range = byte_range or (0, os.path.getsize(path))
+        self.row_offset = row_offset
+
+    def _skip_first(self, line):
+        return False
+
+    def _lines(self):
+        start, end = self.byte_range
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            pos = start
+            for i, line in enumerate(f):
+                if pos >= end:
+                    return
+                pos += len(line)
+                if line.strip() and not (i == 0 and start == 0 and self._skip_first(line)):
+                    yield line
+
+    def count_rows(self):
+        return sum(1 for _ in self._lines())
+
+    def _parse(self, block):
+        raise NotImplementedError
+
+    def iter_chunks(self, chunk_size):
+        lines = self._lines()
+        start = self.row_offset
+        while True:
+            block = list(itertools.islice(lines, chunk_size))
+            if not block:
+                return
+            X = self._parse(block)
+            yield start, (X * self.scale if self.scale is not None else X)
+            start += len(block)
+
+
+class CsvInput(_TextInput):
+    """CSV numérico leído por bloques de líneas con `np.loadtxt`; la cabecera (si existe) se salta."""
+
+    def __init__(self, path, scale=None, byte_range=None, row_offset=0, delimiter=","):
+        super().__init__(path, scale=scale, byte_range=byte_range, row_offset=row_offset)
+        self.delimiter = delimiter
+
+    def _skip_first(self, line):
+        try:
+            [float(v) for v in line.split(self.delimiter.encode())]
+            return False
+        except ValueError:
+            return True
+
+    def _parse(self, block):
+        return np.loadtxt([line.decode() for line in block], delimiter=self.delimiter, dtype=np.float32, ndmin=2)
+
+
+class JsonlInput(_TextInput):
+    """JSONL con una fila por línea: `[f0, f1, ...]` o `{json_key: [f0, f1, ...], ...}`."""
+
+    def __init__(self, path, scale=None, byte_range=None, row_offset=0, json_key="features"):
+        super().__init__(path, scale=scale, byte_range=byte_range, row_offset=row_offset)
+        self.json_key = json_key
+
+    def _parse(self, block):
+        rows = []
+        for line in block:
+            obj = json.loads(line)
+            rows.append(obj[self.json_key] if isinstance(obj, dict) else obj)
+        return np.asarray(rows, dtype=np.float32)
+
+
+def open_input(path, scale=None, json_key="features", part=None, row_offset=0):
+    """Entrada según la extensión. `part`: (inicio, fin) en filas (.npy) o en bytes (.csv/.jsonl), ver `split_input`."""
+    ext = _ext(path)
+    if ext == ".npy":
+        start, stop = part or (0, None)
+        return NpyInput(path, scale=scale, start=start, stop=stop)
+    if ext == ".csv":
+        return CsvInput(path, scale=scale, byte_range=part, row_offset=row_offset)
+    if ext == ".jsonl":
+        return JsonlInput(path, scale=scale, byte_range=part, row_offset=row_offset, json_key=json_key)
+    raise ValueError(f"Formato de entrada no soportado: {path} (opciones: {', '.join(INPUT_FORMATS)})")
+
+
+def split_input(path, n_parts):
+    """Divide la entrada en `n_parts` rangos contiguos: de filas para .npy y de bytes (cortados en fin de línea) para texto."""
+    if _ext(path) == ".npy":
+        n_rows = np.load(path, mmap_mode="r").shape[0]
+        bounds = [n_rows * i // n_parts for i in range(n_parts + 1)]
+    else:
+        size = os.path.getsize(path)
+        bounds = [0]
+        with open(path, "rb") as f:
+            for i in range(1, n_parts):
+                f.seek(max(size * i // n_parts, bounds[-1]))
+                if f.tell() > 0:
+                    f.readline()  # avanzar hasta el inicio de la siguiente línea
+                bounds.append(min(f.tell(), size))
+        bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+# --- salidas ---
+
+def csv_header(num_classes, with_proba=True):
+    return ",".join(["row", "pred"] + ([f"p{i}" for i in range(num_classes)] if with_proba else [])) + "\n"
+
+
+class CsvOutput:
+    """`header=False` y `row_numbers=False` para las partes que luego se concatenan tras una cabecera común y se
+    numeran al unirlas (ver `run_sharded_inference`)."""
+
+    def __init__(self, path, with_proba=True, header=True, row_numbers=True):
+        self.path = path
+        self.with_proba = with_proba
+        self.row_numbers = row_numbers
+        self._f = open(path, "w")
+        self._wrote_header = not header
+
+    def write(self, start, preds, proba):
+        if not self._wrote_header:
+            self._f.write(csv_header(proba.shape[1], self.with_proba))
+            self._wrote_header = True
+        cols = ([np.arange(start, start + len(preds))] if self.row_numbers else []) + [preds] + ([proba] if self.with_proba else [])
+        fmt = ["%d"] * (2 if self.row_numbers else 1) + (["%.6g"] * proba.shape[1] if self.with_proba else [])
+        np.savetxt(self._f, np.column_stack(cols), fmt=fmt, delimiter=",")
+
+    def close(self):
+        self._f.close()
+
+
+class JsonlOutput:
+    def __init__(self, path, with_proba=True, row_numbers=True):
+        self.path = path
+        self.with_proba = with_proba
+        self.row_numbers = row_numbers
+        self._f = open(path, "w")
+
+    def write(self, start, preds, proba):
+        probas = np.round(proba, 6).tolist() if self.with_proba else None
+        lines = []
+        for i, pred in enumerate(preds.tolist()):
+            record = {"row": start + i, "pred": pred} if self.row_numbers else {"pred": pred}
+            if probas is not None:
+                record["proba"] = probas[i]
+            lines.append(json.dumps(record))
+        self._f.write("\n".join(lines) + "\n")
+
+    def close(self):
+        self._f.close()
+
+
+class NpyOutput:
+    """Predicciones en `path` y probabilidades en `<path sin .npy>_proba.npy`, escritas sobre memmaps.
+
+    Con `attach=True` abre unos ficheros ya creados (mode r+) para que varios procesos escriban cada uno sus filas.
+    """
+
+    def __init__(self, path, n_rows=None, with_proba=True, num_classes=None, attach=False):
+        self.path = path
+        self.proba_path = os.path.splitext(path)[0] + "_proba.npy"
+        self.with_proba = with_proba
+        self._proba = None
+        if attach:
+            self._preds = np.load(path, mmap_mode="r+")
+            self._proba = np.load(self.proba_path, mmap_mode="r+") if with_proba else None
+            self.n_rows = len(self._preds)
+            return
+        if n_rows is None:
+            raise ValueError("La salida .npy necesita conocer el número de filas (usa una entrada .npy, --workers o salida .csv/.jsonl)")
+        self.n_rows = n_rows
+        self._preds = np.lib.format.open_memmap(path, mode="w+", dtype=np.int64, shape=(n_rows,))
+        if with_proba and num_classes is not None:
+            self._proba = np.lib.format.open_memmap(self.proba_path, mode="w+", dtype=np.float32, shape=(n_rows, num_classes))
+
+    def write(self, start, preds, proba):
+        self._preds[start:start + len(preds)] = preds
+        if self.with_proba:
+            if self._proba is None:
+                self._proba = np.lib.format.open_memmap(self.proba_path, mode="w+", dtype=np.float32, shape=(self.n_rows, proba.shape[1]))
+            self._proba[start:start + len(preds)] = proba
+
+    def close(self):
+        for arr in (self._preds, self._proba):
+            if arr is not None:
+                arr.flush()
+        self._preds = self._proba = None
+
+
+def open_output(path, n_rows=None, with_proba=True, fmt=None, header=True, row_numbers=True):
+    """Salida según la extensión de `path` (o `fmt`, para las partes de `run_sharded_inference`)."""
+    ext = fmt or _ext(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if ext == ".csv":
+        return CsvOutput(path, with_proba=with_proba, header=header, row_numbers=row_numbers)
+    if ext == ".jsonl":
+        return JsonlOutput(path, with_proba=with_proba, row_numbers=row_numbers)
+    if ext == ".npy":
+        return NpyOutput(path, n_rows, with_proba=with_proba)
+    raise ValueError(f"Formato de salida no soportado: {path} (opciones: {', '.join(OUTPUT_FORMATS)})")
+
+
+# --- modelos ---
+
+class TorchPredictor:
+    """`num_classes` si se conoce al cargar; si no, las clases se fijan con el primer bloque."""
+
+    def __init__(self, model, name="PyTorch", num_classes=None):
+        import torch
+        self._torch = torch
+        self.model = model.eval()
+        self.name = name
+        self.classes = np.arange(num_classes) if num_classes else None
+
+    def predict_proba(self, X):
+        torch = self._torch
+        with torch.no_grad():
+            proba = torch.softmax(self.model(torch.from_numpy(np.ascontiguousarray(X, dtype=np.float32))), dim=1).numpy()
+        if self.classes is None:
+            self.classes = np.arange(proba.shape[1])
+        return proba
+
+
+class SklearnPredictor:
+    def __init__(self, model, scaler=None, name="sklearn"):
+        self.model = model
+        self.scaler = scaler
+        self.name = name
+        self.classes = model.classes_
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(self.scaler.transform(X) if self.scaler is not None else X)
+
+
+def resolve_backend(path, backend="auto"):
+    """Backend a partir de la extensión del modelo si `backend` es "auto"."""
+    if backend != "auto":
+        return backend
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".ts":
+        return "torchscript"
+    if ext in (".npz", ".mlm"):
+        return "numpy"
+    if ext in (".joblib", ".pkl"):
+        return "sklearn"
+    return "torch"
+
+
+def load_predictor(path, backend="auto"):
+    """Carga el modelo de `path` como predictor (`predict_proba`, `classes`, `name`)."""
+    backend = resolve_backend(path, backend)
+    if backend == "numpy":
+        from numpy_engine import NumpyMLP
+        return NumpyMLP(path)
+
+    if backend == "torchscript":
+        import torch
+        from model_export import load_torchscript
+
+        # modelo congelado: no hace falta la definición de Net
+        model, config = load_torchscript(path)
+        engine = config.get("quantized_engine")
+        if engine and engine in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = engine
+        return TorchPredictor(model, name="TorchScript" + (", int8" if engine else ""), num_classes=config.get("num_classes"))
+
+    if backend == "torch":
+        import torch
+        from train import Net, net_config_from_state
+
+        state = torch.load(path, map_location="cpu")
+        # soportar checkpoint con dict o state_dict plano; usar model_config si el checkpoint lo incluye
+        if isinstance(state, dict) and "model_state_dict" in state:
+            model = Net(**state.get("model_config", {}))
+            model.load_state_dict(state["model_state_dict"])
+        else:
+            # state_dict plano (model_final.pt): deducir las dimensiones de los pesos
+            model = Net(**net_config_from_state(state))
+            model.load_state_dict(state)
+        return TorchPredictor(model, num_classes=model.net[-1].out_features)
+
+    if path.endswith(".joblib"):
+        import joblib
+
+        # scaler en el mismo directorio, si existe
+        scaler_path = os.path.join(os.path.dirname(path), "scaler.joblib")
+        scaler = joblib.load(scaler_path) if os.path.exists(scaler_path) else None
+        return SklearnPredictor(joblib.load(path), scaler)
+
+    import pickle
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    model = data.get("model") if isinstance(data, dict) else data
+    scaler = data.get("scaler") if isinstance(data, dict) else None
+    return SklearnPredictor(model, scaler, name="sklearn pickle")
+
+
+def predict_chunk(predictor, X):
+    """(predicciones, probabilidades) de un bloque."""
+    proba = predictor.predict_proba(X)
+    return predictor.classes[proba.argmax(axis=1)], proba
+
+
+def run_inference(predictor, source, sink, chunk_size=65536, log=None):
+    """Recorre `source` por bloques de `chunk_size` filas y escribe cada bloque en `sink`. Devuelve (filas, segundos)."""
+    n_rows, t0 = 0, time.perf_counter()
+    for start, X in source.iter_chunks(chunk_size):
+        preds, proba = predict_chunk(predictor, X)
+        sink.write(start, preds, proba)
+        n_rows += len(preds)
+        if log is not None:
+            log(f"{n_rows} filas ({n_rows / (time.perf_counter() - t0):.0f} filas/s)")
+    return n_rows, time.perf_counter() - t0
+
+
+# --- inferencia en varios procesos ---
+# Cada proceso del pool carga el modelo una vez (initializer) y procesa rangos contiguos de la entrada; cada
+# rango se lee una sola vez.
+# - Entrada .npy: los rangos son de filas, así que la fila global de cada uno se conoce sin leer nada. Con
+#   salida .npy cada proceso escribe sus filas directamente en los memmaps compartidos; con .csv/.jsonl
+#   escribe un fichero parcial ya numerado y al final se concatenan en orden.
+# - Entrada .csv/.jsonl: los rangos son de bytes y no se sabe cuántas filas tiene cada uno hasta procesarlo.
+#   Cada proceso escribe un fichero parcial sin número de fila (.csv/.jsonl) o en binario (.npy) y
+#   devuelve cuántas filas escribió; al unir las partes se numeran las filas o se escribe la cabecera .npy.
+
+_worker = {}
+
+
+def _init_inference_worker(model_path, backend, threads):
+    from thread_tune import set_threads
+    _worker["predictor"] = load_predictor(model_path, backend)
+    set_threads(threads)
+
+
+def _num_classes(input_path, input_kwargs):
+    """Clases del modelo; solo si el predictor no las conoce al cargar (TorchScript sin config) se predice una fila."""
+    predictor = _worker["predictor"]
+    if predictor.classes is None:
+        _, X = next(open_input(input_path, **input_kwargs).iter_chunks(1))
+        predictor.predict_proba(X)
+    return len(predictor.classes)
+
+
+class _RawPartOutput:
+    """Parte de una salida .npy de entrada de texto: predicciones (int64) y probabilidades (float32) en bruto."""
+
+    def __init__(self, path, with_proba=True):
+        self.with_proba = with_proba
+        self.n_rows = 0
+        self.num_classes = None
+        self._preds = open(path + ".preds", "wb")
+        self._proba = open(path + ".proba", "wb") if with_proba else None
+
+    def write(self, start, preds, proba):
+        self._preds.write(np.asarray(preds, dtype=np.int64).tobytes())
+        if self._proba is not None:
+            self._proba.write(np.ascontiguousarray(proba, dtype=np.float32).tobytes())
+        self.n_rows += len(preds)
+        self.num_classes = proba.shape[1]
+
+    def close(self):
+        for f in (self._preds, self._proba):
+            if f is not None:
+                f.close()
+
+
+def _predict_part(input_path, part, row_offset, input_kwargs, output_path, fmt, with_proba, chunk_size, shared):
+    """Procesa un rango. `shared`: escribir en los memmaps .npy ya creados; si no, en un fichero parcial
+    (numerado solo si se conoce `row_offset`). Devuelve (filas, número de clases o None si el rango está vacío)."""
+    source = open_input(input_path, part=part, row_offset=row_offset or 0, **input_kwargs)
+    if shared:
+        sink = NpyOutput(output_path, with_proba=with_proba, attach=True)
+    elif fmt == ".npy":
+        sink = _RawPartOutput(output_path, with_proba=with_proba)
+    else:
+        sink = open_output(output_path, with_proba=with_proba, fmt=fmt, header=False, row_numbers=row_offset is not None)
+    num_classes = None
+    try:
+        n_rows = 0
+        for start, X in source.iter_chunks(chunk_size):
+            preds, proba = predict_chunk(_worker["predictor"], X)
+            sink.write(start, preds, proba)
+            n_rows += len(preds)
+            num_classes = proba.shape[1]
+    finally:
+        sink.close()
+    return n_rows, num_classes
+
+
+def _concat_text(out, part_paths, fmt, numbered):
+    """Copia las partes en orden; las que no están numeradas se numeran aquí (fila global = contador)."""
+    import shutil
+
+    row = 0
+    for path in part_paths:
+        with open(path, "rb") as f:
+            if numbered:
+                shutil.copyfileobj(f, out, 1 << 20)
+                continue
+            while True:
+                lines = f.readlines(1 << 20)
+                if not lines:
+                    break
+                rows = range(row, row + len(lines))
+                if fmt == ".csv":
+                    out.write(b"".join(b"%d,%s" % (r, line) for r, line in zip(rows, lines)))
+                else:
+                    # las líneas son `{"pred": ...}`: el campo row va primero, como en JsonlOutput
+                    out.write(b"".join(b'{"row": %d, %s' % (r, line[1:]) for r, line in zip(rows, lines)))
+                row += len(lines)
+        os.remove(path)
+
+
+def _concat_raw(output_path, part_paths, n_rows, num_classes, with_proba, block_rows=1 << 20):
+    """Une las partes binarias de `_RawPartOutput` en `output_path` (+ `_proba.npy`) por bloques."""
+    sink = NpyOutput(output_path, n_rows, with_proba=with_proba, num_classes=num_classes)
+    arrays = [(".preds", sink._preds, np.int64, ())] + ([(".proba", sink._proba, np.float32, (num_classes,))] if with_proba else [])
+    for suffix, dest, dtype, shape in arrays:
+        row = 0
+        for path in part_paths:
+            if os.path.getsize(path + suffix):
+                src = np.memmap(path + suffix, dtype=dtype, mode="r").reshape((-1,) + shape)
+                for i in range(0, len(src), block_rows):
+                    block = src[i:i + block_rows]
+                    dest[row:row + len(block)] = block
+                    row += len(block)
+                del src
+            os.remove(path + suffix)
+    sink.close()
+
+
+def run_sharded_inference(model_path, input_path, output_path, workers=2, backend="auto", chunk_size=65536, with_proba=True,
+                          scale=None, json_key="features", threads_per_worker=1, parts_per_worker=1):
+    """Inferencia de `input_path` en `workers` procesos; la salida queda en el mismo orden que la entrada. Devuelve (filas, segundos)."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    t0 = time.perf_counter()
+    fmt = _ext(output_path)
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato de salida no soportado: {output_path} (opciones: {', '.join(OUTPUT_FORMATS)})")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    input_kwargs = {"scale": scale, "json_key": json_key}
+    parts = split_input(input_path, workers * parts_per_worker)
+    # con .npy los rangos son de filas: la fila global de cada parte es su inicio
+    numbered = _ext(input_path) == ".npy"
+    offsets = [a for a, _ in parts] if numbered else [None] * len(parts)
+    shared = fmt == ".npy" and numbered
+    part_paths = [output_path] * len(parts) if shared else [f"{output_path}.part{i:04d}" for i in range(len(parts))]
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_inference_worker,
+                             initargs=(model_path, resolve_backend(model_path, backend), threads_per_worker)) as pool:
+        if shared:
+            n_rows = parts[-1][1] if parts else 0
+            num_classes = pool.submit(_num_classes, input_path, input_kwargs).result() if n_rows else 0
+            NpyOutput(output_path, n_rows, with_proba=with_proba, num_classes=num_classes).close()
+        futures = [pool.submit(_predict_part, input_path, part, offsets[i], input_kwargs, part_paths[i], fmt, with_proba, chunk_size, shared)
+                   for i, part in enumerate(parts)]
+        results = [fut.result() for fut in futures]
+    n_rows = sum(n for n, _ in results)
+    num_classes = next((k for _, k in results if k), None)
+
+    if fmt == ".npy":
+        if not shared:
+            _concat_raw(output_path, part_paths, n_rows, num_classes or 0, with_proba)
+    else:
+        with open(output_path, "wb") as out:
+            if fmt == ".csv" and num_classes is not None:
+                out.write(csv_header(num_classes, with_proba).encode())
+            _concat_text(out, part_paths, fmt, numbered)
+    return n_rows, time.perf_counter() - t0
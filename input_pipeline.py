@@ -0,0 +1,173 @@
+"""
+Pipeline de entrada para `train_torch` (requiere PyTorch).
+
+- Datos en memoria sin workers: `TensorBatches` baraja una vez por epoch con una sola copia
+  contigua (`index_select`) y entrega los batches como slices, sin `__getitem__` por muestra
+  ni `collate`.
+- Datos en memoria con workers: DataLoader sobre un sampler de batches; cada worker extrae el
+  batch completo con indexado vectorizado.
+- Datos out-of-core (`ShardSubset`): `ShardBatchDataset` reparte los shards entre workers.
+
+Todas las fuentes barajan con semilla `seed + epoch`, de modo que el orden de los datos
+depende solo de la semilla y de la epoch (llamar a `set_epoch` antes de cada epoch).
+En modo distribuido (`world_size > 1`) cada rank recibe una parte disjunta de la misma
+permutación (`perm[rank::world_size]`) o de la lista de shards.
+"""
+
+import torch
+from torch.utils.data import DataLoader, Dataset, IterableDataset, Sampler, get_worker_info
+
+from shards import ShardSubset
+
+
+def _default_seed():
+    # respeta torch.manual_seed (--seed) sin consumir el RNG global en cada epoch
+    return int(torch.randint(0, 2 ** 31 - 1, (1,)).item())
+
+
+def _epoch_permutation(n, seed, epoch, shuffle=True, rank=0, world_size=1):
+    """Índices de una epoch para este rank: permutación `seed + epoch` (o identidad) repartida entre ranks."""
+    if shuffle:
+        g = torch.Generator().manual_seed(seed + epoch)
+        perm = torch.randperm(n, generator=g)
+    else:
+        perm = torch.arange(n)
+    return perm[rank::world_size] if world_size > 1 else perm
+
+
+class TensorBatches:
+    """Iterador de batches sobre tensores en memoria (sustituye a DataLoader(..., shuffle=True))."""
+
+    def __init__(self, X, y, batch_size, shuffle=True, seed=None, pin_memory=False, rank=0, world_size=1):
+        self.X = X
+        self.y = y
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = _default_seed() if seed is None else seed
+        self.pin_memory = pin_memory
+        self.rank = rank
+        self.world_size = world_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        n = len(range(self.rank, len(self.X), self.world_size))
+        return (n + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        X, y = self.X, self.y
+        if self.shuffle or self.world_size > 1:
+            perm = _epoch_permutation(len(X), self.seed, self.epoch, self.shuffle, self.rank, self.world_size)
+            X, y = X.index_select(0, perm), y.index_select(0, perm)
+        if self.pin_memory:
+            X, y = X.pin_memory(), y.pin_memory()
+        for i in range(0, len(X), self.batch_size):
+            yield X[i:i + self.batch_size], y[i:i + self.batch_size]
+
+
+class _BatchFetchDataset(Dataset):
+    """Dataset map-style cuyo `__getitem__` recibe la lista de índices de un batch completo."""
+
+    def __init__(self, X, y):
+        self.X = X
+        self.y = y
+
+    def __len__(self):
+        return len(self.X)
+
+    def __getitem__(self, idx):
+        idx = torch.as_tensor(idx)
+        return self.X.index_select(0, idx), self.y.index_select(0, idx)
+
+
+class _EpochBatchSampler(Sampler):
+    """Sampler de batches (listas de índices) sobre la permutación `seed + epoch` de este rank."""
+
+    def __init__(self, n, batch_size, seed, rank=0, world_size=1):
+        self.n = n
+        self.batch_size = batch_size
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        n = len(range(self.rank, self.n, self.world_size))
+        return (n + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        perm = _epoch_permutation(self.n, self.seed, self.epoch, True, self.rank, self.world_size)
+        for i in range(0, len(perm), self.batch_size):
+            yield perm[i:i + self.batch_size].tolist()
+
+
+class ShardBatchDataset(IterableDataset):
+    """Expone un `ShardSubset` como IterableDataset de batches ya formados (usar con batch_size=None).
+    Con varios workers cada uno lee un subconjunto disjunto de shards.
+    """
+
+    def __init__(self, subset, batch_size, shuffle=True, seed=0, rank=0, world_size=1):
+        self.subset = subset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return len(self.subset)
+
+    def __iter__(self):
+        ids = self.subset.shard_ids()
+        if self.shuffle:
+            # mismo orden de shards en todos los workers antes de repartirlos
+            g = torch.Generator().manual_seed(self.seed + self.epoch)
+            ids = [ids[i] for i in torch.randperm(len(ids), generator=g).tolist()]
+        if self.world_size > 1:
+            ids = ids[self.rank::self.world_size]
+        info = get_worker_info()
+        if info is not None:
+            ids = ids[info.id::info.num_workers]
+        seed = self.seed + self.epoch
+        # los workers persistentes no ven set_epoch del proceso principal: avanzan su propia copia
+        self.epoch += 1
+        for Xb, yb in self.subset.iter_batches(self.batch_size, shuffle=self.shuffle, seed=seed, shard_ids=ids):
+            yield torch.from_numpy(Xb), torch.from_numpy(yb).long()
+
+
+def make_train_loader(X, y, batch_size, num_workers=0, prefetch_factor=2, persistent_workers=False, pin_memory=False, seed=None, rank=0, world_size=1):
+    """Construye el iterador de entrenamiento adecuado para `X` (array numpy o `ShardSubset`).
+    El objeto devuelto es iterable por epochs y expone `set_epoch` (directamente o en su dataset/sampler).
+    Con world_size > 1 todos los ranks deben usar la misma `seed`.
+    """
+    seed = _default_seed() if seed is None else seed
+    worker_kwargs = {}
+    if num_workers > 0:
+        worker_kwargs = dict(num_workers=num_workers, prefetch_factor=prefetch_factor, persistent_workers=persistent_workers)
+
+    if isinstance(X, ShardSubset):
+        ds = ShardBatchDataset(X, batch_size, shuffle=True, seed=seed, rank=rank, world_size=world_size)
+        return DataLoader(ds, batch_size=None, pin_memory=pin_memory, **worker_kwargs)
+
+    X_t = torch.from_numpy(X)
+    y_t = torch.from_numpy(y).long()
+    if num_workers == 0:
+        return TensorBatches(X_t, y_t, batch_size, shuffle=True, seed=seed, pin_memory=pin_memory, rank=rank, world_size=world_size)
+    sampler = _EpochBatchSampler(len(X_t), batch_size, seed, rank=rank, world_size=world_size)
+    return DataLoader(_BatchFetchDataset(X_t, y_t), batch_size=None, sampler=sampler, pin_memory=pin_memory, **worker_kwargs)
+
+
+def set_loader_epoch(loader, epoch):
+    """Propaga la epoch al iterador devuelto por `make_train_loader`."""
+    for obj in (loader, getattr(loader, "dataset", None), getattr(loader, "sampler", None)):
+        if obj is not None and hasattr(obj, "set_epoch"):
+            obj.set_epoch(epoch)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Validación cruzada k-fold estratificada en paralelo para `train.py` (ambos backends).
+
+Los datos de desarrollo (train + val de `load_data`) se reparten en `--folds` folds
+estratificados; cada fold entrena con los k-1 restantes y valida con el suyo, y el mejor modelo
+de cada fold se evalúa también en el split de test. Los folds se ejecutan en un pool de procesos
+con un presupuesto fijo de hilos cada uno (como `train.py sweep`).
+
+Los procesos no reciben copias de los datos: con digits se escriben una vez como shards `.npy`
+en `--out/data` y con `--data` se usan los shards originales; cada fold abre el mismo
+`ShardedDataset` (memory-mapped) y solo recibe los índices de sus filas, así que todos leen las
+mismas páginas del page cache. Al final se imprime la media y la desviación típica de cada
+métrica y se guardan las filas por fold en `kfold_results.csv`.
+
+Uso:
+    python train.py kfold --folds 5 --epochs 10 --workers 5
+    python train.py kfold --backend sklearn --folds 5 --data data/shards --data-scale 0.0625
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+from shards import ShardedDataset, split_indices
+from sweep import _init_worker
+
+METRICS = ["val_accuracy", "test_accuracy", "epochs", "seconds"]
+
+
+def write_dataset_shards(path, X, y, shard_rows=65536):
+    """Escribe (X, y) como pares `partNNNN_X.npy` / `partNNNN_y.npy` para abrirlos con `ShardedDataset`."""
+    os.makedirs(path, exist_ok=True)
+    for i, start in enumerate(range(0, len(y), shard_rows)):
+        np.save(os.path.join(path, f"part{i:04d}_X.npy"), np.ascontiguousarray(X[start:start + shard_rows]))
+        np.save(os.path.join(path, f"part{i:04d}_y.npy"), np.asarray(y[start:start + shard_rows]))
+    return path
+
+
+def make_folds(y, dev_idx, n_folds=5, seed=42):
+    """Lista de (train_idx, val_idx) globales, estratificados sobre las etiquetas de `dev_idx`."""
+    skf = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    return [(dev_idx[tr], dev_idx[va]) for tr, va in skf.split(np.zeros(len(dev_idx)), y[dev_idx])]
+
+
+def run_fold(fold, data_path, scale, train_idx, val_idx, test_idx, backend, params, save_dir):
+    """Entrena un fold leyendo sus filas del dataset memory-mapped y devuelve sus métricas."""
+    import train
+
+    ds = ShardedDataset(data_path, scale=scale)
+    X_train, X_val, X_test = ds.subset(train_idx), ds.subset(val_idx), ds.subset(test_idx)
+    history = []
+    t0 = time.perf_counter()
+    if backend == "torch":
+        import torch
+        torch.manual_seed(params["seed"] + fold)
+        train.train_torch(X_train, X_val, X_test, X_train.y, X_val.y, X_test.y, epochs=params["epochs"], batch_size=params["batch_size"],
+                          lr=params["lr"], hidden=params["hidden"], patience=params["patience"], save_dir=save_dir,
+                          seed=params["seed"] + fold, epoch_callback=lambda e, m: history.append(m["val_accuracy"]))
+        from model_export import load_checkpoint_net
+        net, _ = load_checkpoint_net(os.path.join(save_dir, "best_model.pt"))
+        test_acc = float((train.predict_torch(net, X_test, torch.device("cpu")) == X_test.y).mean())
+    else:
+        train.train_sklearn(X_train, X_val, X_test, X_train.y, X_val.y, X_test.y, epochs=params["epochs"], batch_size=params["batch_size"],
+                            lr=params["lr"], hidden=params["hidden"], patience=params["patience"], save_dir=save_dir, seed=params["seed"] + fold,
+                            epoch_callback=lambda e, m: history.append(m["val_accuracy"]))
+        import joblib
+        clf = joblib.load(os.path.join(save_dir, "sklearn_mlp.joblib"))
+        scaler = joblib.load(os.path.join(save_dir, "scaler.joblib"))
+        test_acc = train._score_sklearn_stream(clf, scaler, X_test)
+    return {
+        "fold": fold,
+        "val_accuracy": max(history) if history else float("nan"),
+        "test_accuracy": test_acc,
+        "epochs": len(history),
+        "seconds": round(time.perf_counter() - t0, 2),
+    }
+
+
+def summarize(rows):
+    """{métrica: (media, desviación típica)} sobre los folds."""
+    out = {}
+    for m in METRICS:
+        values = [float(r[m]) for r in rows]
+        out[m] = (statistics.mean(values), statistics.stdev(values) if len(values) > 1 else 0.0)
+    return out
+
+
+def run_kfold(data_path, dev_idx, test_idx, y, backend="torch", n_folds=5, workers=1, threads_per_fold=1, params=None,
+              out_dir="kfold", scale=None, seed=42, keep_models=False):
+    """Ejecuta los folds en paralelo y devuelve (filas por fold ordenadas, resumen)."""
+    params = dict({"epochs": 10, "batch_size": 64, "lr": 1e-3, "hidden": 128, "patience": 3, "seed": 0}, **(params or {}))
+    folds = make_folds(y, dev_idx, n_folds=n_folds, seed=seed)
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(threads_per_fold,)) as pool:
+        futures = [pool.submit(run_fold, i, data_path, scale, tr, va, test_idx, backend, params, os.path.join(out_dir, f"fold{i}"))
+                   for i, (tr, va) in enumerate(folds)]
+        for fut in as_completed(futures):
+            row = fut.result()
+            rows.append(row)
+            print(f"[kfold] fold {row['fold']}: val_acc={row['val_accuracy']:.4f} test_acc={row['test_accuracy']:.4f} "
+                  f"({row['epochs']} epochs, {row['seconds']}s)")
+    rows.sort(key=lambda r: r["fold"])
+    if not keep_models:
+        for i in range(n_folds):
+            shutil.rmtree(os.path.join(out_dir, f"fold{i}"), ignore_errors=True)
+    return rows, summarize(rows)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="train.py kfold", description="Validación cruzada k-fold estratificada en paralelo")
+    p.add_argument("--folds", type=int, default=5)
+    p.add_argument("--backend", choices=["torch", "sklearn"], default="torch")
+    p.add_argument("--epochs", type=int, default=10)
+    p.add_argument("--batch-size", type=int, default=64)
+    p.add_argument("--lr", type=float, default=1e-3)
+    p.add_argument("--hidden", type=int, default=128)
+    p.add_argument("--patience", type=int, default=3)
+    p.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto CPUs / threads-per-fold)")
+    p.add_argument("--threads-per-fold", type=int, default=1)
+    p.add_argument("--data", type=str, default=None, help="Shards .npy/.npz (ver train.py --data)")
+    p.add_argument("--data-scale", type=float, default=None)
+    p.add_argument("--seed", type=int, default=42, help="Semilla de los folds y del entrenamiento")
+    p.add_argument("--out", type=str, default="kfold", help="Directorio de resultados")
+    p.add_argument("--keep-models", action="store_true", help="Conservar los modelos de cada fold en --out/foldN")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.data:
+        data_path, scale = args.data, args.data_scale
+        y = ShardedDataset(data_path).y
+        dev_idx, _, test_idx = split_indices(y, test_size=0.2, val_size=0.0)
+    else:
+        # digits: escribir una vez train+val y test como shards para que los folds los lean por mmap
+        import train
+        X_train, X_val, X_test, y_train, y_val, y_test = train.load_data(test_size=0.2, val_size=0.1)
+        X_all = np.concatenate([X_train, X_val, X_test])
+        y = np.concatenate([y_train, y_val, y_test])
+        data_path, scale = write_dataset_shards(os.path.join(args.out, "data"), X_all, y), None
+        dev_idx = np.arange(len(y_train) + len(y_val))
+        test_idx = np.arange(len(dev_idx), len(y))
+
+    workers = args.workers or max(1, min(args.folds, (os.cpu_count() or 1) // args.threads_per_fold))
+    print(f"k-fold: {args.folds} folds ({args.backend}), {workers} procesos x {args.threads_per_fold} hilos")
+    params = {"epochs": args.epochs, "batch_size": args.batch_size, "lr": args.lr, "hidden": args.hidden,
+              "patience": args.patience, "seed": args.seed}
+    rows, summary = run_kfold(data_path, dev_idx, test_idx, y, backend=args.backend, n_folds=args.folds, workers=workers,
+                              threads_per_fold=args.threads_per_fold, params=params, out_dir=args.out, scale=scale,
+                              seed=args.seed, keep_models=args.keep_models)
+
+    for m, (mean, std) in summary.items():
+        print(f"{m:>14}: {mean:.4f} ± {std:.4f}")
+    path = os.path.join(args.out, "kfold_results.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["fold"] + METRICS)
+        writer.writeheader()
+        writer.writerows(rows)
+        for name, idx in (("mean", 0), ("std", 1)):
+            writer.writerow(dict({"fold": name}, **{m: round(summary[m][idx], 6) for m in METRICS}))
+    print(f"Resultados guardados en: {path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Range test del learning rate (Smith, "Cyclical Learning Rates") para `Net` (requiere PyTorch).
+
+Entrena desde cero subiendo el LR de forma exponencial de `--min-lr` a `--max-lr` en `--steps`
+steps y registra la loss suavizada (media exponencial) de cada step. Se detiene antes si la
+loss diverge (supera `--diverge` veces la mejor). Sugiere dos valores:
+- `steepest`: el LR donde la loss baja más deprisa (pendiente más negativa frente a log(LR));
+- `min/10`: una décima parte del LR con la menor loss, como pico para `--lr-schedule onecycle`.
+
+Guarda la curva en `lr_find.csv` (y en `lr_find.png` si matplotlib está instalado).
+
+Uso:
+    python train.py lr-find --batch-size 64 --steps 200
+    python train.py --lr <sugerido> --lr-schedule onecycle --epochs 5 --target-accuracy 0.95
+"""
+
+import argparse
+import csv
+import math
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from input_pipeline import make_train_loader, set_loader_epoch
+from schedules import set_lr
+
+
+def lr_range_test(net, loader, min_lr=1e-6, max_lr=1.0, steps=200, beta=0.98, diverge=4.0, device="cpu"):
+    """Devuelve (lrs, losses, smoothed) del range test. `loader` se recorre por epochs tantas veces como haga falta."""
+    net = net.to(device).train()
+    opt = optim.Adam(net.parameters(), lr=min_lr)
+    loss_fn = nn.CrossEntropyLoss()
+    factor = (max_lr / min_lr) ** (1.0 / max(1, steps - 1))
+    lrs, losses, smoothed = [], [], []
+    avg, best = 0.0, float("inf")
+    step, epoch = 0, 0
+    while step < steps:
+        epoch += 1
+        set_loader_epoch(loader, epoch)
+        for xb, yb in loader:
+            lr = min_lr * factor ** step
+            set_lr(opt, lr)
+            opt.zero_grad()
+            loss = loss_fn(net(xb.to(device)), yb.to(device))
+            loss.backward()
+            opt.step()
+
+            value = loss.item()
+            avg = beta * avg + (1 - beta) * value
+            smooth = avg / (1 - beta ** (step + 1))  # corrección del sesgo inicial de la media
+            lrs.append(lr)
+            losses.append(value)
+            smoothed.append(smooth)
+            step += 1
+            if not math.isfinite(smooth) or smooth > diverge * best:
+                return lrs, losses, smoothed
+            best = min(best, smooth)
+            if step >= steps:
+                break
+    return lrs, losses, smoothed
+
+
+def suggest_lr(lrs, smoothed, skip_start=10, skip_end=5):
+    """(steepest, min/10): LR de máxima pendiente negativa y una décima parte del LR de mínima loss."""
+    lrs, smoothed = np.asarray(lrs), np.asarray(smoothed)
+    end = max(skip_start + 2, len(lrs) - skip_end)
+    lr_win, loss_win = lrs[skip_start:end], smoothed[skip_start:end]
+    if len(lr_win) < 2:
+        lr_win, loss_win = lrs, smoothed
+    slopes = np.gradient(loss_win, np.log(lr_win))
+    steepest = float(lr_win[int(np.argmin(slopes))])
+    min_div10 = float(lrs[int(np.argmin(smoothed))] / 10.0)
+    return steepest, min_div10
+
+
+def save_curve(path, lrs, losses, smoothed):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["lr", "loss", "smoothed_loss"])
+        writer.writerows(zip(lrs, losses, smoothed))
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots()
+        ax.plot(lrs, smoothed)
+        ax.set_xscale("log")
+        ax.set_xlabel("learning rate")
+        ax.set_ylabel("loss (suavizada)")
+        fig.savefig(os.path.splitext(path)[0] + ".png")
+        plt.close(fig)
+    except Exception:
+        pass
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="train.py lr-find", description="Range test del learning rate")
+    p.add_argument("--min-lr", type=float, default=1e-6)
+    p.add_argument("--max-lr", type=float, default=1.0)
+    p.add_argument("--steps", type=int, default=200)
+    p.add_argument("--batch-size", type=int, default=64)
+    p.add_argument("--hidden", type=int, default=128)
+    p.add_argument("--depth", type=int, default=1)
+    p.add_argument("--diverge", type=float, default=4.0, help="Parar cuando la loss supere este múltiplo de la mejor")
+    p.add_argument("--val-size", type=float, default=0.1)
+    p.add_argument("--data", type=str, default=None, help="Shards .npy/.npz (ver train.py --data)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", type=str, default="lr_find.csv")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    import train
+
+    torch.manual_seed(args.seed)
+    X_train, X_val, X_test, y_train, y_val, y_test = train.load_data(test_size=0.2, val_size=args.val_size, data_path=args.data)
+    net = train.Net(input_dim=X_train.shape[1], hidden=args.hidden, num_classes=int(y_train.max()) + 1, depth=args.depth)
+    loader = make_train_loader(X_train, y_train, args.batch_size, seed=args.seed)
+    lrs, losses, smoothed = lr_range_test(net, loader, args.min_lr, args.max_lr, args.steps, diverge=args.diverge)
+    save_curve(args.out, lrs, losses, smoothed)
+    steepest, min_div10 = suggest_lr(lrs, smoothed)
+    print(f"Range test: {len(lrs)} steps, LR {lrs[0]:.2e} -> {lrs[-1]:.2e}")
+    print(f"LR sugerido: {steepest:.2e} (máxima pendiente), {min_div10:.2e} (mínimo/10, pico para --lr-schedule onecycle)")
+    print(f"Curva guardada en: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
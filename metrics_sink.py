@@ -0,0 +1,235 @@
+"""
+Registro de métricas en segundo plano para `train_torch` y `train_sklearn`.
+
+`MetricsSink` tiene la misma interfaz que un SummaryWriter (`add_scalar`, `add_histogram`),
+pero el hilo de entrenamiento solo copia el valor y lo encola; un hilo de fondo los agrupa y
+los escribe en uno o varios destinos:
+- `TensorBoardBackend`: un SummaryWriter (requiere `tensorboard`);
+- `JsonlBackend`: una línea JSON por registro (los histogramas como bins + counts);
+- `CsvBackend`: `wall_time,step,tag,value` (solo escalares).
+
+La cola está acotada y, a diferencia de `AsyncCheckpointWriter`, nunca bloquea: si el disco
+no da abasto, los registros nuevos se descartan y se cuentan en `dropped`. Los errores de
+escritura se avisan una vez y no detienen el entrenamiento.
+"""
+
+import atexit
+import csv
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+def _ensure_parent(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+
+class TensorBoardBackend:
+    """Escribe en un SummaryWriter. Si se pasa un `writer` ya creado, no se cierra al terminar."""
+
+    def __init__(self, log_dir=None, writer=None):
+        self._owns_writer = writer is None
+        if writer is None:
+            from torch.utils.tensorboard import SummaryWriter
+            writer = SummaryWriter(log_dir=log_dir)
+        self.writer = writer
+
+    def write(self, records):
+        for r in records:
+            if r["kind"] == "scalar":
+                self.writer.add_scalar(r["tag"], r["value"], r["step"], walltime=r["wall_time"])
+            else:
+                self.writer.add_histogram(r["tag"], r["values"], r["step"], walltime=r["wall_time"])
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        if self._owns_writer:
+            self.writer.close()
+        else:
+            self.writer.flush()
+
+
+class JsonlBackend:
+    def __init__(self, path, bins=30):
+        _ensure_parent(path)
+        self.bins = bins
+        self._f = open(path, "a")
+
+    def write(self, records):
+        for r in records:
+            out = {"wall_time": round(r["wall_time"], 6), "step": r["step"], "tag": r["tag"]}
+            if r["kind"] == "scalar":
+                out["value"] = r["value"]
+            else:
+                counts, edges = np.histogram(r["values"], bins=self.bins)
+                out["histogram"] = {"bins": edges.tolist(), "counts": counts.tolist()}
+            self._f.write(json.dumps(out) + "\n")
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+class CsvBackend:
+    FIELDS = ["wall_time", "step", "tag", "value"]
+
+    def __init__(self, path):
+        _ensure_parent(path)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, "a", newline="")
+        self._writer = csv.writer(self._f)
+        if new_file:
+            self._writer.writerow(self.FIELDS)
+
+    def write(self, records):
+        self._writer.writerows([round(r["wall_time"], 6), r["step"], r["tag"], r["value"]] for r in records if r["kind"] == "scalar")
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+def backend_for_path(path):
+    """Destino según la extensión: `.jsonl`/`.json` o `.csv`."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".json"):
+        return JsonlBackend(path)
+    if ext == ".csv":
+        return CsvBackend(path)
+    raise ValueError(f"Formato de métricas desconocido: {path} (usa .jsonl o .csv)")
+
+
+class MetricsSink:
+    """Buffer de métricas con escritura en un hilo de fondo.
+
+    backends: destinos (objetos con write(records), flush() y close()).
+    max_pending: registros en cola como máximo; los que lleguen con la cola llena se descartan.
+    flush_secs: cada cuánto se hace flush de los destinos aunque no lleguen registros nuevos.
+    """
+
+    def __init__(self, backends, max_pending=1024, flush_secs=5.0):
+        self.backends = list(backends)
+        self.flush_secs = flush_secs
+        self.dropped = 0
+        self._warned = False
+        self._closed = False
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._thread = threading.Thread(target=self._run, name="metrics-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _put(self, record):
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def add_scalar(self, tag, value, step=None, walltime=None):
+        self._put({"kind": "scalar", "tag": tag, "value": float(value), "step": step,
+                   "wall_time": walltime if walltime is not None else time.time()})
+
+    def add_histogram(self, tag, values, step=None, walltime=None):
+        # copiar ahora: el tensor/array puede cambiar (p. ej. los pesos en el siguiente step)
+        if hasattr(values, "detach"):
+            values = values.detach().cpu().numpy()
+        self._put({"kind": "histogram", "tag": tag, "values": np.array(values, dtype=np.float64).ravel(), "step": step,
+                   "wall_time": walltime if walltime is not None else time.time()})
+
+    def _write(self, records):
+        for backend in self.backends:
+            try:
+                backend.write(records)
+            except Exception as e:
+                self._warn(backend, e)
+
+    def _flush_backends(self):
+        for backend in self.backends:
+            try:
+                backend.flush()
+            except Exception as e:
+                self._warn(backend, e)
+
+    def _warn(self, backend, error):
+        if not self._warned:
+            self._warned = True
+            print(f"Aviso: error escribiendo métricas en {type(backend).__name__}: {error}")
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_secs)
+            except queue.Empty:
+                item = ()
+            # agrupar lo que haya en cola para escribirlo de una vez
+            batch, stop = [], item is None
+            if item:
+                batch.append(item)
+            while not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+            if stop or time.monotonic() - last_flush >= self.flush_secs:
+                self._flush_backends()
+                last_flush = time.monotonic()
+            if stop:
+                return
+
+    def flush(self, timeout=None):
+        """Espera (hasta `timeout` segundos) a que el hilo de fondo vacíe la cola."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks and self._thread.is_alive():
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            time.sleep(0.005)
+        self._flush_backends()
+
+    def close(self):
+        """Escribe lo pendiente, cierra los destinos e informa de los registros descartados."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)  # el hilo siempre consume, así que esta espera es breve
+        self._thread.join()
+        atexit.unregister(self.close)
+        for backend in self.backends:
+            try:
+                backend.close()
+            except Exception as e:
+                self._warn(backend, e)
+        if self.dropped:
+            print(f"Métricas: {self.dropped} registros descartados (cola llena)")
+
+
+def open_sink(tb_dir=None, paths=(), max_pending=1024):
+    """MetricsSink hacia TensorBoard (si `tb_dir`) y los ficheros `paths`; None si no hay ningún destino."""
+    backends = []
+    if tb_dir:
+        try:
+            backends.append(TensorBoardBackend(log_dir=tb_dir))
+            print(f"TensorBoard activo en: {tb_dir}")
+        except Exception:
+            print("TensorBoard no disponible (instala 'tensorboard' si quieres usar --tb)")
+    backends.extend(backend_for_path(p) for p in paths or ())
+    return MetricsSink(backends, max_pending=max_pending) if backends else None
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Formato de modelo en un único fichero (`.mlm`): cabecera de metadatos + pesos memory-mappables.
+
+Estructura:
+- 8 bytes mágicos (`MYMLART\\0`) y la longitud de la cabecera (uint64 little-endian);
+- la cabecera en JSON (UTF-8): `format_version`, `architecture` (tipo, tamaños de capa y
+  activaciones), `backend` (origen: torch o sklearn), `preprocessing` (scaler integrado o no,
+  escala de entrada), `dtype`, `classes` y `tensors` (nombre -> dtype, forma y offset);
+- los datos de cada tensor, en bruto (C-contiguo, little-endian) y alineados a 64 bytes.
+
+`open_artifact` solo lee la cabecera y devuelve los tensores como vistas de un `np.memmap` de solo
+lectura: las páginas se leen del disco la primera vez que se usan, y varios procesos que abren el
+mismo fichero (p. ej. `predict.py --workers`) comparten una única copia en la caché de páginas del
+sistema. `numpy_engine.export_artifact` crea el fichero y `NumpyMLP` lo carga.
+
+Uso (ver la cabecera de un modelo):
+    python model_artifact.py checkpoints/model.mlm
+"""
+
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"MYMLART\0"
+FORMAT_VERSION = 1
+ALIGN = 64
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_artifact(path, header, tensors):
+    """Escribe `header` (dict serializable) y `tensors` ({nombre: array}) en `path`. La escritura es atómica."""
+    arrays = {name: np.ascontiguousarray(a, dtype=np.asarray(a).dtype.newbyteorder("<")) for name, a in tensors.items()}
+    # los offsets dependen de la longitud de la cabecera y la cabecera contiene los offsets:
+    # se calculan relativos al inicio de los datos, que empiezan alineados tras la cabecera
+    layout, offset = {}, 0
+    for name, a in arrays.items():
+        layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset, "nbytes": int(a.nbytes)}
+        offset = _align(offset + a.nbytes)
+    header = dict(header, format_version=FORMAT_VERSION, tensors=layout)
+    blob = json.dumps(header).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(blob))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(blob)))
+        f.write(blob)
+        for name, a in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(a.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return header
+
+
+def _read_header(f, path):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{path}: no es un modelo .mlm")
+    (length,) = struct.unpack("<Q", f.read(8))
+    header = json.loads(f.read(length).decode("utf-8"))
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: versión de formato {header.get('format_version')} no soportada")
+    return header, _align(len(MAGIC) + 8 + length)
+
+
+def read_header(path):
+    """Solo la cabecera (no toca los pesos)."""
+    with open(path, "rb") as f:
+        return _read_header(f, path)[0]
+
+
+def open_artifact(path):
+    """(cabecera, {nombre: array de solo lectura}) con los tensores mapeados desde el fichero."""
+    with open(path, "rb") as f:
+        header, data_start = _read_header(f, path)
+    tensors = {}
+    if header["tensors"]:
+        buf = np.memmap(path, dtype=np.uint8, mode="r")
+        for name, t in header["tensors"].items():
+            start = data_start + t["offset"]
+            tensors[name] = buf[start:start + t["nbytes"]].view(np.dtype(t["dtype"])).reshape(t["shape"])
+    return header, tensors
+
+
+def main():
+    p = argparse.ArgumentParser(description="Muestra la cabecera de un modelo .mlm")
+    p.add_argument("path", type=str)
+    args = p.parse_args()
+    header = read_header(args.path)
+    tensors = header.pop("tensors")
+    print(json.dumps(header, indent=2, ensure_ascii=False))
+    for name, t in tensors.items():
+        print(f"{name:>8}: {t['dtype']} {tuple(t['shape'])} ({t['nbytes']} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Ejecución compilada de `Net` y exportación a TorchScript (requiere PyTorch).
+
+- `compile_model`: envuelve el modelo con `torch.compile` para entrenar; si no está disponible
+  o falla al compilar (p. ej. sin compilador de C), usa `torch.jit.script`, y si tampoco se
+  puede, el modelo eager. Los pesos son los mismos objetos, así que los checkpoints no cambian.
+- `export_torchscript`: traza el modelo en modo eval, lo congela (`torch.jit.freeze`) y lo guarda en un único fichero con `model_config` como extra.
+  `predict.py` lo carga con `torch.jit.load` sin importar `train.py`.
+  `optimize_for_inference` (capas MKLDNN) baja la latencia con batches pequeños pero es más
+  lento con batches grandes, así que solo se aplica con `optimize=True`.
+
+Uso (exportar un checkpoint ya entrenado):
+    python model_export.py checkpoints/best_model.pt checkpoints/model_scripted.ts
+"""
+
+import argparse
+import json
+import os
+import warnings
+
+import torch
+
+
+def compile_model(model, example_input, log=print):
+    """Devuelve (modelo_compilado, modo) con modo en {"compile", "torchscript", "eager"}.
+    `example_input` se usa para forzar la compilación ahora y poder caer al siguiente modo si falla.
+    """
+    was_training = model.training
+    if hasattr(torch, "compile"):
+        try:
+            compiled = torch.compile(model)
+            with torch.no_grad():
+                compiled(example_input)
+            log("Modelo compilado con torch.compile")
+            return compiled, "compile"
+        except Exception as e:
+            log(f"torch.compile no disponible ({type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}); probando TorchScript")
+        finally:
+            model.train(was_training)
+    try:
+        scripted = torch.jit.script(model)
+        log("Modelo compilado con TorchScript (torch.jit.script)")
+        return scripted, "torchscript"
+    except Exception as e:
+        log(f"TorchScript no disponible ({type(e).__name__}); se usa el modelo eager")
+        return model, "eager"
+
+
+def export_torchscript(model, path, example_input, model_config=None, optimize=False):
+    """Guarda `model` como TorchScript congelado para inferencia en CPU."""
+    model = model.to("cpu").eval()
+    # torch >= 2.9 marca TorchScript como obsoleto pero sigue siendo el formato que se carga sin Python del modelo
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        traced = torch.jit.trace(model, example_input.to("cpu"))
+        frozen = torch.jit.freeze(traced)
+        if optimize:
+            try:
+                frozen = torch.jit.optimize_for_inference(frozen)
+            except Exception:
+                pass
+        extra = {"model_config.json": json.dumps(model_config or {})}
+        tmp_path = path + ".tmp"
+        torch.jit.save(frozen, tmp_path, _extra_files=extra)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_torchscript(path, map_location="cpu"):
+    """Carga un modelo exportado; devuelve (modelo, model_config)."""
+    extra = {"model_config.json": ""}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        model = torch.jit.load(path, map_location=map_location, _extra_files=extra)
+    config = json.loads(extra["model_config.json"] or "{}")
+    return model, config
+
+
+def load_checkpoint_net(path):
+    """Reconstruye `Net` desde un checkpoint de train.py (dict con model_state_dict o state_dict plano)."""
+    from train import Net, net_config_from_state
+
+    state = torch.load(path, map_location="cpu")
+    if isinstance(state, dict) and "model_state_dict" in state:
+        state = state["model_state_dict"]
+    config = net_config_from_state(state)
+    net = Net(**config)
+    net.load_state_dict(state)
+    return net, config
+
+
+def main():
+    p = argparse.ArgumentParser(description="Exporta un checkpoint de train.py a TorchScript congelado")
+    p.add_argument("checkpoint", type=str)
+    p.add_argument("output", type=str)
+    p.add_argument("--optimize", action="store_true", help="Aplicar optimize_for_inference (mejor latencia con batches pequeños)")
+    args = p.parse_args()
+    net, config = load_checkpoint_net(args.checkpoint)
+    export_torchscript(net, args.output, torch.zeros(1, config["input_dim"]), model_config=config, optimize=args.optimize)
+    print(f"Modelo TorchScript guardado en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
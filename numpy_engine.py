@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Motor de inferencia en NumPy para los MLP de `train.py` (no necesita torch ni sklearn para predecir).
+
+`export_npz` lee los pesos de un checkpoint de PyTorch (`best_model.pt`, `model_final.pt`) o de un
+`sklearn_mlp.joblib` (con su `scaler.joblib` al lado) y los guarda en un `.npz` plano:
+`W0, b0, W1, b1, ...` (matrices (entrada, salida) para `x @ W + b`), `classes` y `meta` (JSON con
+activaciones y origen). El StandardScaler de sklearn se integra en la primera capa
+(`W0 / scale`, `b0 - (mean / scale) @ W0`), así que el `.npz` no tiene paso de preprocesado; la
+exportación comprueba que el resultado coincide con scaler + MLP. Con `--no-fold-scaler` se guarda
+aparte (`scaler_mean`, `scaler_scale`) y se aplica en cada bloque. Exportar sí
+requiere el backend original; `NumpyMLP` solo importa numpy, así que `predict.py` con un `.npz`
+arranca en milisegundos y funciona en hosts sin torch.
+
+`export_artifact` guarda lo mismo en el formato de un solo fichero de model_artifact.py (`.mlm`):
+cabecera con arquitectura, origen, preprocesado y dtype, y pesos que `NumpyMLP` mapea en memoria
+en lugar de leerlos (el `.npz` es un zip y se descomprime entero al cargarlo).
+
+Uso:
+    python numpy_engine.py checkpoints/best_model.pt checkpoints/model.mlm
+    python numpy_engine.py checkpoints/best_model.pt checkpoints/model.npz
+    python predict.py --model-path checkpoints/model.npz --input data/rows.npy --output preds.npy
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+ENGINE_VERSION = 1
+ACTIVATIONS = ("relu", "tanh", "logistic", "identity")
+
+
+def _activate(h, name):
+    # in-place sobre la salida de la matmul, que ya es un array nuevo
+    if name == "relu":
+        return np.maximum(h, 0, out=h)
+    if name == "tanh":
+        return np.tanh(h, out=h)
+    if name == "logistic":
+        return _sigmoid(h)
+    if name == "identity":
+        return h
+    raise ValueError(f"Activación no soportada: {name} (opciones: {', '.join(ACTIVATIONS)})")
+
+
+def _sigmoid(h):
+    return np.divide(1.0, 1.0 + np.exp(-h, out=h), out=h)
+
+
+def _softmax(h):
+    h -= h.max(axis=1, keepdims=True)
+    np.exp(h, out=h)
+    h /= h.sum(axis=1, keepdims=True)
+    return h
+
+
+def layers_from_torch(path):
+    """Capas, metadatos y clases de un checkpoint de `Net` (dict con model_state_dict o state_dict plano)."""
+    import torch
+
+    state = torch.load(path, map_location="cpu")
+    if isinstance(state, dict) and "model_state_dict" in state:
+        state = state["model_state_dict"]
+    # net.0, net.2, ...: las Linear del Sequential de Net (las ReLU no tienen pesos)
+    idx = sorted(int(k.split(".")[1]) for k in state if k.startswith("net.") and k.endswith(".weight"))
+    layers = [(state[f"net.{i}.weight"].numpy().T, state[f"net.{i}.bias"].numpy()) for i in idx]
+    meta = {"source": "torch", "activation": "relu", "out_activation": "softmax"}
+    return layers, meta, np.arange(layers[-1][0].shape[1]), None
+
+
+def layers_from_sklearn(path):
+    """Capas, metadatos, clases y scaler (o None) de un `MLPClassifier` guardado por `train_sklearn`."""
+    import joblib
+
+    if path.endswith(".joblib"):
+        clf = joblib.load(path)
+        scaler_path = os.path.join(os.path.dirname(path), "scaler.joblib")
+        scaler = joblib.load(scaler_path) if os.path.exists(scaler_path) else None
+    else:
+        import pickle
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        clf = data.get("model") if isinstance(data, dict) else data
+        scaler = data.get("scaler") if isinstance(data, dict) else None
+    layers = list(zip(clf.coefs_, clf.intercepts_))
+    meta = {"source": "sklearn", "activation": clf.activation, "out_activation": clf.out_activation_}
+    scaler_arrays = None
+    if scaler is not None:
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones_like(scaler.mean_)
+        scaler_arrays = (scaler.mean_, scale)
+    return layers, meta, clf.classes_, scaler_arrays
+
+
+def forward(layers, meta, X, scaler=None):
+    """Probabilidades (filas, clases) del MLP `layers` con las activaciones de `meta`."""
+    h = np.asarray(X, dtype=layers[0][0].dtype)
+    if scaler is not None:
+        h = (h - scaler[0]) / scaler[1]
+    for W, b in layers[:-1]:
+        h = _activate(h @ W + b, meta["activation"])
+    W, b = layers[-1]
+    out = h @ W + b
+    if meta["out_activation"] == "logistic":
+        # sklearn binario: una sola salida con la probabilidad de la clase positiva
+        p = _sigmoid(out).ravel()
+        return np.column_stack([1.0 - p, p])
+    return _softmax(out)
+
+
+def fold_scaler(layers, scaler):
+    """Integra `(x - mean) / scale` en la primera capa: `x @ (W / scale) + (b - (mean / scale) @ W)`."""
+    mean, scale = (np.asarray(a, dtype=np.float64) for a in scaler)
+    W, b = (np.asarray(a, dtype=np.float64) for a in layers[0])
+    folded = (W / scale[:, None], b - (mean / scale) @ W)
+    return [folded] + list(layers[1:])
+
+
+def check_fold(layers, folded, meta, scaler, dtype, n_rows=1000, seed=0):
+    """Máxima diferencia de probabilidades entre scaler + MLP (float64) y las capas integradas en `dtype`.
+
+    Las filas de prueba se generan alrededor de la media del scaler, con su misma escala.
+    """
+    mean, scale = (np.asarray(a, dtype=np.float64) for a in scaler)
+    X = mean + scale * np.random.default_rng(seed).standard_normal((n_rows, mean.shape[0]))
+    as64 = [(np.asarray(W, dtype=np.float64), np.asarray(b, dtype=np.float64)) for W, b in layers]
+    cast = [(np.asarray(W, dtype=dtype), np.asarray(b, dtype=dtype)) for W, b in folded]
+    return float(np.abs(forward(as64, meta, X, (mean, scale)) - forward(cast, meta, X)).max())
+
+
+def _export_layers(model_path, dtype, fold, fold_tol):
+    """Capas (en `dtype`), metadatos, clases y scaler (None si se integró) listos para guardar."""
+    if model_path.endswith((".joblib", ".pkl")):
+        layers, meta, classes, scaler = layers_from_sklearn(model_path)
+    else:
+        layers, meta, classes, scaler = layers_from_torch(model_path)
+    meta = dict(meta, version=ENGINE_VERSION, dtype=dtype, n_layers=len(layers), input_dim=int(layers[0][0].shape[0]))
+    if scaler is not None and fold:
+        folded = fold_scaler(layers, scaler)
+        diff = check_fold(layers, folded, meta, scaler, dtype)
+        if not diff <= fold_tol:
+            raise ValueError(f"El scaler integrado difiere {diff:.2e} del original (tolerancia {fold_tol:.0e}); exporta sin integrarlo")
+        layers, scaler = folded, None
+        meta.update(scaler_folded=True, fold_max_diff=diff)
+    layers = [(np.ascontiguousarray(W, dtype=dtype), np.asarray(b, dtype=dtype)) for W, b in layers]
+    if scaler is not None:
+        scaler = tuple(np.asarray(a, dtype=dtype) for a in scaler)
+    return layers, meta, np.asarray(classes), scaler
+
+
+def _tensors(layers, scaler):
+    arrays = {}
+    for i, (W, b) in enumerate(layers):
+        arrays[f"W{i}"] = W
+        arrays[f"b{i}"] = b
+    if scaler is not None:
+        arrays["scaler_mean"], arrays["scaler_scale"] = scaler
+    return arrays
+
+
+def export_npz(model_path, out_path, dtype="float32", fold=True, fold_tol=1e-4):
+    """Exporta el modelo de `model_path` (.pt/.joblib/.pkl) a `out_path` (.npz). Devuelve los metadatos.
+
+    Con `fold` el scaler se integra en la primera capa; si las probabilidades difieren más de `fold_tol`
+    de las de scaler + MLP, se lanza ValueError y no se escribe nada.
+    """
+    layers, meta, classes, scaler = _export_layers(model_path, dtype, fold, fold_tol)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    np.savez(out_path, classes=classes, meta=np.array(json.dumps(meta)), **_tensors(layers, scaler))
+    return meta
+
+
+def export_artifact(model_path, out_path, dtype="float32", fold=True, fold_tol=1e-4, input_scale=None):
+    """Como `export_npz`, pero en el formato de un solo fichero de model_artifact.py (`.mlm`). Devuelve la cabecera.
+
+    `input_scale`: factor que `predict.py` aplica a las features si no se indica `--input-scale`
+    (el `--data-scale` con el que se entrenó).
+    """
+    from model_artifact import write_artifact
+
+    layers, meta, classes, scaler = _export_layers(model_path, dtype, fold, fold_tol)
+    header = {
+        "architecture": {
+            "type": "mlp",
+            "layer_sizes": [int(layers[0][0].shape[0])] + [int(W.shape[1]) for W, _ in layers],
+            "activation": meta["activation"],
+            "out_activation": meta["out_activation"],
+        },
+        "backend": meta["source"],
+        "preprocessing": {
+            "scaler": "folded" if meta.get("scaler_folded") else ("separate" if scaler is not None else "none"),
+            "fold_max_diff": meta.get("fold_max_diff"),
+            "input_scale": input_scale,
+        },
+        "dtype": dtype,
+        "classes": classes.tolist(),
+        "engine_version": ENGINE_VERSION,
+    }
+    return write_artifact(out_path, header, _tensors(layers, scaler))
+
+
+def export_model(model_path, out_path, **kwargs):
+    """`export_artifact` si `out_path` termina en `.mlm`; si no, `export_npz`. Devuelve los metadatos del motor."""
+    if out_path.endswith(".mlm"):
+        header = export_artifact(model_path, out_path, **kwargs)
+        return _meta_from_header(header)
+    kwargs.pop("input_scale", None)
+    return export_npz(model_path, out_path, **kwargs)
+
+
+def _meta_from_header(header):
+    arch, pre = header["architecture"], header["preprocessing"]
+    meta = {"source": header["backend"], "activation": arch["activation"], "out_activation": arch["out_activation"],
+            "version": header["engine_version"], "dtype": header["dtype"], "n_layers": len(arch["layer_sizes"]) - 1,
+            "input_dim": arch["layer_sizes"][0]}
+    if pre["scaler"] == "folded":
+        meta.update(scaler_folded=True, fold_max_diff=pre["fold_max_diff"])
+    return meta
+
+
+class NumpyMLP:
+    """MLP cargado de un `.npz` de `export_npz`, con la interfaz de los predictores de inference.py."""
+
+    name = "NumPy"
+
+    def __init__(self, path):
+        if path.endswith(".mlm"):
+            # pesos mapeados del fichero: no se leen hasta el primer bloque y se comparten entre procesos
+            from model_artifact import open_artifact
+
+            header, data = open_artifact(path)
+            self.meta = _meta_from_header(header)
+            self.classes = np.asarray(header["classes"])
+        else:
+            with np.load(path, allow_pickle=False) as npz:
+                data = {k: npz[k] for k in npz.files}
+            self.meta = json.loads(str(data["meta"]))
+            self.classes = data["classes"]
+        if self.meta.get("version") != ENGINE_VERSION:
+            raise ValueError(f"{path}: versión de exportación {self.meta.get('version')} no soportada")
+        self.layers = [(data[f"W{i}"], data[f"b{i}"]) for i in range(self.meta["n_layers"])]
+        self.scaler = (data["scaler_mean"], data["scaler_scale"]) if "scaler_mean" in data else None
+        self.dtype = self.layers[0][0].dtype
+
+    def predict_proba(self, X):
+        return forward(self.layers, self.meta, X, self.scaler)
+
+    def predict(self, X):
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Exporta un modelo de train.py a .npz para el motor NumPy")
+    p.add_argument("model_path", type=str, help="best_model.pt / model_final.pt / sklearn_mlp.joblib / .pkl")
+    p.add_argument("output", type=str, help="Fichero de salida: .mlm (un solo fichero, memory-mapped) o .npz")
+    p.add_argument("--check-rows", type=int, default=1000, help="Filas aleatorias para comparar con el modelo original (0 = no comparar)")
+    p.add_argument("--input-scale", type=float, default=None, help="Escala de entrada guardada en el .mlm (el --data-scale del entrenamiento)")
+    p.add_argument("--no-fold-scaler", action="store_true", help="Guardar el scaler aparte en vez de integrarlo en la primera capa")
+    args = p.parse_args()
+    meta = export_model(args.model_path, args.output, fold=not args.no_fold_scaler, input_scale=args.input_scale)
+    print(f"Modelo NumPy ({meta['source']}, {meta['n_layers']} capas) guardado en: {args.output}")
+    if meta.get("scaler_folded"):
+        print(f"Scaler integrado en la primera capa (máxima diferencia con scaler + MLP: {meta['fold_max_diff']:.2e})")
+    if args.check_rows > 0:
+        from inference import load_predictor
+        X = np.random.default_rng(0).random((args.check_rows, meta["input_dim"]), dtype=np.float32)
+        diff = np.abs(NumpyMLP(args.output).predict_proba(X) - load_predictor(args.model_path).predict_proba(X)).max()
+        print(f"Máxima diferencia de probabilidades con el modelo original: {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,101 +1,112 @@
 #!/usr/bin/env python3
 """
 Script simple de inferencia para los modelos guardados por `train.py`.
-Soporta PyTorch (`model_final.pt` o `best_model.pt`) y scikit-learn (`sklearn_mlp.joblib` o `sklearn_mlp.pkl`).
+Soporta PyTorch (`model_final.pt` o `best_model.pt`), TorchScript exportado (`model_scripted.ts`, no necesita
+`train.py`), scikit-learn (`sklearn_mlp.joblib` o `sklearn_mlp.pkl`) y el `.npz` del motor NumPy
+(numpy_engine.py: solo importa numpy, sin torch, sklearn ni `train.py`).
+
+Sin `--input` predice las 5 primeras muestras de digits. Con `--input` (`.npy`, `.csv` o `.jsonl`) procesa el
+fichero por bloques de `--chunk-size` filas y escribe predicciones y probabilidades en `--output`
+(`.csv`, `.jsonl` o `.npy`) a medida que avanza, con memoria acotada (ver inference.py).
 
 Uso:
     python predict.py --backend auto --model-path checkpoints/best_model.pt
+    python predict.py --model-path checkpoints/model_scripted.ts
+    python predict.py --model-path checkpoints/model.mlm --input data/rows.npy --output preds.npy
+    python predict.py --model-path checkpoints/best_model.pt --quantized   (model_int8.ts de quantize.py)
+    python predict.py --model-path checkpoints/best_model.pt --input data/rows.npy --output preds.csv
+    python predict.py --model-path checkpoints/best_model.pt --input data/rows.npy --output preds.npy --workers 8
+
+Con `--workers N` la entrada se divide en N rangos contiguos de filas que se procesan en un pool de procesos;
+cada proceso carga el modelo una vez y la salida conserva el orden de la entrada.
+
+Los hilos de CPU se toman del perfil de `train.py autotune` (carga `predict`) salvo que se indique `--threads`;
+con `--workers` cada proceso usa los del perfil limitados a CPUs/workers (o CPUs/workers si no hay perfil).
 
 """
 import argparse
-import numpy as np
 import os
 
+from thread_tune import apply_threads, available_cpus, profile_config
+
 
 def parse_args():
     p = argparse.ArgumentParser()
-    p.add_argument("--backend", choices=["auto", "torch", "sklearn"], default="auto")
+    p.add_argument("--backend", choices=["auto", "torch", "torchscript", "sklearn", "numpy"], default="auto")
     p.add_argument("--model-path", type=str, required=True)
+    p.add_argument("--quantized", action="store_true", help="Usar el modelo int8 de quantize.py (model_int8.ts junto a --model-path)")
+    p.add_argument("--input", type=str, default=None, help="Filas a predecir: .npy (memory-mapped), .csv o .jsonl")
+    p.add_argument("--output", type=str, default=None, help="Fichero de salida .csv, .jsonl o .npy (por defecto <input>.pred.csv)")
+    p.add_argument("--chunk-size", type=int, default=65536, help="Filas por bloque de inferencia")
+    p.add_argument("--no-proba", action="store_true", help="Escribir solo la predicción, sin las probabilidades")
+    p.add_argument("--input-scale", type=float, default=None,
+                   help="Factor aplicado a las features al leerlas (p. ej. 0.0625 para píxeles 0-16); por defecto el del .mlm, si lo tiene")
+    p.add_argument("--workers", type=int, default=1, help="Procesos de inferencia con --input (cada uno procesa un rango de filas)")
+    p.add_argument("--json-key", type=str, default="features", help="Campo con las features en cada línea JSONL (si es un objeto)")
+    p.add_argument("--threads", type=int, default=None,
+                   help="Hilos de CPU (por proceso con --workers); por defecto los del perfil de `train.py autotune` "
+                        "(con --workers, como mucho CPUs/workers)")
+    p.add_argument("--no-thread-profile", action="store_true", help="No cargar el perfil de hilos de `train.py autotune`")
     return p.parse_args()
 
 
 def main():
     args = parse_args()
     path = args.model_path
+    if args.quantized and not path.endswith(".ts"):
+        path = os.path.join(os.path.dirname(path), "model_int8.ts")
     if not os.path.exists(path):
         print(f"Modelo no encontrado: {path}")
         return
 
-    backend = args.backend
-    if backend == "auto":
-        # inferir por extensión
-        ext = os.path.splitext(path)[1].lower()
-        if ext in [".pt"]:
-            backend = "torch"
-        elif ext in [".joblib", ".pkl"]:
-            backend = "sklearn"
-
-    if backend == "torch":
+    from inference import load_predictor, open_input, open_output, predict_chunk, resolve_backend, run_inference, run_sharded_inference
+    backend = resolve_backend(path, args.backend)
+    if backend in ("torch", "torchscript"):
         try:
-            import torch
-            import torch.nn as nn
+            import torch  # noqa: F401
         except Exception:
             print("PyTorch no disponible en este entorno.")
             return
 
-        # Para este ejemplo asumimos la misma arquitectura Net usada en train.py
-        from train import Net
-        device = torch.device("cpu")
-        model = Net()
-        state = torch.load(path, map_location=device)
-        # soportar checkpoint con dict o state_dict plano
-        if isinstance(state, dict) and "model_state_dict" in state:
-            model.load_state_dict(state["model_state_dict"])
-        else:
-            model.load_state_dict(state)
-        model.eval()
-
-        # inferir sobre una muestra aleatoria del dataset digits
+    if args.input_scale is None and path.endswith(".mlm"):
+        from model_artifact import read_header
+        args.input_scale = read_header(path)["preprocessing"].get("input_scale")
+
+    output = None
+    if args.input is not None:
+        output = args.output or os.path.splitext(args.input)[0] + ".pred.csv"
+    if args.input is not None and args.workers > 1:
+        # los procesos cargan el modelo; este solo reparte los rangos y une las salidas
+        # hilos por proceso: --threads, o los `intra` del perfil `predict` sin pasar de CPUs/workers
+        budget = max(1, len(available_cpus()) // args.workers)
+        config = None if args.threads or args.no_thread_profile else profile_config("predict")
+        threads = args.threads or (min(config["intra"], budget) if config else budget)
+        n_rows, seconds = run_sharded_inference(path, args.input, output, workers=args.workers, backend=backend, chunk_size=args.chunk_size,
+                                                with_proba=not args.no_proba, scale=args.input_scale, json_key=args.json_key,
+                                                threads_per_worker=threads)
+        print(f"{n_rows} filas en {seconds:.2f}s ({n_rows / max(seconds, 1e-9):.0f} filas/s, {args.workers} procesos x {threads} hilos) -> {output}")
+        return
+
+    predictor = load_predictor(path, backend)
+    # después de cargar el modelo: así torch ya está importado y se le aplican los hilos
+    apply_threads("predict", threads=args.threads, use_profile=not args.no_thread_profile)
+
+    if args.input is None:
+        # ejemplo: las primeras muestras de digits con el mismo preprocesado que train.py
         from sklearn.datasets import load_digits
         X, y = load_digits(return_X_y=True)
         X = X.astype("float32") / 16.0
-        sample = torch.from_numpy(X[:5])
-        with torch.no_grad():
-            logits = model(sample)
-            preds = logits.argmax(dim=1).numpy()
-        print("Predicciones (PyTorch):", preds)
-
-    else:
-        # sklearn
-        try:
-            import joblib
-        except Exception:
-            joblib = None
-
-        if joblib is not None and path.endswith(".joblib"):
-            m = joblib.load(path)
-            scaler = None
-            # intentar cargar scaler en mismo directorio
-            scpath = os.path.join(os.path.dirname(path), "scaler.joblib")
-            if os.path.exists(scpath):
-                scaler = joblib.load(scpath)
-            from sklearn.datasets import load_digits
-            X, y = load_digits(return_X_y=True)
-            Xs = scaler.transform(X[:5]) if scaler is not None else X[:5]
-            preds = m.predict(Xs)
-            print("Predicciones (sklearn):", preds)
-        else:
-            # intentar cargar pickle
-            import pickle
-            with open(path, "rb") as f:
-                data = pickle.load(f)
-            model = data.get("model") if isinstance(data, dict) else data
-            scaler = data.get("scaler") if isinstance(data, dict) else None
-            from sklearn.datasets import load_digits
-            X, y = load_digits(return_X_y=True)
-            Xs = scaler.transform(X[:5]) if scaler is not None else X[:5]
-            preds = model.predict(Xs)
-            print("Predicciones (sklearn pickle):", preds)
+        preds, _ = predict_chunk(predictor, X[:5])
+        print(f"Predicciones ({predictor.name}):", preds)
+        return
+
+    source = open_input(args.input, scale=args.input_scale, json_key=args.json_key)
+    sink = open_output(output, n_rows=source.n_rows, with_proba=not args.no_proba)
+    try:
+        n_rows, seconds = run_inference(predictor, source, sink, chunk_size=args.chunk_size)
+    finally:
+        sink.close()
+    print(f"{n_rows} filas en {seconds:.2f}s ({n_rows / max(seconds, 1e-9):.0f} filas/s, {predictor.name}) -> {output}")
 
 
 if __name__ == "__main__":
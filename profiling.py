@@ -0,0 +1,166 @@
+"""
+Instrumentación opcional del bucle de entrenamiento de `train_torch`.
+
+`TrainingProfiler` acumula por epoch el tiempo de pared de cada fase (espera de datos,
+forward, backward, optimizador, evaluación, checkpoints), los samples/sec y el pico de RSS
+del proceso. Al final de cada epoch escribe una línea JSON en el fichero indicado y, si hay
+un SummaryWriter o un `MetricsSink`, los mismos valores como escalares `profile/*`.
+Opcionalmente graba una traza de `torch.profiler` de N steps (formato Chrome/TensorBoard).
+
+Sin profiler se usa `NullProfiler`, cuyos métodos no hacen nada.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+
+def peak_rss_mb():
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux devuelve KB; macOS, bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class NullProfiler:
+    """Profiler vacío: misma interfaz que `TrainingProfiler` sin coste apreciable."""
+
+    _null = contextlib.nullcontext()
+
+    def start_epoch(self):
+        pass
+
+    def phase(self, name):
+        return self._null
+
+    def iter_data(self, batches):
+        return batches
+
+    def step(self, n_samples):
+        pass
+
+    def end_epoch(self, epoch, metrics=None):
+        return None
+
+    def close(self):
+        pass
+
+
+class TrainingProfiler(NullProfiler):
+    """Tiempos por fase, throughput y memoria por epoch.
+
+    jsonl_path: fichero donde añadir una línea JSON por epoch.
+    tb_writer: SummaryWriter o MetricsSink opcional para los escalares `profile/*`.
+    trace_steps: si > 0, graba con torch.profiler `trace_steps` steps tras `trace_start` steps de espera,
+        en `trace_dir` (por defecto junto al JSONL).
+    sync_cuda: sincronizar CUDA al cerrar cada fase para que los tiempos sean reales en GPU.
+    """
+
+    def __init__(self, jsonl_path=None, tb_writer=None, trace_steps=0, trace_start=5, trace_dir=None, sync_cuda=False):
+        self.jsonl_path = jsonl_path
+        self.tb_writer = tb_writer
+        self.sync_cuda = sync_cuda
+        if jsonl_path:
+            os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+        self.start_epoch()
+        self._torch_prof = None
+        if trace_steps > 0:
+            import torch.profiler as tp
+            if trace_dir is None:
+                trace_dir = os.path.join(os.path.dirname(os.path.abspath(jsonl_path or "profile.jsonl")), "profile_trace")
+            self._torch_prof = tp.profile(
+                activities=[tp.ProfilerActivity.CPU],
+                schedule=tp.schedule(wait=trace_start, warmup=1, active=trace_steps, repeat=1),
+                on_trace_ready=tp.tensorboard_trace_handler(trace_dir),
+                record_shapes=True,
+            )
+            self._torch_prof.start()
+            print(f"Traza de torch.profiler ({trace_steps} steps) en: {trace_dir}")
+
+    def start_epoch(self):
+        """Reinicia los contadores; llamar al principio de cada epoch."""
+        self.times = defaultdict(float)
+        self.steps = 0
+        self.samples = 0
+        self.t_epoch = time.perf_counter()
+
+    def _sync(self):
+        if self.sync_cuda:
+            import torch
+            torch.cuda.synchronize()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._sync()
+            self.times[name] += time.perf_counter() - t0
+
+    def iter_data(self, batches):
+        """Envuelve el iterador de batches midiendo el tiempo de espera por cada batch (fase `data`)."""
+        it = iter(batches)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                batch = next(it)
+            except StopIteration:
+                return
+            self.times["data"] += time.perf_counter() - t0
+            yield batch
+
+    def step(self, n_samples):
+        self.steps += 1
+        self.samples += n_samples
+        if self._torch_prof is not None:
+            self._torch_prof.step()
+
+    def end_epoch(self, epoch, metrics=None):
+        """Cierra la epoch: escribe el registro (JSONL y TensorBoard) y lo devuelve."""
+        wall = time.perf_counter() - self.t_epoch
+        # throughput del bucle de entrenamiento: la epoch sin evaluación ni checkpoints
+        train_time = wall - self.times["eval"] - self.times["checkpoint"]
+        record = {
+            "epoch": epoch,
+            "steps": self.steps,
+            "samples": self.samples,
+            "wall_s": round(wall, 6),
+            "samples_per_sec": round(self.samples / train_time, 2) if train_time > 0 else None,
+            "phases_s": {k: round(v, 6) for k, v in sorted(self.times.items())},
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if metrics:
+            record.update(metrics)
+        if self.jsonl_path:
+            with open(self.jsonl_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        if self.tb_writer is not None:
+            try:
+                for k, v in record["phases_s"].items():
+                    self.tb_writer.add_scalar(f"profile/{k}_s", v, epoch)
+                if record["samples_per_sec"] is not None:
+                    self.tb_writer.add_scalar("profile/samples_per_sec", record["samples_per_sec"], epoch)
+                if record["peak_rss_mb"] is not None:
+                    self.tb_writer.add_scalar("profile/peak_rss_mb", record["peak_rss_mb"], epoch)
+            except Exception:
+                pass
+        return record
+
+    def close(self):
+        if self._torch_prof is not None:
+            self._torch_prof.stop()
+            self._torch_prof = None
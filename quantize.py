@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Cuantización int8 post-entrenamiento de `Net` (requiere PyTorch).
+
+- Dinámica (por defecto): los pesos de las capas Linear se guardan en int8 y las activaciones
+  se cuantizan al vuelo en cada llamada. No necesita datos.
+- Estática (`--static`): Linear+ReLU se fusionan y las escalas de las activaciones se fijan
+  calibrando con las primeras `--calib-size` muestras de validación.
+
+El modelo cuantizado se traza y se guarda como TorchScript (`model_int8.ts` junto al
+checkpoint), con `model_config` y el motor de cuantización como extras, para que `predict.py
+--quantized` lo cargue sin importar `train.py`. El script informa de la accuracy fp32 e int8 en
+test, la diferencia, el tamaño de los ficheros y la latencia por batch.
+
+Uso:
+    python quantize.py --checkpoint checkpoints/best_model.pt
+    python quantize.py --checkpoint checkpoints/best_model.pt --static --calib-size 256
+    python quantize.py --checkpoint checkpoints/best_model.pt --data data/shards --data-scale 0.0625   (entrenado con --data)
+    python predict.py --model-path checkpoints/best_model.pt --quantized
+"""
+
+import argparse
+import copy
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.ao.quantization as tq
+
+from model_export import load_checkpoint_net
+
+
+def quantize_dynamic_net(net):
+    """Copia de `net` con las capas Linear en int8 dinámico."""
+    return tq.quantize_dynamic(copy.deepcopy(net).eval(), {nn.Linear}, dtype=torch.qint8)
+
+
+class _StaticQuantNet(nn.Module):
+    """`Net` con los stubs de (de)cuantización que necesita la cuantización estática en modo eager."""
+
+    def __init__(self, net):
+        super().__init__()
+        self.quant = tq.QuantStub()
+        self.net = copy.deepcopy(net.net)
+        self.dequant = tq.DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.net(self.quant(x)))
+
+
+def quantize_static_net(net, X_calib, engine=None, batch_size=256):
+    """Copia de `net` con pesos y activaciones en int8, calibrada con `X_calib` (array numpy)."""
+    engine = engine or torch.backends.quantized.engine
+    torch.backends.quantized.engine = engine
+    model = _StaticQuantNet(net).eval()
+    # fusionar cada Linear con la ReLU que le sigue
+    pairs = [[str(i), str(i + 1)] for i in range(0, len(model.net) - 1, 2) if isinstance(model.net[i + 1], nn.ReLU)]
+    tq.fuse_modules(model.net, pairs, inplace=True)
+    model.qconfig = tq.get_default_qconfig(engine)
+    tq.prepare(model, inplace=True)
+    with torch.no_grad():
+        for i in range(0, len(X_calib), batch_size):
+            model(torch.from_numpy(np.ascontiguousarray(X_calib[i:i + batch_size])))
+    return tq.convert(model, inplace=True)
+
+
+def _batches(X, y, batch_size):
+    """(X, y) por bloques de un array o de un `ShardSubset` (train.py --data)."""
+    if hasattr(X, "iter_batches"):
+        yield from X.iter_batches(batch_size)
+        return
+    for i in range(0, len(X), batch_size):
+        yield X[i:i + batch_size], y[i:i + batch_size]
+
+
+def _head(X, n):
+    """Las primeras `n` filas como array (también de un `ShardSubset`)."""
+    return X[:n] if not hasattr(X, "iter_batches") else next(X.iter_batches(n))[0]
+
+
+def accuracy(model, X, y, batch_size=4096):
+    correct = total = 0
+    with torch.no_grad():
+        for Xb, yb in _batches(X, y, batch_size):
+            preds = model(torch.from_numpy(np.ascontiguousarray(Xb, dtype=np.float32))).argmax(dim=1).numpy()
+            correct += int((preds == np.asarray(yb)).sum())
+            total += len(yb)
+    return correct / max(total, 1)
+
+
+def latency_us(model, X, repeats=50):
+    x = torch.from_numpy(np.ascontiguousarray(X))
+    with torch.no_grad():
+        for _ in range(5):
+            model(x)
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            model(x)
+    return (time.perf_counter() - t0) / repeats * 1e6
+
+
+def save_quantized(model, path, example_input, model_config=None):
+    """Traza el modelo cuantizado y lo guarda como TorchScript (se carga con `model_export.load_torchscript`)."""
+    config = dict(model_config or {}, quantized_engine=torch.backends.quantized.engine)
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        traced = torch.jit.freeze(torch.jit.trace(model, example_input))
+        tmp_path = path + ".tmp"
+        torch.jit.save(traced, tmp_path, _extra_files={"model_config.json": json.dumps(config)})
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Cuantización int8 post-entrenamiento de best_model.pt")
+    p.add_argument("--checkpoint", type=str, default="checkpoints/best_model.pt")
+    p.add_argument("--out", type=str, default=None, help="Fichero de salida (por defecto model_int8.ts junto al checkpoint)")
+    p.add_argument("--static", action="store_true", help="Cuantización estática calibrada con validación")
+    p.add_argument("--calib-size", type=int, default=256, help="Muestras de validación para calibrar (--static)")
+    p.add_argument("--val-size", type=float, default=0.1)
+    p.add_argument("--data", type=str, default=None, help="Shards .npy/.npz con los que se entrenó el modelo (ver train.py --data)")
+    p.add_argument("--data-scale", type=float, default=None, help="Factor aplicado a las features de --data (ver train.py --data-scale)")
+    args = p.parse_args(argv)
+
+    # mismos datos y splits que el entrenamiento, para que la calibración y el delta de accuracy sean de ese dataset
+    from train import load_data
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data(test_size=0.2, val_size=args.val_size, data_path=args.data,
+                                                               data_scale=args.data_scale)
+    net, config = load_checkpoint_net(args.checkpoint)
+    net.eval()
+
+    if args.static:
+        if X_val is None:
+            raise SystemExit("--static necesita un split de validación (--val-size > 0)")
+        X_calib = _head(X_val, args.calib_size)
+        qmodel = quantize_static_net(net, X_calib)
+        mode = f"estática ({len(X_calib)} muestras de calibración)"
+    else:
+        qmodel = quantize_dynamic_net(net)
+        mode = "dinámica"
+
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(args.checkpoint)), "model_int8.ts")
+    save_quantized(qmodel, out, torch.zeros(1, config["input_dim"]), model_config=dict(config, quantization="static" if args.static else "dynamic"))
+
+    acc_fp32 = accuracy(net, X_test, y_test)
+    acc_int8 = accuracy(qmodel, X_test, y_test)
+    print(f"Cuantización int8 {mode}")
+    print(f"Accuracy test fp32: {acc_fp32:.4f}  int8: {acc_int8:.4f}  delta: {acc_int8 - acc_fp32:+.4f}")
+    for bs in (1, 256):
+        X_bs = _head(X_test, bs)
+        print(f"Latencia batch {bs}: fp32 {latency_us(net, X_bs):.1f} us  int8 {latency_us(qmodel, X_bs):.1f} us")
+    fp32_kb = sum(t.numel() * t.element_size() for t in net.state_dict().values()) / 1024
+    print(f"Tamaño: pesos fp32 {fp32_kb:.1f} KB -> fichero int8 {os.path.getsize(out) / 1024:.1f} KB")
+    print(f"Modelo cuantizado guardado en: {out}")
+
+
+if __name__ == "__main__":
+    main()
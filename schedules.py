@@ -0,0 +1,59 @@
+"""
+Reglas de learning rate para `train_torch`.
+
+Son funciones puras del número de step del optimizador, así que no tienen estado que guardar
+en los checkpoints: al reanudar basta con `global_step` para recuperar el LR.
+
+- `scale_lr`: ajusta el LR base al batch efectivo (batch_size * accum_steps * procesos) respecto
+  a `base_batch_size`, con la regla lineal (Goyal et al.) o la raíz cuadrada (más conservadora).
+- `lr_at`: LR del step `step` según el schedule:
+  - `constant`: warmup lineal desde ~0 hasta el LR pico en `warmup_steps` steps y después constante.
+  - `cosine`: el mismo warmup y después decaimiento coseno hasta `min_lr_ratio * pico` en `total_steps`.
+  - `onecycle` (Smith): sube de `pico / 25` al pico durante el 30% de los steps (o `warmup_steps`)
+    y baja con coseno hasta `pico / 1e4`. Suele llegar antes a una accuracy dada que un LR fijo;
+    el pico adecuado se obtiene con el range test de `lr_finder.py`.
+"""
+
+import math
+
+SCALING_RULES = ("none", "linear", "sqrt")
+SCHEDULES = ("constant", "cosine", "onecycle")
+
+
+def scale_lr(lr, effective_batch_size, rule="none", base_batch_size=64):
+    """LR para `effective_batch_size` si `lr` es el adecuado para `base_batch_size`."""
+    if rule == "none" or effective_batch_size == base_batch_size:
+        return lr
+    ratio = effective_batch_size / float(base_batch_size)
+    if rule == "linear":
+        return lr * ratio
+    if rule == "sqrt":
+        return lr * math.sqrt(ratio)
+    raise ValueError(f"Regla de escalado desconocida: {rule} (opciones: {', '.join(SCALING_RULES)})")
+
+
+def _cosine(start, end, progress):
+    return end + (start - end) * 0.5 * (1.0 + math.cos(math.pi * min(max(progress, 0.0), 1.0)))
+
+
+def lr_at(step, peak_lr, warmup_steps=0, schedule="constant", total_steps=0, min_lr_ratio=0.0,
+          pct_start=0.3, div_factor=25.0, final_div_factor=1e4):
+    """LR a aplicar en el step `step` (0-based) del optimizador. `total_steps` es necesario para cosine y onecycle."""
+    if schedule == "onecycle":
+        up = warmup_steps if warmup_steps > 0 else max(1, int(pct_start * total_steps))
+        initial = peak_lr / div_factor
+        if step < up:
+            return _cosine(initial, peak_lr, step / up)
+        return _cosine(peak_lr, initial / final_div_factor, (step - up) / max(1, total_steps - up))
+    if warmup_steps > 0 and step < warmup_steps:
+        return peak_lr * (step + 1) / warmup_steps
+    if schedule == "cosine":
+        return _cosine(peak_lr, peak_lr * min_lr_ratio, (step - warmup_steps) / max(1, total_steps - warmup_steps))
+    if schedule != "constant":
+        raise ValueError(f"Schedule desconocido: {schedule} (opciones: {', '.join(SCHEDULES)})")
+    return peak_lr
+
+
+def set_lr(optimizer, lr):
+    for group in optimizer.param_groups:
+        group["lr"] = lr
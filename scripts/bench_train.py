@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los backends de `train.py`.
+
+Para cada combinación de backend, batch size y número de hilos entrena en un proceso nuevo
+(para que el pico de memoria y los hilos no se mezclen entre configuraciones) y mide:
+- epoch_time_s: mediana del tiempo por epoch (entrenamiento + evaluación)
+- samples_per_sec: muestras de entrenamiento por segundo (sobre la mediana anterior)
+- time_to_target_s / epochs_to_target: tiempo hasta alcanzar `--target-acc` en validación (None si no se alcanza)
+- peak_rss_mb: pico de memoria residente del proceso
+- final_val_acc: mejor accuracy de validación
+
+Backends: `torch`, `sklearn` (fit con warm_start sobre todo el array, con mini-batches de
+`batch_size`) y `sklearn-stream` (partial_fit por mini-batches). Con `--amp none,bf16` el backend torch se mide
+también con autocast bfloat16.
+
+Uso:
+    python scripts/bench_train.py --out bench/base.json
+    python scripts/bench_train.py --out bench/new.json --compare bench/base.json --threshold 0.1
+
+Con `--compare` el script termina con código 1 si alguna métrica empeora más que `--threshold`
+(fracción relativa) respecto al baseline.
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# métrica -> True si "más alto es mejor"
+METRICS = {
+    "epoch_time_s": False,
+    "samples_per_sec": True,
+    "time_to_target_s": False,
+    "peak_rss_mb": False,
+}
+
+
+def _run_config(config, epochs, target_acc, seed):
+    """Se ejecuta en un proceso hijo: entrena una configuración y devuelve sus métricas.
+
+    Los límites de hilos (torch y BLAS) se restauran al terminar, por si se llama en el mismo proceso (tests).
+    """
+    try:
+        from threadpoolctl import threadpool_limits
+        limits = threadpool_limits(limits=config["threads"])
+    except Exception:
+        limits = contextlib.nullcontext()
+    torch_threads = None
+    if config["backend"] == "torch":
+        import torch
+        torch_threads = torch.get_num_threads()
+        torch.set_num_threads(config["threads"])
+        torch.manual_seed(seed)
+    try:
+        with limits:
+            return _measure(config, epochs, target_acc, seed)
+    finally:
+        if torch_threads is not None:
+            torch.set_num_threads(torch_threads)
+
+
+def _measure(config, epochs, target_acc, seed):
+    import numpy as np
+
+    import train
+    from profiling import peak_rss_mb
+
+    X_train, X_val, X_test, y_train, y_val, y_test = train.load_data()
+    if config.get("scale", 1) > 1:
+        # dataset más grande para que los tiempos sean medibles: repetir con ruido
+        rng = np.random.default_rng(seed)
+        X_train = np.concatenate([X_train + rng.normal(0, 0.02, X_train.shape).astype("float32") for _ in range(config["scale"])])
+        y_train = np.tile(y_train, config["scale"])
+
+    stamps = []
+    accs = []
+
+    def on_epoch(epoch, metrics):
+        stamps.append(time.perf_counter())
+        accs.append(metrics["val_accuracy"])
+        return len(accs) >= epochs
+
+    t0 = time.perf_counter()
+    if config["backend"] == "torch":
+        train.train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=epochs, batch_size=config["batch_size"],
+                          hidden=config.get("hidden", 128), patience=epochs + 1, seed=seed, epoch_callback=on_epoch,
+                          amp=config.get("amp", "none"))
+    else:
+        train.train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, batch_size=config["batch_size"],
+                            hidden=config.get("hidden", 128), patience=epochs + 1,
+                            streaming=(config["backend"] == "sklearn-stream"), epoch_callback=on_epoch)
+
+    epoch_times = [b - a for a, b in zip([t0] + stamps[:-1], stamps)]
+    epoch_time = statistics.median(epoch_times)
+    reached = [i for i, a in enumerate(accs) if a >= target_acc]
+    result = dict(config)
+    result.update({
+        "epochs": len(accs),
+        "epoch_time_s": round(epoch_time, 6),
+        "samples_per_sec": round(len(X_train) / epoch_time, 2),
+        "time_to_target_s": round(stamps[reached[0]] - t0, 6) if reached else None,
+        "epochs_to_target": reached[0] + 1 if reached else None,
+        "final_val_acc": round(max(accs), 6),
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    return result
+
+
+def run_benchmarks(backends, batch_sizes, threads, epochs=5, target_acc=0.9, scale=1, seed=0, amp_modes=("none",), hidden=128):
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        amps = amp_modes if backend == "torch" else ["none"]
+        for bs, th, amp in itertools.product(batch_sizes, threads, amps):
+            config = {"backend": backend, "batch_size": bs, "threads": th, "scale": scale, "amp": amp, "hidden": hidden}
+            with ctx.Pool(1) as pool:
+                res = pool.apply(_run_config, (config, epochs, target_acc, seed))
+            print(f"[bench] {backend:14s} bs={str(bs):>5s} threads={th} amp={amp:4s}: {res['epoch_time_s']:.4f}s/epoch "
+                  f"{res['samples_per_sec']:.0f} samples/s  acc={res['final_val_acc']:.4f}  t_target={res['time_to_target_s']}  "
+                  f"rss={res['peak_rss_mb']:.0f}MB")
+            results.append(res)
+    return results
+
+
+def environment():
+    info = {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    for mod in ("numpy", "sklearn", "torch"):
+        try:
+            info[mod] = __import__(mod).__version__
+        except Exception:
+            info[mod] = None
+    return info
+
+
+def _key(r):
+    return (r["backend"], r["batch_size"], r["threads"], r.get("scale", 1), r.get("amp", "none"), r.get("hidden", 128))
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """Compara dos listas de resultados. Devuelve (filas, regresiones); cada fila es
+    (config, métrica, valor_base, valor_actual, cambio_relativo) y las regresiones son las filas que empeoran más de `threshold`.
+    """
+    base = {_key(r): r for r in baseline}
+    rows, regressions = [], []
+    for r in current:
+        b = base.get(_key(r))
+        if b is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = b.get(metric), r.get(metric)
+            if old is None or new is None or old == 0:
+                # alcanzar el objetivo antes y dejar de alcanzarlo ahora también es una regresión
+                if metric == "time_to_target_s" and old is not None and new is None:
+                    rows.append((_key(r), metric, old, new, None))
+                    regressions.append(rows[-1])
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            rows.append((_key(r), metric, old, new, change))
+            if worse > threshold:
+                regressions.append(rows[-1])
+    return rows, regressions
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark de los backends de train.py")
+    p.add_argument("--backends", type=str, default="torch,sklearn,sklearn-stream")
+    p.add_argument("--batch-sizes", type=str, default="32,128")
+    p.add_argument("--threads", type=str, default="1")
+    p.add_argument("--epochs", type=int, default=5)
+    p.add_argument("--target-acc", type=float, default=0.9)
+    p.add_argument("--amp", type=str, default="none", help="Modos de precisión para torch, p. ej. none,bf16")
+    p.add_argument("--hidden", type=int, default=128)
+    p.add_argument("--scale", type=int, default=1, help="Repetir el train set N veces (con ruido) para medir con más datos")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", type=str, default="bench_results.json")
+    p.add_argument("--compare", type=str, default=None, help="JSON de baseline con el que comparar")
+    p.add_argument("--threshold", type=float, default=0.1, help="Empeoramiento relativo máximo permitido (0.1 = 10%%)")
+    args = p.parse_args()
+
+    results = run_benchmarks(args.backends.split(","), [int(b) for b in args.batch_sizes.split(",")],
+                             [int(t) for t in args.threads.split(",")], epochs=args.epochs, target_acc=args.target_acc,
+                             scale=args.scale, seed=args.seed, amp_modes=args.amp.split(","), hidden=args.hidden)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump({"environment": environment(), "target_acc": args.target_acc, "epochs": args.epochs, "results": results}, f, indent=2)
+    print(f"Resultados guardados en: {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        rows, regressions = compare_results(baseline, results, threshold=args.threshold)
+        for key, metric, old, new, change in rows:
+            flag = "  <-- REGRESIÓN" if (key, metric, old, new, change) in regressions else ""
+            change_txt = f"{change:+.1%}" if change is not None else "n/a"
+            print(f"{str(key):40s} {metric:18s} {old!s:>12} -> {new!s:>12} ({change_txt}){flag}")
+        if regressions:
+            print(f"{len(regressions)} regresiones por encima del umbral {args.threshold:.0%}")
+            sys.exit(1)
+        print("Sin regresiones.")
+
+
+if __name__ == "__main__":
+    main()
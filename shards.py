@@ -0,0 +1,272 @@
+"""
+Lectura out-of-core de datasets guardados en shards `.npy` / `.npz`.
+
+Formatos soportados (se pueden mezclar en un mismo directorio):
+- `<nombre>.npz` con arrays `X` (n, d) e `y` (n,). Si el .npz se guardó sin comprimir
+  (`np.savez`, no `np.savez_compressed`) las features se mapean en memoria directamente
+  desde el zip; si está comprimido se carga el shard completo solo mientras se lee.
+- Pares `<nombre>_X.npy` / `<nombre>_y.npy`, abiertos con `mmap_mode="r"`.
+
+Solo las etiquetas `y` se mantienen en RAM (hacen falta para estratificar). Los splits
+train/val/test se hacen sobre índices globales y cada split es un `ShardSubset` que lee
+las features por shard, de modo que la memoria usada depende del tamaño del shard y no
+del tamaño del dataset.
+
+`ArrayBatches` (arrays en memoria) y `BatchStream` (cualquier generador de bloques) exponen
+la misma interfaz `iter_shards` / `iter_batches` para el entrenamiento en streaming.
+
+Uso:
+    ds = ShardedDataset("data/shards")
+    train, val, test = ds.split(test_size=0.2, val_size=0.1)
+    for Xb, yb in train.iter_batches(256, shuffle=True, seed=1):
+        ...
+"""
+
+import glob
+import os
+import zipfile
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+
+def _read_npy_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    return shape, fortran, dtype
+
+
+def _npz_member_memmap(path, name):
+    """Devuelve un memmap del array `name` de un .npz sin comprimir, o None si no es posible."""
+    with zipfile.ZipFile(path) as zf:
+        try:
+            info = zf.getinfo(name + ".npy")
+        except KeyError:
+            return None
+        if info.compress_type != zipfile.ZIP_STORED:
+            return None
+    with open(path, "rb") as f:
+        # cabecera local del zip: 30 bytes fijos + nombre + campo extra
+        f.seek(info.header_offset)
+        local = f.read(30)
+        name_len = int.from_bytes(local[26:28], "little")
+        extra_len = int.from_bytes(local[28:30], "little")
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        shape, fortran, dtype = _read_npy_header(f)
+        offset = f.tell()
+    if dtype.hasobject:
+        return None
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape, order="F" if fortran else "C", offset=offset)
+
+
+class _Shard:
+    """Un fichero (o par de ficheros) con una parte del dataset."""
+
+    def __init__(self, path):
+        self.path = path
+        if path.endswith(".npz"):
+            self.kind = "npz"
+            self.y_path = path
+        else:
+            self.kind = "npy"
+            self.y_path = path[: -len("_X.npy")] + "_y.npy"
+
+    def labels(self):
+        if self.kind == "npz":
+            with np.load(self.path) as z:
+                return np.asarray(z["y"])
+        return np.load(self.y_path)
+
+    def features(self):
+        """Features del shard: memmap, o array cargado si el .npz está comprimido.
+        No se cachea: al soltar la referencia se desmapea el fichero y sus páginas dejan de contar en el RSS.
+        """
+        if self.kind == "npy":
+            return np.load(self.path, mmap_mode="r")
+        X = _npz_member_memmap(self.path, "X")
+        if X is not None:
+            return X
+        # .npz comprimido: no se puede mapear; se carga el shard entero
+        with np.load(self.path) as z:
+            return z["X"]
+
+
+def find_shards(path):
+    """Expande un directorio, patrón glob o lista de rutas a la lista ordenada de shards."""
+    if isinstance(path, (list, tuple)):
+        paths = list(path)
+    elif os.path.isdir(path):
+        paths = glob.glob(os.path.join(path, "*.npz")) + glob.glob(os.path.join(path, "*_X.npy"))
+    else:
+        paths = glob.glob(path)
+    paths = sorted(p for p in paths if p.endswith(".npz") or p.endswith("_X.npy"))
+    if not paths:
+        raise FileNotFoundError(f"No se encontraron shards .npz/_X.npy en: {path}")
+    return paths
+
+
+def split_indices(y, test_size=0.2, val_size=0.1, random_state=42):
+    """Split estratificado por índices (mismo criterio que `train.load_data`).
+    Devuelve (idx_train, idx_val, idx_test); idx_val es None si val_size == 0.
+    """
+    idx = np.arange(len(y))
+    idx_rest, idx_test = train_test_split(idx, test_size=test_size, random_state=random_state, stratify=y)
+    if val_size > 0:
+        rel_val = val_size / (1.0 - test_size)
+        idx_train, idx_val = train_test_split(idx_rest, test_size=rel_val, random_state=random_state, stratify=y[idx_rest])
+    else:
+        idx_train, idx_val = idx_rest, None
+    return idx_train, idx_val, idx_test
+
+
+class ShardedDataset:
+    """Dataset repartido en varios shards memory-mapped.
+
+    scale: factor opcional aplicado a las features al leerlas (p. ej. 1/16 para píxeles 0..16).
+    """
+
+    def __init__(self, path, scale=None, dtype="float32"):
+        self.shards = [_Shard(p) for p in find_shards(path)]
+        ys = [s.labels() for s in self.shards]
+        self.offsets = np.cumsum([0] + [len(y) for y in ys])
+        self.y = np.concatenate(ys).astype(np.int64)
+        self.n_features = int(self.shards[0].features().shape[1])
+        self.scale = scale
+        self.dtype = np.dtype(dtype)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def subset(self, indices):
+        return ShardSubset(self, indices)
+
+    def split(self, test_size=0.2, val_size=0.1, random_state=42):
+        """Devuelve (train, val, test) como `ShardSubset` (val es None si val_size == 0)."""
+        idx_train, idx_val, idx_test = split_indices(self.y, test_size=test_size, val_size=val_size, random_state=random_state)
+        val = self.subset(idx_val) if idx_val is not None else None
+        return self.subset(idx_train), val, self.subset(idx_test)
+
+    def read(self, shard_id, local_rows):
+        """Lee las filas `local_rows` (ordenadas) de un shard como array denso del dtype del dataset."""
+        X = np.asarray(self.shards[shard_id].features()[local_rows], dtype=self.dtype)
+        if self.scale is not None:
+            X *= self.scale
+        return X
+
+
+class ShardSubset:
+    """Vista de un `ShardedDataset` definida por índices globales; no copia las features."""
+
+    def __init__(self, dataset, indices):
+        self.dataset = dataset
+        self.indices = np.sort(np.asarray(indices, dtype=np.int64))
+        self.y = dataset.y[self.indices]
+        # como los índices están ordenados, las filas de cada shard forman un tramo contiguo
+        self._bounds = np.searchsorted(self.indices, dataset.offsets)
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def shape(self):
+        return (len(self.indices), self.dataset.n_features)
+
+    def shard_ids(self):
+        """Shards que contienen al menos una fila del subset."""
+        return [s for s in range(len(self.dataset.shards)) if self._bounds[s + 1] > self._bounds[s]]
+
+    def iter_shards(self, shuffle=False, seed=None, shard_ids=None):
+        """Itera (X, y) shard a shard. Con shuffle se baraja el orden de shards y las filas dentro de cada uno."""
+        rng = np.random.default_rng(seed)
+        ids = self.shard_ids() if shard_ids is None else list(shard_ids)
+        if shuffle:
+            rng.shuffle(ids)
+        for s in ids:
+            a, b = self._bounds[s], self._bounds[s + 1]
+            if a == b:
+                continue
+            X = self.dataset.read(s, self.indices[a:b] - self.dataset.offsets[s])
+            y = self.y[a:b]
+            if shuffle:
+                perm = rng.permutation(b - a)
+                X, y = X[perm], y[perm]
+            yield X, y
+
+    def iter_batches(self, batch_size, shuffle=False, seed=None, shard_ids=None):
+        """Itera mini-batches (X, y) de tamaño `batch_size` (el último puede ser menor).
+        Como mucho hay un shard y un resto de batch en memoria a la vez.
+        """
+        return rebatch(self.iter_shards(shuffle=shuffle, seed=seed, shard_ids=shard_ids), batch_size)
+
+
+def rebatch(chunks, batch_size):
+    """Convierte un iterable de bloques (X, y) de cualquier tamaño en mini-batches de `batch_size`."""
+    rest_X, rest_y = None, None
+    for X, y in chunks:
+        if rest_X is not None:
+            X, y = np.concatenate([rest_X, X]), np.concatenate([rest_y, y])
+            rest_X, rest_y = None, None
+        n_full = (len(X) // batch_size) * batch_size
+        for i in range(0, n_full, batch_size):
+            yield X[i:i + batch_size], y[i:i + batch_size]
+        if n_full < len(X):
+            rest_X, rest_y = X[n_full:], y[n_full:]
+    if rest_X is not None:
+        yield rest_X, rest_y
+
+
+class ArrayBatches:
+    """Arrays en memoria con la misma interfaz de lectura por bloques que `ShardSubset`
+    (`iter_shards`, `iter_batches`, `y`), para usar el camino de streaming con datos normales.
+    """
+
+    def __init__(self, X, y, chunk_size=65536):
+        self.X = X
+        self.y = y
+        self.chunk_size = chunk_size
+
+    def __len__(self):
+        return len(self.X)
+
+    @property
+    def shape(self):
+        return self.X.shape
+
+    def iter_shards(self, shuffle=False, seed=None):
+        for i in range(0, len(self.X), self.chunk_size):
+            yield self.X[i:i + self.chunk_size], self.y[i:i + self.chunk_size]
+
+    def iter_batches(self, batch_size, shuffle=False, seed=None):
+        if not shuffle:
+            return rebatch(self.iter_shards(), batch_size)
+        perm = np.random.default_rng(seed).permutation(len(self.X))
+        return ((self.X[perm[i:i + batch_size]], self.y[perm[i:i + batch_size]]) for i in range(0, len(perm), batch_size))
+
+
+class BatchStream:
+    """Fuente de datos definida por una función que devuelve un iterador nuevo de bloques (X, y)
+    en cada pasada (p. ej. leyendo un CSV por trozos). No se conoce la longitud ni se puede barajar:
+    el orden lo decide la propia fuente. `classes` es necesario para `partial_fit`.
+    """
+
+    def __init__(self, make_iter, classes=None):
+        self.make_iter = make_iter
+        self.classes = classes
+
+    def iter_shards(self, shuffle=False, seed=None):
+        return iter(self.make_iter())
+
+    def iter_batches(self, batch_size, shuffle=False, seed=None):
+        return rebatch(self.make_iter(), batch_size)
+
+
+def load_shards(path, test_size=0.2, val_size=0.1, random_state=42, scale=None):
+    """Equivalente out-of-core de `train.load_data`: devuelve X_train, X_val, X_test, y_train, y_val, y_test
+    donde las X son `ShardSubset` y las y arrays de etiquetas en memoria.
+    """
+    ds = ShardedDataset(path, scale=scale)
+    train, val, test = ds.split(test_size=test_size, val_size=val_size, random_state=random_state)
+    return train, val, test, train.y, (val.y if val is not None else None), test.y
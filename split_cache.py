@@ -0,0 +1,85 @@
+"""
+Caché en disco de los splits preprocesados de `load_data`.
+
+Cada combinación de (dataset, test_size, val_size, random_state, preprocesado) se guarda en
+un subdirectorio con nombre igual a un hash de esos parámetros, con un `.npy` por array
+(`X_train.npy`, `y_val.npy`, ...) y un `meta.json` con los parámetros. Las lecturas usan
+`np.load(mmap_mode="c")`: los datos no se copian a memoria del proceso y varios procesos
+(sweeps, workers) comparten las mismas páginas; copy-on-write evita que una escritura
+accidental modifique la caché.
+
+El directorio por defecto es `~/.cache/my-ml/splits` (o `$ML_SPLIT_CACHE`).
+La escritura es atómica: se escribe en un directorio temporal y se renombra, así que dos
+procesos que generan la misma entrada a la vez no dejan una entrada a medias.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+CACHE_VERSION = 1
+SPLIT_NAMES = ("X_train", "X_val", "X_test", "y_train", "y_val", "y_test")
+
+
+def default_cache_dir():
+    return os.environ.get("ML_SPLIT_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "my-ml", "splits"))
+
+
+def split_key(**params):
+    """Hash estable de los parámetros que determinan los splits."""
+    params = dict(params, cache_version=CACHE_VERSION)
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def load_splits(cache_dir, key):
+    """Devuelve la tupla de splits mapeados en memoria o None si la entrada no existe."""
+    path = os.path.join(cache_dir, key)
+    if not os.path.isfile(os.path.join(path, "meta.json")):
+        return None
+    splits = []
+    for name in SPLIT_NAMES:
+        f = os.path.join(path, name + ".npy")
+        # X_val/y_val no existen cuando val_size == 0
+        splits.append(np.load(f, mmap_mode="c") if os.path.exists(f) else None)
+    return tuple(splits)
+
+
+def save_splits(cache_dir, key, splits, params=None):
+    """Guarda los splits de forma atómica. Si otro proceso ya creó la entrada, se conserva la suya."""
+    path = os.path.join(cache_dir, key)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+    try:
+        for name, arr in zip(SPLIT_NAMES, splits):
+            if arr is not None:
+                np.save(os.path.join(tmp_path, name + ".npy"), np.ascontiguousarray(arr))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(params or {}, f, indent=2, sort_keys=True, default=str)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # la entrada ya existe (creada por otro proceso entre medias)
+            pass
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def cached_splits(build, cache_dir=None, **params):
+    """Splits de la caché para `params`; si no están, los genera con `build()` y los guarda."""
+    cache_dir = cache_dir or default_cache_dir()
+    key = split_key(**params)
+    splits = load_splits(cache_dir, key)
+    if splits is not None:
+        return splits
+    splits = build()
+    try:
+        save_splits(cache_dir, key, splits, params)
+    except OSError as e:
+        # sin permisos o sin espacio: seguir con los arrays en memoria
+        print(f"Aviso: no se pudo escribir la caché de splits en {cache_dir}: {e}")
+        return splits
+    return load_splits(cache_dir, key) or splits
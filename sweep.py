@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Búsqueda de hiperparámetros (grid o random) para `train.py`.
+
+Cada trial ejecuta `train_torch` o `train_sklearn` en un proceso del pool con un presupuesto
+fijo de hilos (`--threads-per-trial`), y reporta la accuracy de validación al final de cada
+epoch. Un pruner compartido entre procesos detiene los trials que van por detrás:
+- `median`: poda si la accuracy queda por debajo de la mediana de los demás trials en esa epoch.
+- `halving`: successive halving asíncrono; en las epochs `min_epochs * eta^k` solo continúa
+  el mejor 1/eta de los trials que han llegado a ese punto.
+
+Uso:
+    python train.py sweep --lr 1e-3,3e-3 --batch-size 32,64 --hidden 64,128 --epochs 10
+    python train.py sweep --mode random --trials 20 --lr 1e-4:1e-2 --pruner halving --out sweeps/run1
+"""
+
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+PARAMS = ["lr", "batch_size", "hidden", "patience"]
+PARAM_TYPES = {"lr": float, "batch_size": int, "hidden": int, "patience": int}
+
+
+def parse_values(name, text):
+    """'1e-3,3e-3' -> lista de valores; 'a:b' (solo random) -> rango continuo (lr log-uniforme)."""
+    if ":" in text:
+        lo, hi = (PARAM_TYPES[name](v) for v in text.split(":"))
+        return (lo, hi)
+    return [PARAM_TYPES[name](v) for v in text.split(",")]
+
+
+def build_trials(space, mode="grid", n_trials=10, seed=0):
+    """Lista de dicts de hiperparámetros. `space` mapea nombre -> lista de valores o rango (lo, hi)."""
+    if mode == "grid":
+        if any(isinstance(v, tuple) for v in space.values()):
+            raise ValueError("Los rangos 'a:b' solo se admiten con --mode random")
+        names = list(space)
+        return [dict(zip(names, combo)) for combo in itertools.product(*(space[n] for n in names))]
+
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(n_trials):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                lo, hi = values
+                if name == "lr":
+                    params[name] = math.exp(rng.uniform(math.log(lo), math.log(hi)))
+                elif PARAM_TYPES[name] is int:
+                    params[name] = rng.randint(lo, hi)
+                else:
+                    params[name] = rng.uniform(lo, hi)
+            else:
+                params[name] = rng.choice(values)
+        trials.append(params)
+    return trials
+
+
+class Pruner:
+    """Decide si un trial debe detenerse según lo reportado por todos los trials.
+
+    reports: dict compartido (Manager) epoch -> lista de accuracies; lock: Lock del Manager.
+    """
+
+    def __init__(self, kind, reports, lock, warmup=1, min_trials=3, eta=3, min_epochs=1):
+        self.kind = kind
+        self.reports = reports
+        self.lock = lock
+        self.warmup = warmup
+        self.min_trials = min_trials
+        self.eta = eta
+        self.min_epochs = min_epochs
+
+    def _is_rung(self, epoch):
+        r = self.min_epochs
+        while r < epoch:
+            r *= self.eta
+        return r == epoch
+
+    def should_prune(self, epoch, value):
+        with self.lock:
+            others = list(self.reports.get(epoch, []))
+            self.reports[epoch] = others + [value]
+        if self.kind == "median":
+            if epoch <= self.warmup or len(others) < self.min_trials:
+                return False
+            return value < statistics.median(others)
+        if self.kind == "halving":
+            if not self._is_rung(epoch) or len(others) + 1 < self.eta:
+                return False
+            ranked = sorted(others + [value], reverse=True)
+            n_keep = max(1, len(ranked) // self.eta)
+            return value < ranked[n_keep - 1]
+        return False
+
+
+def _init_worker(threads):
+    # presupuesto de hilos por trial: torch y BLAS de numpy/sklearn
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except Exception:
+        pass
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+    except Exception:
+        pass
+
+
+def run_trial(trial_id, params, backend, epochs, data_kwargs, pruner, save_root=None):
+    """Ejecuta un trial reutilizando train_torch/train_sklearn y devuelve su fila de resultados."""
+    import train
+
+    data = train.load_data(**data_kwargs)
+    history = []
+    status = {"pruned": False}
+
+    def on_epoch(epoch, metrics):
+        history.append(metrics["val_accuracy"])
+        if pruner is not None and pruner.should_prune(epoch, metrics["val_accuracy"]):
+            status["pruned"] = True
+            return True
+        return False
+
+    save_dir = os.path.join(save_root, f"trial{trial_id:03d}") if save_root else None
+    t0 = time.perf_counter()
+    if backend == "torch":
+        train.train_torch(*data, epochs=epochs, batch_size=params["batch_size"], lr=params["lr"], hidden=params["hidden"],
+                          patience=params["patience"], save_dir=save_dir, seed=trial_id, epoch_callback=on_epoch)
+    else:
+        train.train_sklearn(*data, epochs=epochs, batch_size=params["batch_size"], lr=params["lr"], hidden=params["hidden"],
+                            patience=params["patience"], save_dir=save_dir, seed=trial_id, epoch_callback=on_epoch)
+    elapsed = time.perf_counter() - t0
+
+    row = {"trial": trial_id, "backend": backend}
+    row.update(params)
+    row.update({
+        "best_val_acc": max(history) if history else float("nan"),
+        "epochs": len(history),
+        "status": "pruned" if status["pruned"] else "completed",
+        "seconds": round(elapsed, 2),
+    })
+    return row
+
+
+def run_sweep(trials, backend="torch", epochs=10, workers=1, threads_per_trial=1, pruner="median", data_kwargs=None,
+              out_dir=None, save_models=False, min_epochs=1, eta=3):
+    """Ejecuta los trials en un pool de procesos y devuelve las filas ordenadas por best_val_acc."""
+    data_kwargs = data_kwargs or {}
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Manager() as manager:
+        shared = None
+        if pruner != "none":
+            shared = Pruner(pruner, manager.dict(), manager.Lock(), eta=eta, min_epochs=min_epochs)
+        save_root = out_dir if (out_dir and save_models) else None
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(threads_per_trial,)) as pool:
+            futures = [pool.submit(run_trial, i, params, backend, epochs, data_kwargs, shared, save_root) for i, params in enumerate(trials)]
+            for fut in as_completed(futures):
+                row = fut.result()
+                rows.append(row)
+                print(f"[sweep] trial {row['trial']} {row['status']}: best_val_acc={row['best_val_acc']:.4f} "
+                      f"({row['epochs']} epochs, {row['seconds']}s)")
+    rows.sort(key=lambda r: r["best_val_acc"], reverse=True)
+    if out_dir:
+        write_results(rows, os.path.join(out_dir, "sweep_results.csv"))
+    return rows
+
+
+def write_results(rows, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Resultados del sweep guardados en: {path}")
+
+
+def print_table(rows):
+    cols = ["trial", "lr", "batch_size", "hidden", "patience", "best_val_acc", "epochs", "status", "seconds"]
+    print(" | ".join(f"{c:>12}" for c in cols))
+    for r in rows:
+        cells = [f"{r[c]:.4g}" if isinstance(r[c], float) else str(r[c]) for c in cols]
+        print(" | ".join(f"{c:>12}" for c in cells))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="train.py sweep", description="Búsqueda de hiperparámetros con trials en paralelo y poda temprana")
+    p.add_argument("--mode", choices=["grid", "random"], default="grid")
+    p.add_argument("--trials", type=int, default=10, help="Número de trials en modo random")
+    p.add_argument("--lr", type=str, default="1e-3", help="Valores separados por comas o rango 'min:max' (random)")
+    p.add_argument("--batch-size", type=str, default="64")
+    p.add_argument("--hidden", type=str, default="128")
+    p.add_argument("--patience", type=str, default="3")
+    p.add_argument("--epochs", type=int, default=10)
+    p.add_argument("--backend", choices=["torch", "sklearn"], default="torch")
+    p.add_argument("--pruner", choices=["median", "halving", "none"], default="median")
+    p.add_argument("--eta", type=int, default=3, help="Factor de reducción para --pruner halving")
+    p.add_argument("--min-epochs", type=int, default=1, help="Primera rung de --pruner halving")
+    p.add_argument("--threads-per-trial", type=int, default=1, help="Hilos de CPU por trial")
+    p.add_argument("--cpus", type=int, default=None, help="CPUs totales a usar (por defecto todas)")
+    p.add_argument("--val-size", type=float, default=0.1)
+    p.add_argument("--data", type=str, default=None, help="Shards .npy/.npz (ver train.py --data)")
+    p.add_argument("--cache-dir", type=str, default=None, help="Directorio de la caché de splits (ver train.py --cache-dir)")
+    p.add_argument("--seed", type=int, default=0, help="Semilla del muestreo random")
+    p.add_argument("--out", type=str, default="sweeps", help="Directorio de resultados")
+    p.add_argument("--save-models", action="store_true", help="Guardar checkpoints de cada trial en --out/trialNNN")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    space = {name: parse_values(name, getattr(args, name)) for name in PARAMS}
+    trials = build_trials(space, mode=args.mode, n_trials=args.trials, seed=args.seed)
+    cpus = args.cpus or os.cpu_count() or 1
+    workers = max(1, min(len(trials), cpus // args.threads_per_trial))
+    print(f"Sweep: {len(trials)} trials ({args.mode}), {workers} procesos x {args.threads_per_trial} hilos, pruner={args.pruner}")
+    data_kwargs = {"test_size": 0.2, "val_size": args.val_size, "data_path": args.data, "use_cache": True, "cache_dir": args.cache_dir}
+    # generar la caché de splits una vez antes de lanzar los trials; los procesos la leen por mmap
+    import train
+    train.load_data(**data_kwargs)
+    rows = run_sweep(trials, backend=args.backend, epochs=args.epochs, workers=workers, threads_per_trial=args.threads_per_trial,
+                     pruner=args.pruner, data_kwargs=data_kwargs, out_dir=args.out, save_models=args.save_models,
+                     min_epochs=args.min_epochs, eta=args.eta)
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
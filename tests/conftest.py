@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_caches(tmp_path, monkeypatch):
+    # la caché de splits y el perfil de hilos van a tmp_path, nunca al $HOME real (también en los subprocesos)
+    monkeypatch.setenv("ML_SPLIT_CACHE", str(tmp_path / "split_cache"))
+    monkeypatch.setenv("ML_THREAD_PROFILE", str(tmp_path / "threads.json"))
@@ -0,0 +1,48 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from augment import BatchAugmenter
+from train import load_data, train_torch
+
+
+def test_batch_augmenter_shapes_and_range():
+    x = torch.rand(32, 64)
+    aug = BatchAugmenter.for_input_dim(64, max_shift=1.0, max_rotation=10.0, noise_std=0.05)
+    assert aug.image_shape == (8, 8) and aug.enabled
+    out = aug(x)
+    assert out.shape == x.shape and out.min() >= 0.0 and out.max() <= 1.0
+    assert not torch.equal(out, aug(x))
+    # también acepta batches (B, 8, 8)
+    assert aug(x.reshape(32, 8, 8)).shape == (32, 8, 8)
+
+    torch.manual_seed(0)
+    a = aug(x)
+    torch.manual_seed(0)
+    torch.testing.assert_close(a, aug(x))
+
+    # sin desplazamiento, rotación ni ruido la transformación es la identidad
+    ident = BatchAugmenter(max_shift=0.0, max_rotation=0.0, noise_std=0.0)
+    assert not ident.enabled
+    torch.testing.assert_close(ident(x), x)
+    with pytest.raises(ValueError):
+        BatchAugmenter.for_input_dim(60)
+
+
+def test_noise_clamp_follows_value_range():
+    x = torch.rand(32, 64) * 16
+    # sin value_range: se recorta al rango del batch, no a [0, 1]
+    out = BatchAugmenter(max_shift=0.0, max_rotation=0.0, noise_std=0.5)(x)
+    assert out.max() > 1.0 and out.min() >= x.min() and out.max() <= x.max()
+    out = BatchAugmenter(max_shift=0.0, max_rotation=0.0, noise_std=0.5, value_range=(2.0, 10.0))(x)
+    assert out.min() == 2.0 and out.max() == 10.0
+
+
+def test_train_torch_with_augmentation(capsys):
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    accs = []
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=2, seed=0,
+                augment={"max_shift": 0.5, "max_rotation": 5.0, "noise_std": 0.03},
+                epoch_callback=lambda e, m: accs.append(m["val_accuracy"]))
+    assert len(accs) == 2 and accs[-1] > 0.5
+    assert "us/step" in capsys.readouterr().out
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from bench_train import _run_config, compare_results
+
+
+def test_run_config_sklearn_metrics():
+    res = _run_config({"backend": "sklearn-stream", "batch_size": 64, "threads": 1}, epochs=2, target_acc=0.5, seed=0)
+    assert res["epochs"] == 2
+    assert res["epoch_time_s"] > 0 and res["samples_per_sec"] > 0
+    assert res["epochs_to_target"] is not None and res["time_to_target_s"] > 0
+
+
+def test_compare_results_flags_regressions():
+    base = [{"backend": "torch", "batch_size": 64, "threads": 1, "epoch_time_s": 1.0, "samples_per_sec": 1000.0,
+             "time_to_target_s": 3.0, "peak_rss_mb": 500.0}]
+    same = [dict(base[0], epoch_time_s=1.05, samples_per_sec=960.0)]
+    _, regressions = compare_results(base, same, threshold=0.1)
+    assert regressions == []
+
+    slower = [dict(base[0], epoch_time_s=1.5, samples_per_sec=700.0, time_to_target_s=None)]
+    _, regressions = compare_results(base, slower, threshold=0.1)
+    assert {r[1] for r in regressions} == {"epoch_time_s", "samples_per_sec", "time_to_target_s"}
+
+
+def test_run_config_restores_blas_threads():
+    threadpoolctl = pytest.importorskip("threadpoolctl")
+    with threadpoolctl.threadpool_limits(limits=3):
+        before = [info["num_threads"] for info in threadpoolctl.threadpool_info()]
+        _run_config({"backend": "sklearn-stream", "batch_size": 64, "threads": 1}, epochs=1, target_acc=0.5, seed=0)
+        assert [info["num_threads"] for info in threadpoolctl.threadpool_info()] == before
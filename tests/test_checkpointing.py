@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from checkpointing import AsyncCheckpointWriter  # noqa: E402
+
+
+def test_async_writer_snapshots_and_flushes(tmp_path):
+    w = torch.zeros(3)
+    path = str(tmp_path / "ckpt.pt")
+    with AsyncCheckpointWriter(max_pending=1) as writer:
+        writer.save({"w": w}, path)
+        # el snapshot se toma al encolar: modificar el tensor después no afecta al fichero
+        w += 1
+    assert torch.equal(torch.load(path)["w"], torch.zeros(3))
+    assert os.listdir(tmp_path) == ["ckpt.pt"]
+
+
+def test_async_writer_reports_errors(tmp_path):
+    writer = AsyncCheckpointWriter(max_pending=1)
+    writer.save({"w": torch.zeros(1)}, str(tmp_path / "missing_dir" / "ckpt.pt"))
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    writer.close()
+
+
+def test_retention_keeps_last_and_best(tmp_path):
+    from checkpointing import CheckpointRetention
+
+    retention = CheckpointRetention(str(tmp_path), keep_last=2, keep_best=1, mode="max")
+    dropped = []
+    for i, metric in enumerate([0.5, 0.9, 0.6, 0.7, 0.8]):
+        dropped += retention.add(f"checkpoint_epoch{i}.pt", metric)
+    # se conservan los 2 últimos y el mejor (0.9)
+    assert sorted(p for p, _ in retention.entries) == ["checkpoint_epoch1.pt", "checkpoint_epoch3.pt", "checkpoint_epoch4.pt"]
+    assert sorted(dropped) == ["checkpoint_epoch0.pt", "checkpoint_epoch2.pt"]
+
+
+def test_resume_mid_epoch_matches_uninterrupted_run(tmp_path):
+    from train import load_data, train_torch
+
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    X_train, y_train = X_train[:320], y_train[:320]
+    kwargs = dict(epochs=2, batch_size=32, patience=10, seed=5, save_every_steps=15)
+
+    torch.manual_seed(0)
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=str(tmp_path / "full"), **kwargs)
+    # reanudar desde el step 15 (a mitad de la segunda epoch) con otra inicialización
+    torch.manual_seed(1)
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=str(tmp_path / "resumed"),
+                resume_path=str(tmp_path / "full" / "checkpoint_step15.pt"), **kwargs)
+
+    full = torch.load(tmp_path / "full" / "model_final.pt")
+    resumed = torch.load(tmp_path / "resumed" / "model_final.pt")
+    for k in full:
+        assert torch.equal(full[k], resumed[k])
+
+
+def test_best_model_is_linked_to_epoch_checkpoint(tmp_path):
+    from train import load_data, train_torch
+
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    train_torch(X_train[:200], X_val, X_test, y_train[:200], y_val, y_test, epochs=3, batch_size=32, patience=10,
+                save_dir=str(tmp_path), keep_last=1)
+    assert sorted(p.name for p in tmp_path.glob("checkpoint_*.pt")) == ["checkpoint_epoch3.pt"]
+    assert "model_state_dict" in torch.load(tmp_path / "best_model.pt")
@@ -0,0 +1,43 @@
+import inspect
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from distill import choose_model, distill_students, evaluate_candidates, parse_args
+from train import Net, distillation_loss, load_data, net_config_from_state, train_torch
+
+
+def test_net_depth_and_config_from_state():
+    net = Net(hidden=16, depth=3)
+    assert net_config_from_state(net.state_dict()) == {"input_dim": 64, "hidden": 16, "num_classes": 10, "depth": 3}
+    # depth=1 conserva los nombres de los checkpoints antiguos
+    assert set(Net().state_dict()) == {"net.0.weight", "net.0.bias", "net.2.weight", "net.2.bias"}
+
+
+def test_distillation_loss_matches_teacher():
+    logits = torch.randn(8, 10)
+    hard = torch.tensor(1.0)
+    # con alpha=1 solo cuenta la KL, que es 0 si el estudiante reproduce al teacher
+    assert distillation_loss(logits, logits, hard, temperature=4.0, alpha=1.0).item() == pytest.approx(0.0, abs=1e-6)
+    assert distillation_loss(logits, logits, hard, temperature=4.0, alpha=0.0).item() == pytest.approx(1.0)
+
+
+def test_distill_students_table(tmp_path):
+    data = load_data()
+    torch.manual_seed(0)
+    train_torch(*data, epochs=2, batch_size=64, save_dir=str(tmp_path / "teacher"), seed=0)
+    teacher = Net()
+    teacher.load_state_dict(torch.load(tmp_path / "teacher" / "best_model.pt")["model_state_dict"])
+    students = distill_students(teacher, data, [16], [1, 2], str(tmp_path / "students"), epochs=2)
+    assert [name for name, _, _ in students] == ["student_w16_d1", "student_w16_d2"]
+
+    rows = evaluate_candidates([("teacher", {"hidden": 128}, teacher)] + students, data[2], data[5], latency_batch=32)
+    assert rows[1]["params"] < rows[0]["params"]
+    assert choose_model(rows, max_acc_drop=1.0)["model"] == "student_w16_d1"
+    assert choose_model(rows, max_latency_us=0.0) is None
+
+
+def test_cli_alpha_matches_library_default():
+    default = inspect.signature(distill_students).parameters["alpha"].default
+    assert parse_args([]).alpha == default == inspect.signature(train_torch).parameters["distill_alpha"].default
@@ -0,0 +1,113 @@
+import json
+
+import numpy as np
+import pytest
+
+from inference import load_predictor, open_input, open_output, predict_chunk, run_inference
+from train import load_data, train_sklearn
+
+
+@pytest.fixture(scope="module")
+def sklearn_model(tmp_path_factory):
+    save_dir = tmp_path_factory.mktemp("sk")
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=str(save_dir), patience=1)
+    return str(save_dir / "sklearn_mlp.joblib"), X_test
+
+
+def test_inputs_stream_the_same_rows(tmp_path, sklearn_model):
+    _, X = sklearn_model
+    np.save(tmp_path / "x.npy", X)
+    np.savetxt(tmp_path / "x.csv", X, delimiter=",", fmt="%.8g", header=",".join(f"f{i}" for i in range(X.shape[1])), comments="")
+    with open(tmp_path / "x.jsonl", "w") as f:
+        for i, row in enumerate(X.tolist()):
+            f.write(json.dumps({"features": row} if i % 2 else row) + "\n")
+
+    for name in ("x.npy", "x.csv", "x.jsonl"):
+        source = open_input(str(tmp_path / name))
+        chunks = list(source.iter_chunks(50))
+        assert [start for start, _ in chunks] == list(range(0, len(X), 50))
+        np.testing.assert_allclose(np.concatenate([c for _, c in chunks]), X, rtol=1e-6)
+    assert open_input(str(tmp_path / "x.npy")).n_rows == len(X)
+    np.testing.assert_allclose(next(open_input(str(tmp_path / "x.npy"), scale=2.0).iter_chunks(10))[1], X[:10] * 2)
+    with pytest.raises(ValueError):
+        open_input(str(tmp_path / "x.parquet"))
+
+
+def test_chunked_inference_matches_full_batch(tmp_path, sklearn_model):
+    model_path, X = sklearn_model
+    predictor = load_predictor(model_path)
+    full_preds, full_proba = predict_chunk(predictor, X)
+    np.save(tmp_path / "x.npy", X)
+
+    for out in ("p.npy", "p.csv", "p.jsonl"):
+        source = open_input(str(tmp_path / "x.npy"))
+        sink = open_output(str(tmp_path / out), n_rows=source.n_rows)
+        n_rows, _ = run_inference(predictor, source, sink, chunk_size=37)
+        sink.close()
+        assert n_rows == len(X)
+    np.testing.assert_array_equal(np.load(tmp_path / "p.npy"), full_preds)
+    np.testing.assert_allclose(np.load(tmp_path / "p_proba.npy"), full_proba, rtol=1e-5, atol=1e-7)
+    rows = np.loadtxt(tmp_path / "p.csv", delimiter=",", skiprows=1)
+    np.testing.assert_array_equal(rows[:, 0], np.arange(len(X)))
+    np.testing.assert_array_equal(rows[:, 1], full_preds)
+    records = [json.loads(line) for line in open(tmp_path / "p.jsonl")]
+    assert [r["pred"] for r in records] == full_preds.tolist() and len(records[0]["proba"]) == full_proba.shape[1]
+    with pytest.raises(ValueError):
+        open_output(str(tmp_path / "q.npy"), n_rows=None)
+
+
+def test_torch_predictor(tmp_path):
+    torch = pytest.importorskip("torch")
+    from train import Net
+
+    torch.manual_seed(0)
+    net = Net(hidden=16)
+    torch.save({"model_state_dict": net.state_dict(), "model_config": {"input_dim": 64, "hidden": 16, "num_classes": 10, "depth": 1}},
+               tmp_path / "best_model.pt")
+    X = np.random.default_rng(0).random((20, 64), dtype=np.float32)
+    preds, proba = predict_chunk(load_predictor(str(tmp_path / "best_model.pt")), X)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0, rtol=1e-5)
+    with torch.no_grad():
+        np.testing.assert_array_equal(preds, net(torch.from_numpy(X)).argmax(dim=1).numpy())
+
+
+def test_sharded_inference_keeps_row_order(tmp_path, sklearn_model):
+    from inference import run_sharded_inference, split_input
+
+    model_path, X = sklearn_model
+    np.savetxt(tmp_path / "x.csv", X, delimiter=",", fmt="%.8g", header="cabecera", comments="")
+    # rangos de bytes contiguos que cubren todo el fichero y suman todas las filas
+    parts = split_input(str(tmp_path / "x.csv"), 4)
+    assert parts[0][0] == 0 and parts[-1][1] == (tmp_path / "x.csv").stat().st_size
+    assert all(a[1] == b[0] for a, b in zip(parts, parts[1:]))
+    assert sum(open_input(str(tmp_path / "x.csv"), part=p).count_rows() for p in parts) == len(X)
+
+    source = open_input(str(tmp_path / "x.csv"))
+    sink = open_output(str(tmp_path / "single.csv"))
+    run_inference(load_predictor(model_path), source, sink, chunk_size=64)
+    sink.close()
+    n_rows, _ = run_sharded_inference(model_path, str(tmp_path / "x.csv"), str(tmp_path / "sharded.csv"), workers=2, chunk_size=64,
+                                      parts_per_worker=2)
+    assert n_rows == len(X)
+    assert (tmp_path / "single.csv").read_text() == (tmp_path / "sharded.csv").read_text()
+    assert not list(tmp_path.glob("sharded.csv.part*"))
+
+    # entrada de texto: las partes JSONL se numeran al unirlas; la salida .npy se une desde partes binarias
+    sink = open_output(str(tmp_path / "single.jsonl"))
+    run_inference(load_predictor(model_path), open_input(str(tmp_path / "x.csv")), sink, chunk_size=64)
+    sink.close()
+    run_sharded_inference(model_path, str(tmp_path / "x.csv"), str(tmp_path / "sharded.jsonl"), workers=2, parts_per_worker=2)
+    assert (tmp_path / "single.jsonl").read_text() == (tmp_path / "sharded.jsonl").read_text()
+    run_sharded_inference(model_path, str(tmp_path / "x.csv"), str(tmp_path / "sharded.npy"), workers=2)
+    rows = np.loadtxt(tmp_path / "single.csv", delimiter=",", skiprows=1)
+    np.testing.assert_array_equal(np.load(tmp_path / "sharded.npy"), rows[:, 1])
+    np.testing.assert_allclose(np.load(tmp_path / "sharded_proba.npy"), rows[:, 2:], rtol=1e-5, atol=1e-6)
+    assert sorted(p.name for p in tmp_path.iterdir() if ".part" in p.name) == []
+
+    # entrada .npy: filas globales conocidas sin leer; salida .npy en los memmaps compartidos y .csv ya numerada
+    np.save(tmp_path / "x.npy", X.astype(np.float32))
+    run_sharded_inference(model_path, str(tmp_path / "x.npy"), str(tmp_path / "from_npy.npy"), workers=2, parts_per_worker=2)
+    np.testing.assert_array_equal(np.load(tmp_path / "from_npy.npy"), np.load(tmp_path / "sharded.npy"))
+    run_sharded_inference(model_path, str(tmp_path / "x.npy"), str(tmp_path / "from_npy.csv"), workers=2, parts_per_worker=2)
+    assert (tmp_path / "from_npy.csv").read_text() == (tmp_path / "single.csv").read_text()
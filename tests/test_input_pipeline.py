@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from input_pipeline import make_train_loader, set_loader_epoch  # noqa: E402
+
+
+def collect(loader, epoch):
+    set_loader_epoch(loader, epoch)
+    return [yb for _, yb in loader]
+
+
+@pytest.mark.parametrize("num_workers", [0, 1])
+def test_loader_covers_data_and_is_seeded(num_workers):
+    X = np.arange(200, dtype=np.float32).reshape(100, 2)
+    y = np.arange(100)
+    loader = make_train_loader(X, y, 32, num_workers=num_workers, seed=7)
+    batches = collect(loader, 1)
+    assert [len(b) for b in batches] == [32, 32, 32, 4]
+    order = torch.cat(batches).numpy()
+    assert sorted(order) == list(range(100))
+    # misma semilla y epoch -> mismo orden; otra epoch -> otro orden
+    assert torch.equal(torch.cat(collect(loader, 1)), torch.cat(batches))
+    assert not torch.equal(torch.cat(collect(loader, 2)), torch.cat(batches))
+
+
+def test_ranks_get_disjoint_parts():
+    X = np.zeros((101, 2), dtype=np.float32)
+    y = np.arange(101)
+    parts = []
+    for rank in range(2):
+        loader = make_train_loader(X, y, 16, seed=3, rank=rank, world_size=2)
+        parts.append(torch.cat(collect(loader, 1)).numpy())
+    assert len(set(parts[0]) & set(parts[1])) == 0
+    assert sorted(np.concatenate(parts)) == list(range(101))
@@ -0,0 +1,28 @@
+import numpy as np
+
+from kfold import make_folds, run_kfold, write_dataset_shards
+from train import load_data
+
+
+def test_make_folds_stratified_and_disjoint():
+    y = np.repeat(np.arange(5), 20)
+    dev_idx = np.arange(100, 200)
+    folds = make_folds(np.concatenate([np.zeros(100, dtype=int), y]), dev_idx, n_folds=4)
+    val_all = np.concatenate([va for _, va in folds])
+    assert sorted(val_all) == list(dev_idx)
+    for tr, va in folds:
+        assert not set(tr) & set(va)
+        assert len(np.unique(np.concatenate([np.zeros(100, dtype=int), y])[va])) == 5
+
+
+def test_run_kfold_sklearn_on_shared_shards(tmp_path):
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    y = np.concatenate([y_train, y_val, y_test])
+    path = write_dataset_shards(str(tmp_path / "data"), np.concatenate([X_train, X_val, X_test]), y, shard_rows=500)
+    dev_idx = np.arange(len(y_train) + len(y_val))
+    test_idx = np.arange(len(dev_idx), len(y))
+    rows, summary = run_kfold(path, dev_idx, test_idx, y, backend="sklearn", n_folds=2, workers=2, out_dir=str(tmp_path),
+                              params={"patience": 1})
+    assert [r["fold"] for r in rows] == [0, 1]
+    mean, std = summary["test_accuracy"]
+    assert mean > 0.8 and std >= 0.0
@@ -0,0 +1,113 @@
+import csv
+import json
+import threading
+
+import pytest
+
+from metrics_sink import CsvBackend, JsonlBackend, MetricsSink, TensorBoardBackend, open_sink
+from train import load_data, train_sklearn
+
+
+class _BlockingBackend:
+    """Destino que no escribe hasta que se libera `gate` (simula un disco lento)."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.records = []
+
+    def write(self, records):
+        self.gate.wait()
+        self.records.extend(records)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _FakeWriter:
+    def __init__(self):
+        self.scalars = []
+        self.histograms = []
+
+    def add_scalar(self, tag, value, step, walltime=None):
+        self.scalars.append((tag, value, step))
+
+    def add_histogram(self, tag, values, step, walltime=None):
+        self.histograms.append((tag, step))
+
+    def flush(self):
+        pass
+
+
+def test_sink_writes_jsonl_and_csv(tmp_path):
+    sink = open_sink(paths=[str(tmp_path / "m.jsonl"), str(tmp_path / "m.csv")])
+    for step in range(3):
+        sink.add_scalar("val/accuracy", 0.5 + step / 10, step)
+    sink.add_histogram("weights/w", [0.0, 0.5, 1.0, 1.0], 2)
+    sink.close()
+
+    lines = [json.loads(line) for line in (tmp_path / "m.jsonl").read_text().splitlines()]
+    assert [r["step"] for r in lines] == [0, 1, 2, 2]
+    assert lines[1]["value"] == 0.6 and sum(lines[3]["histogram"]["counts"]) == 4
+    rows = list(csv.DictReader(open(tmp_path / "m.csv")))
+    # el CSV solo lleva escalares
+    assert [(r["tag"], float(r["value"])) for r in rows] == [("val/accuracy", 0.5), ("val/accuracy", 0.6), ("val/accuracy", 0.7)]
+    assert open_sink() is None
+
+
+def test_sink_drops_when_queue_is_full():
+    backend = _BlockingBackend()
+    sink = MetricsSink([backend], max_pending=4)
+    for step in range(50):
+        sink.add_scalar("loss", step, step)  # nunca bloquea aunque el destino esté parado
+    assert sink.dropped >= 50 - 4 - 1
+    backend.gate.set()
+    sink.close()
+    assert len(backend.records) + sink.dropped == 50
+    sink.add_scalar("loss", 0.0, 99)  # tras close se ignora
+    assert len(backend.records) + sink.dropped == 50
+
+
+def test_sklearn_backend_uses_sink(tmp_path):
+    Xtr, Xv, Xt, ytr, yv, yt = load_data()
+    writer = _FakeWriter()
+    train_sklearn(Xtr, Xv, Xt, ytr, yv, yt, patience=1, tb_writer=writer)
+    assert writer.scalars and all(tag == "val/accuracy" for tag, _, _ in writer.scalars)
+
+    path = tmp_path / "sk.csv"
+    sink = MetricsSink([CsvBackend(str(path))])
+    train_sklearn(Xtr, Xv, Xt, ytr, yv, yt, patience=1, metrics=sink)
+    sink.close()
+    assert len(list(csv.DictReader(open(path)))) == len(writer.scalars)
+
+
+def test_torch_backend_uses_sink(tmp_path):
+    pytest.importorskip("torch")
+    from train import train_torch
+
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    path = tmp_path / "metrics.jsonl"
+    sink = MetricsSink([JsonlBackend(str(path)), TensorBoardBackend(writer=_FakeWriter())])
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=2, metrics=sink, log_histograms=True, seed=0)
+    sink.close()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    tags = {r["tag"] for r in records}
+    assert {"train/loss", "val/accuracy", "train/lr"} <= tags
+    assert any(t.startswith("weights/") for t in tags)
+    assert sink.backends[1].writer.scalars and sink.backends[1].writer.histograms
+
+
+def test_closed_sink_is_released(tmp_path):
+    import gc
+    import weakref
+
+    sink = MetricsSink([JsonlBackend(str(tmp_path / "m.jsonl"))])
+    sink.add_scalar("a", 1.0, 0)
+    sink.close()
+    ref = weakref.ref(sink)
+    del sink
+    gc.collect()
+    # atexit ya no guarda una referencia al sink (ni a sus destinos)
+    assert ref() is None
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from model_artifact import ALIGN, open_artifact, read_header, write_artifact
+
+
+def test_roundtrip_memmaps_aligned_tensors(tmp_path):
+    path = str(tmp_path / "m.mlm")
+    tensors = {"W0": np.arange(15, dtype=np.float32).reshape(3, 5), "b0": np.ones(5, dtype=np.float64), "idx": np.arange(7, dtype=np.int64)}
+    write_artifact(path, {"architecture": {"type": "mlp"}, "dtype": "float32"}, tensors)
+    assert read_header(path)["architecture"] == {"type": "mlp"}
+    header, loaded = open_artifact(path)
+    assert header["format_version"] == 1 and set(loaded) == set(tensors)
+    for name, a in tensors.items():
+        np.testing.assert_array_equal(loaded[name], a)
+        assert loaded[name].dtype == a.dtype and not loaded[name].flags.writeable
+        assert isinstance(loaded[name].base, np.memmap) and header["tensors"][name]["offset"] % ALIGN == 0
+    assert not (tmp_path / "m.mlm.tmp").exists()
+
+
+def test_rejects_other_files(tmp_path):
+    np.save(tmp_path / "x.npy", np.zeros(3))
+    with pytest.raises(ValueError):
+        open_artifact(str(tmp_path / "x.npy"))
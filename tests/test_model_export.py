@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from model_export import compile_model, load_torchscript
+from train import Net, load_data, train_torch
+
+
+def test_compile_model_falls_back_to_torchscript(monkeypatch):
+    net = Net()
+    monkeypatch.setattr(torch, "compile", lambda m: (_ for _ in ()).throw(RuntimeError("sin compilador")))
+    compiled, mode = compile_model(net, torch.zeros(4, 64), log=lambda *a: None)
+    assert mode == "torchscript"
+    x = torch.randn(8, 64)
+    torch.testing.assert_close(compiled(x), net(x))
+
+
+def test_export_matches_eager_and_loads_without_train(tmp_path):
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=1, batch_size=64, save_dir=str(tmp_path), seed=0,
+                export_torchscript=True)
+    path = tmp_path / "model_scripted.ts"
+    model, config = load_torchscript(str(path))
+    assert config["hidden"] == 128
+
+    net = Net(**config)
+    net.load_state_dict(torch.load(tmp_path / "best_model.pt")["model_state_dict"])
+    net.eval()
+    x = torch.from_numpy(X_test)
+    with torch.no_grad():
+        torch.testing.assert_close(model(x), net(x), rtol=1e-4, atol=1e-5)
+
+    # predict.py con el artefacto exportado no importa train.py
+    code = ("import runpy, sys; sys.argv = ['predict.py', '--model-path', %r]; runpy.run_path('predict.py', run_name='__main__'); "
+            "assert 'train' not in sys.modules" % str(path))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert "Predicciones (TorchScript)" in out.stdout
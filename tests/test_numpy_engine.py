@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+
+from inference import load_predictor
+from model_artifact import read_header
+from numpy_engine import NumpyMLP, export_artifact, export_npz
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _save_sklearn(tmp_path, X, y, **kwargs):
+    scaler = StandardScaler().fit(X)
+    clf = MLPClassifier(hidden_layer_sizes=(16, 8), max_iter=50, random_state=0, **kwargs).fit(scaler.transform(X), y)
+    joblib.dump(clf, tmp_path / "sklearn_mlp.joblib")
+    joblib.dump(scaler, tmp_path / "scaler.joblib")
+    return str(tmp_path / "sklearn_mlp.joblib")
+
+
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+@pytest.mark.parametrize("activation,n_classes", [("relu", 10), ("tanh", 10), ("logistic", 2)])
+def test_sklearn_export_matches(tmp_path, activation, n_classes):
+    rng = np.random.default_rng(0)
+    X = rng.random((200, 64), dtype=np.float32)
+    y = rng.integers(0, n_classes, 200)
+    path = _save_sklearn(tmp_path, X, y, activation=activation)
+    meta = export_npz(path, str(tmp_path / "model.npz"))
+    assert meta["source"] == "sklearn" and meta["n_layers"] == 3
+    engine, original = NumpyMLP(str(tmp_path / "model.npz")), load_predictor(path)
+    np.testing.assert_allclose(engine.predict_proba(X), original.predict_proba(X), rtol=1e-4, atol=1e-6)
+    np.testing.assert_array_equal(engine.predict(X), original.model.predict(original.scaler.transform(X)))
+
+
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+def test_scaler_folded_into_first_layer(tmp_path):
+    rng = np.random.default_rng(0)
+    X = (rng.random((200, 64)) * rng.random(64) * 16 + rng.random(64) * 4).astype(np.float32)
+    path = _save_sklearn(tmp_path, X, np.arange(200) % 10)
+    meta = export_npz(path, str(tmp_path / "folded.npz"))
+    export_npz(path, str(tmp_path / "two_step.npz"), fold=False)
+    assert meta["scaler_folded"] and meta["fold_max_diff"] < 1e-5
+    folded, two_step = NumpyMLP(str(tmp_path / "folded.npz")), NumpyMLP(str(tmp_path / "two_step.npz"))
+    assert folded.scaler is None and two_step.scaler is not None
+    np.testing.assert_allclose(folded.predict_proba(X), two_step.predict_proba(X), rtol=1e-4, atol=1e-6)
+    with pytest.raises(ValueError):
+        export_npz(path, str(tmp_path / "strict.npz"), fold_tol=0.0)
+    assert not (tmp_path / "strict.npz").exists()
+
+
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+def test_artifact_matches_npz(tmp_path):
+    X = np.random.default_rng(0).random((100, 64), dtype=np.float32)
+    path = _save_sklearn(tmp_path, X, np.arange(100) % 4)
+    export_npz(path, str(tmp_path / "model.npz"))
+    export_artifact(path, str(tmp_path / "model.mlm"), input_scale=0.0625)
+    header = read_header(str(tmp_path / "model.mlm"))
+    assert header["backend"] == "sklearn" and header["dtype"] == "float32" and header["classes"] == [0, 1, 2, 3]
+    assert header["architecture"]["layer_sizes"] == [64, 16, 8, 4]
+    assert header["preprocessing"]["scaler"] == "folded" and header["preprocessing"]["input_scale"] == 0.0625
+    artifact = load_predictor(str(tmp_path / "model.mlm"))
+    np.testing.assert_array_equal(artifact.predict_proba(X), NumpyMLP(str(tmp_path / "model.npz")).predict_proba(X))
+    np.testing.assert_array_equal(artifact.classes, [0, 1, 2, 3])
+
+
+def test_torch_export_matches(tmp_path):
+    torch = pytest.importorskip("torch")
+    from train import Net
+
+    torch.manual_seed(0)
+    net = Net(hidden=32, depth=2)
+    torch.save(net.state_dict(), tmp_path / "model_final.pt")
+    export_npz(str(tmp_path / "model_final.pt"), str(tmp_path / "model.npz"))
+    X = np.random.default_rng(0).random((100, 64), dtype=np.float32)
+    with torch.no_grad():
+        expected = torch.softmax(net(torch.from_numpy(X)), dim=1).numpy()
+    np.testing.assert_allclose(load_predictor(str(tmp_path / "model.npz")).predict_proba(X), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_predict_with_npz_does_not_import_torch(tmp_path):
+    X = np.random.default_rng(0).random((50, 64), dtype=np.float32)
+    path = _save_sklearn(tmp_path, X, np.arange(50) % 3)
+    export_npz(path, str(tmp_path / "model.npz"))
+    np.save(tmp_path / "x.npy", X)
+    code = ("import sys, runpy; sys.argv = ['predict.py', '--model-path', sys.argv[1], '--input', sys.argv[2], '--output', sys.argv[3]]; "
+            "runpy.run_path('predict.py', run_name='__main__'); "
+            "print(sorted({m.split('.')[0] for m in sys.modules} & {'torch', 'sklearn', 'train', 'joblib'}))")
+    out = subprocess.run([sys.executable, "-c", code, str(tmp_path / "model.npz"), str(tmp_path / "x.npy"), str(tmp_path / "p.npy")],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == "[]"
+    assert len(np.load(tmp_path / "p.npy")) == 50
+
+
+def test_train_export_artifact_records_digits_scale(tmp_path):
+    from sklearn.datasets import load_digits
+
+    from train import DIGITS_SCALE
+
+    subprocess.run([sys.executable, "train.py", "--backend", "sklearn", "--save-dir", str(tmp_path), "--export-artifact", "--patience", "1"],
+                   cwd=ROOT, capture_output=True, check=True)
+    assert read_header(str(tmp_path / "model.mlm"))["preprocessing"]["input_scale"] == DIGITS_SCALE
+    # predict.py con píxeles 0-16 sin --input-scale da lo mismo que el modelo original con las features de entrenamiento
+    X = load_digits().data[:50].astype(np.float32)
+    np.save(tmp_path / "raw.npy", X)
+    subprocess.run([sys.executable, "predict.py", "--model-path", str(tmp_path / "model.mlm"), "--input", str(tmp_path / "raw.npy"),
+                    "--output", str(tmp_path / "p.npy"), "--no-thread-profile"], cwd=ROOT, capture_output=True, check=True)
+    original = load_predictor(str(tmp_path / "sklearn_mlp.joblib"))
+    np.testing.assert_allclose(np.load(tmp_path / "p_proba.npy"), original.predict_proba(X * DIGITS_SCALE), rtol=1e-4, atol=1e-6)
@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from train import load_data, train_torch  # noqa: E402
+
+
+def test_profile_jsonl_per_epoch(tmp_path):
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    path = tmp_path / "profile.jsonl"
+    train_torch(X_train[:256], X_val, X_test, y_train[:256], y_val, y_test, epochs=2, batch_size=64, patience=5,
+                save_dir=str(tmp_path / "ckpt"), profile_path=str(path))
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["epoch"] for r in records] == [1, 2]
+    for r in records:
+        assert r["steps"] == 4 and r["samples"] == 256
+        assert r["samples_per_sec"] > 0
+        assert {"data", "forward", "backward", "optimizer", "eval", "checkpoint"} <= set(r["phases_s"])
+        assert "val_accuracy" in r
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from model_export import load_torchscript
+import quantize
+from quantize import accuracy, quantize_dynamic_net, quantize_static_net, save_quantized
+from train import Net, load_data, train_torch
+
+
+def test_dynamic_and_static_quantization_roundtrip(tmp_path):
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    torch.manual_seed(0)
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=3, batch_size=64, save_dir=str(tmp_path), seed=0)
+    net = Net()
+    net.load_state_dict(torch.load(tmp_path / "best_model.pt")["model_state_dict"])
+    net.eval()
+    acc_fp32 = accuracy(net, X_test, y_test)
+
+    for qmodel in (quantize_dynamic_net(net), quantize_static_net(net, X_val[:128])):
+        assert abs(accuracy(qmodel, X_test, y_test) - acc_fp32) < 0.05
+        path = str(tmp_path / "model_int8.ts")
+        save_quantized(qmodel, path, torch.zeros(1, 64), model_config={"input_dim": 64})
+        loaded, config = load_torchscript(path)
+        assert config["quantized_engine"] == torch.backends.quantized.engine
+        x = torch.from_numpy(X_test[:32])
+        with torch.no_grad():
+            torch.testing.assert_close(loaded(x), qmodel(x))
+
+
+def test_main_evaluates_on_data_shards(tmp_path, capsys):
+    from sklearn.datasets import load_digits
+
+    from shards import load_shards
+
+    X, y = load_digits(return_X_y=True)
+    for i, idx in enumerate(np.array_split(np.arange(len(y)), 3)):
+        np.savez(tmp_path / f"part{i}.npz", X=X[idx].astype("float32"), y=y[idx])
+    torch.manual_seed(0)
+    net = Net()
+    torch.save({"model_state_dict": net.state_dict()}, tmp_path / "best_model.pt")
+
+    quantize.main(["--checkpoint", str(tmp_path / "best_model.pt"), "--static", "--calib-size", "64",
+                   "--data", str(tmp_path), "--data-scale", "0.0625"])
+    X_train, X_val, X_test, y_train, y_val, y_test = load_shards(str(tmp_path), scale=0.0625)
+    net.eval()
+    assert f"Accuracy test fp32: {accuracy(net, X_test, y_test):.4f}" in capsys.readouterr().out
+    assert (tmp_path / "model_int8.ts").exists()
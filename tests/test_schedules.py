@@ -0,0 +1,61 @@
+import pytest
+
+from schedules import lr_at, scale_lr
+from train import load_data
+
+
+def test_scale_lr_and_warmup():
+    assert scale_lr(1e-3, 256, "linear", base_batch_size=64) == pytest.approx(4e-3)
+    assert scale_lr(1e-3, 256, "sqrt", base_batch_size=64) == pytest.approx(2e-3)
+    assert scale_lr(1e-3, 256, "none") == 1e-3
+    with pytest.raises(ValueError):
+        scale_lr(1e-3, 256, "cubic")
+    assert [lr_at(s, 1.0, warmup_steps=4) for s in range(6)] == [0.25, 0.5, 0.75, 1.0, 1.0, 1.0]
+
+
+def test_accumulation_matches_large_batch(tmp_path):
+    torch = pytest.importorskip("torch")
+    from train import train_torch
+
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    # múltiplo de 64 para que no haya grupo incompleto al final de la epoch
+    X_train, y_train = X_train[:1216], y_train[:1216]
+    finals = []
+    for batch_size, accum_steps in ((64, 1), (16, 4)):
+        torch.manual_seed(0)
+        save_dir = tmp_path / f"bs{batch_size}"
+        train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=2, batch_size=batch_size, accum_steps=accum_steps,
+                    seed=0, save_dir=str(save_dir), checkpoint_queue=0)
+        finals.append(torch.load(save_dir / "model_final.pt"))
+    # misma permutación de datos y mismos grupos de 64 muestras -> mismos pesos salvo redondeo
+    for k in finals[0]:
+        torch.testing.assert_close(finals[0][k], finals[1][k], rtol=1e-4, atol=1e-5)
+
+
+def test_cosine_and_onecycle_shapes():
+    cos = [lr_at(s, 1.0, warmup_steps=2, schedule="cosine", total_steps=10) for s in range(11)]
+    assert cos[:2] == [0.5, 1.0] and cos[-1] == pytest.approx(0.0)
+    assert all(a >= b for a, b in zip(cos[1:], cos[2:]))
+    one = [lr_at(s, 1.0, schedule="onecycle", total_steps=10) for s in range(11)]
+    assert one[0] == pytest.approx(1 / 25) and max(one) == pytest.approx(1.0) and one[-1] < 1e-4
+    with pytest.raises(ValueError):
+        lr_at(5, 1.0, schedule="triangular")
+
+
+def test_target_accuracy_and_lr_range_test():
+    torch = pytest.importorskip("torch")
+    from input_pipeline import make_train_loader
+    from lr_finder import lr_range_test, suggest_lr
+    from train import Net, train_torch
+
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+    accs = []
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=20, lr=1e-2, lr_schedule="onecycle", patience=20, seed=0,
+                target_accuracy=0.5, epoch_callback=lambda e, m: accs.append(m["val_accuracy"]))
+    assert accs[-1] >= 0.5 and len(accs) < 20
+
+    torch.manual_seed(0)
+    lrs, losses, smoothed = lr_range_test(Net(), make_train_loader(X_train, y_train, 64, seed=0), min_lr=1e-5, max_lr=10.0, steps=60)
+    assert lrs[0] == pytest.approx(1e-5) and len(lrs) == len(smoothed) <= 60
+    steepest, min_div10 = suggest_lr(lrs, smoothed)
+    assert 1e-5 <= steepest <= 10.0 and 1e-6 <= min_div10 <= 1.0
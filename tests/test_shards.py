@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from sklearn.datasets import load_digits
+
+from shards import BatchStream, ShardedDataset, load_shards
+from train import load_data, train_sklearn
+
+
+def write_digits_shards(path, n_shards=4):
+    X, y = load_digits(return_X_y=True)
+    X = X.astype("float32")
+    parts = np.array_split(np.arange(len(y)), n_shards)
+    for i, idx in enumerate(parts):
+        if i % 3 == 0:
+            np.savez(path / f"part{i}.npz", X=X[idx], y=y[idx])
+        elif i % 3 == 1:
+            np.savez_compressed(path / f"part{i}.npz", X=X[idx], y=y[idx])
+        else:
+            np.save(path / f"part{i}_X.npy", X[idx])
+            np.save(path / f"part{i}_y.npy", y[idx])
+    return X, y
+
+
+def test_sharded_split_by_index(tmp_path):
+    X, y = write_digits_shards(tmp_path)
+    ds = ShardedDataset(str(tmp_path))
+    assert len(ds) == len(y)
+    # el .npz sin comprimir y los .npy se mapean en memoria
+    assert isinstance(ds.shards[0].features(), np.memmap)
+    assert isinstance(ds.shards[2].features(), np.memmap)
+
+    train, val, test = ds.split(test_size=0.2, val_size=0.1)
+    all_idx = np.concatenate([train.indices, val.indices, test.indices])
+    assert len(np.unique(all_idx)) == len(y)
+    # estratificado: todas las clases en cada split
+    for part in (train, val, test):
+        assert set(np.unique(part.y)) == set(range(10))
+
+    # los batches cubren todas las filas del split con las features correctas
+    seen = []
+    for Xb, yb in train.iter_batches(100, shuffle=True, seed=0):
+        assert len(Xb) <= 100
+        seen.append(yb)
+    assert sum(len(b) for b in seen) == len(train)
+    Xs = np.concatenate([Xb for Xb, _ in train.iter_batches(64)])
+    np.testing.assert_array_equal(Xs, X[train.indices])
+
+
+def test_train_sklearn_on_shards(tmp_path):
+    write_digits_shards(tmp_path)
+    X_train, X_val, X_test, y_train, y_val, y_test = load_shards(str(tmp_path), scale=1 / 16.0)
+    train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=None, patience=1, batch_size=128)
+
+
+def test_train_torch_on_shards(tmp_path):
+    pytest.importorskip("torch")
+    from train import train_torch
+
+    write_digits_shards(tmp_path)
+    X_train, X_val, X_test, y_train, y_val, y_test = load_shards(str(tmp_path), scale=1 / 16.0)
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=2, batch_size=64, save_dir=str(tmp_path / "ckpt"), patience=1)
+    assert (tmp_path / "ckpt" / "best_model.pt").exists()
+
+
+def test_train_sklearn_streaming_from_iterators():
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data()
+
+    def chunks(X, y, size=100):
+        return lambda: ((X[i:i + size], y[i:i + size]) for i in range(0, len(X), size))
+
+    # fuentes que solo se pueden recorrer como iteradores de bloques
+    train = BatchStream(chunks(X_train, y_train), classes=np.arange(10))
+    val = BatchStream(chunks(X_val, y_val))
+    test = BatchStream(chunks(X_test, y_test))
+    accs = []
+    train_sklearn(train, val, test, None, None, None, patience=2, batch_size=64,
+                  epoch_callback=lambda epoch, m: accs.append(m["val_accuracy"]))
+    assert max(accs) > 0.8
+
+    # el mismo camino con arrays en memoria
+    train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, patience=1, batch_size=64, streaming=True)
@@ -0,0 +1,25 @@
+import numpy as np
+
+from split_cache import split_key
+from train import load_data
+
+
+def test_load_data_cache_roundtrip(tmp_path):
+    fresh = load_data(use_cache=False)
+    first = load_data(use_cache=True, cache_dir=str(tmp_path))
+    cached = load_data(use_cache=True, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    for a, b in zip(fresh, cached):
+        assert isinstance(b, np.memmap)
+        np.testing.assert_array_equal(a, b)
+    np.testing.assert_array_equal(first[0], cached[0])
+
+    # otros parámetros -> otra entrada; sin validación X_val/y_val son None
+    no_val = load_data(val_size=0.0, use_cache=True, cache_dir=str(tmp_path))
+    assert no_val[1] is None and no_val[4] is None
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_split_key_depends_on_params():
+    assert split_key(dataset="digits", test_size=0.2) == split_key(test_size=0.2, dataset="digits")
+    assert split_key(dataset="digits", test_size=0.2) != split_key(dataset="digits", test_size=0.3)
@@ -0,0 +1,45 @@
+import threading
+
+from sweep import Pruner, build_trials, parse_values, run_sweep
+
+
+def test_build_trials_grid_and_random():
+    space = {"lr": parse_values("lr", "1e-3,1e-2"), "hidden": parse_values("hidden", "32,64,128")}
+    assert len(build_trials(space, mode="grid")) == 6
+
+    space["lr"] = parse_values("lr", "1e-4:1e-2")
+    trials = build_trials(space, mode="random", n_trials=5, seed=1)
+    assert len(trials) == 5
+    assert all(1e-4 <= t["lr"] <= 1e-2 and t["hidden"] in (32, 64, 128) for t in trials)
+
+
+def test_median_pruner():
+    pruner = Pruner("median", {}, threading.Lock(), warmup=1, min_trials=3)
+    for acc in (0.8, 0.9, 0.85):
+        assert not pruner.should_prune(2, acc)
+    assert pruner.should_prune(2, 0.5)
+    assert not pruner.should_prune(2, 0.95)
+
+
+def test_halving_pruner_keeps_top_fraction():
+    pruner = Pruner("halving", {}, threading.Lock(), eta=2, min_epochs=1)
+    assert not pruner.should_prune(1, 0.6)
+    # en la rung 1 con dos resultados solo continúa el mejor
+    assert pruner.should_prune(1, 0.5)
+    assert not pruner.should_prune(1, 0.9)
+    # la epoch 3 no es rung con eta=2 (rungs: 1, 2, 4, ...)
+    assert not pruner.should_prune(3, 0.1)
+
+
+def test_run_sweep_sklearn(tmp_path):
+    trials = build_trials({"lr": [1e-3], "batch_size": [64], "hidden": [16, 32], "patience": [1]})
+    rows = run_sweep(trials, backend="sklearn", workers=1, pruner="none", out_dir=str(tmp_path))
+    assert len(rows) == 2
+    assert rows[0]["best_val_acc"] >= rows[1]["best_val_acc"]
+    assert (tmp_path / "sweep_results.csv").exists()
+
+
+def test_sklearn_trial_stops_at_epochs(tmp_path):
+    trials = build_trials({"lr": [1e-3], "batch_size": [64], "hidden": [16], "patience": [100]})
+    rows = run_sweep(trials, backend="sklearn", epochs=3, workers=1, pruner="none", out_dir=str(tmp_path))
+    assert rows[0]["epochs"] == 3
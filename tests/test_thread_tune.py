@@ -0,0 +1,67 @@
+import pytest
+
+from thread_tune import apply_profile, available_cpus, candidate_threads, load_profile, save_profile
+
+
+def test_candidate_threads():
+    assert candidate_threads(1) == [1]
+    assert candidate_threads(6) == [1, 2, 4, 6]
+    assert candidate_threads(64) == [1, 2, 4, 8, 16, 32, 64]
+
+
+def test_profile_roundtrip_and_apply(tmp_path):
+    torch = pytest.importorskip("torch")
+    path = str(tmp_path / "threads.json")
+    assert load_profile(path) is None
+    profile = {"version": 1, "n_cpus": len(available_cpus()),
+               "modes": {"predict": {"intra": 1, "interop": 1, "affinity": "none", "batch_size": 1024, "samples_per_sec": 1.0}}}
+    save_profile(profile, path)
+    assert load_profile(path) == profile
+
+    messages = []
+    threads = torch.get_num_threads()
+    try:
+        assert apply_profile("predict", path=path, log=messages.append)["intra"] == 1
+        assert torch.get_num_threads() == 1 and messages
+    finally:
+        torch.set_num_threads(threads)
+    assert apply_profile("train", path=path) is None
+
+    # un perfil de otro host (otro número de CPUs) no se aplica
+    save_profile(dict(profile, n_cpus=profile["n_cpus"] + 1), path)
+    assert apply_profile("predict", path=path, log=messages.append) is None
+
+
+def test_pinned_profile_needs_cpu_slot(tmp_path, monkeypatch):
+    path = str(tmp_path / "threads.json")
+    save_profile({"version": 1, "n_cpus": len(available_cpus()),
+                  "modes": {"train": {"intra": 1, "interop": 1, "affinity": "pinned", "batch_size": 64, "samples_per_sec": 1.0}}}, path)
+    monkeypatch.delenv("ML_CPU_SLOT", raising=False)
+    monkeypatch.setattr("thread_tune.set_threads", lambda intra, interop=None: None)
+    before = available_cpus()
+    messages = []
+    assert apply_profile("train", path=path, log=messages.append)["affinity"] == "pinned"
+    assert available_cpus() == before and "ML_CPU_SLOT" in messages[0]
+
+
+def test_autotune_picks_best_per_mode():
+    pytest.importorskip("torch")
+    from thread_tune import autotune
+
+    profile = autotune(modes=["predict"], threads=[1], interops=[1], affinities=["none"], predict_batch=64, seconds=0.05, log=lambda m: None)
+    assert set(profile["modes"]) == {"predict"}
+    best = profile["modes"]["predict"]
+    assert best["intra"] == 1 and best["samples_per_sec"] > 0
+    assert len(profile["results"]) == 1
+
+
+def test_ddp_ranks_get_disjoint_cpu_blocks(monkeypatch):
+    pytest.importorskip("torch")
+    import train
+
+    calls = []
+    monkeypatch.setattr("train.available_cpus", lambda: list(range(8)))
+    monkeypatch.setattr("os.sched_setaffinity", lambda pid, cpus: calls.append(list(cpus)), raising=False)
+    assert [train._pin_rank_cpus(rank, 3) for rank in range(3)] == [[0, 1], [2, 3], [4, 5]]
+    assert calls == [[0, 1], [2, 3], [4, 5]]
+    assert train._pin_rank_cpus(0, 9) is None and len(calls) == 3
@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 from train import train_sklearn, load_data
 
 
@@ -17,3 +18,96 @@ def test_train_sklearn_quick():
     train_sklearn(Xtr, Xv, Xt, ytr, yv, yt, save_dir=None, patience=1, monitor='accuracy', tb_writer=None)
     # If no exception, consider test passed
     assert True
+
+
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+def test_train_sklearn_uses_batch_size(tmp_path):
+    import joblib
+
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data(test_size=0.2, val_size=0.1)
+    train_sklearn(X_train[:80], X_val[:20], X_test[:20], y_train[:80], y_val[:20], y_test[:20], save_dir=str(tmp_path), patience=1, batch_size=16)
+    assert joblib.load(tmp_path / "sklearn_final.joblib").batch_size == 16
+
+
+def test_train_distributed_two_procs(tmp_path):
+    pytest.importorskip("torch")
+    from train import train_distributed
+
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data(test_size=0.2, val_size=0.1)
+    train_distributed(X_train[:200], X_val, X_test, y_train[:200], y_val, y_test, nprocs=2, threads_per_proc=1, seed=0,
+                      epochs=1, batch_size=32, save_dir=str(tmp_path), patience=1)
+    # solo el rank 0 guarda
+    assert (tmp_path / "best_model.pt").exists()
+    assert (tmp_path / "model_final.pt").exists()
+
+
+def test_train_distributed_with_accumulation(tmp_path):
+    torch = pytest.importorskip("torch")
+    from train import train_distributed
+
+    # 203 filas: los ranks tienen distinto número de micro-batches (join + no_sync) y sobran batches al final de la epoch
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data(test_size=0.2, val_size=0.1)
+    train_distributed(X_train[:203], X_val, X_test, y_train[:203], y_val, y_test, nprocs=2, threads_per_proc=1, seed=0,
+                      epochs=2, batch_size=16, accum_steps=3, save_dir=str(tmp_path), patience=5)
+    state = torch.load(tmp_path / "model_final.pt")
+    assert all(torch.isfinite(v).all() for v in state.values())
+    assert (tmp_path / "checkpoint_epoch2.pt").exists()
+
+
+def _count_allreduce_worker(rank, port, accum_steps, out_path):
+    import os
+    import torch
+    import torch.distributed as dist
+    import train
+
+    os.environ.update(MASTER_ADDR="127.0.0.1", MASTER_PORT=str(port))
+    dist.init_process_group("gloo", rank=rank, world_size=2)
+    torch.set_num_threads(1)
+    calls = [0]
+
+    class CountingDDP(train.DDP):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+
+            def hook(state, bucket):
+                calls[0] += 1
+                fut = dist.all_reduce(bucket.buffer().div_(2), async_op=True).get_future()
+                return fut.then(lambda f: f.value()[0])
+            self.register_comm_hook(None, hook)
+
+    train.DDP = CountingDDP
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data(test_size=0.2, val_size=0.1)
+    train.train_torch(X_train[:640], X_val, X_test, y_train[:640], y_val, y_test, epochs=1, batch_size=16, accum_steps=accum_steps,
+                      seed=0, device=torch.device("cpu"), patience=5)
+    if rank == 0:
+        with open(out_path, "w") as f:
+            f.write(str(calls[0]))
+    dist.destroy_process_group()
+
+
+def test_ddp_accumulation_syncs_once_per_step(tmp_path):
+    pytest.importorskip("torch")
+    import torch.multiprocessing as mp
+    from train import _free_port
+
+    # 320 filas por rank / batch 16 = 20 micro-batches -> 5 steps con accum_steps=4: un all-reduce por step
+    mp.spawn(_count_allreduce_worker, args=(_free_port(), 4, str(tmp_path / "calls")), nprocs=2, join=True)
+    assert (tmp_path / "calls").read_text() == "5"
+
+
+def test_train_torch_bf16_checkpoints_stay_fp32(tmp_path):
+    torch = pytest.importorskip("torch")
+    from train import train_torch
+
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data(test_size=0.2, val_size=0.1)
+    torch.manual_seed(0)
+    accs = []
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=2, batch_size=64, save_dir=str(tmp_path), patience=5,
+                seed=0, amp="bf16", epoch_callback=lambda e, m: accs.append(m["val_accuracy"]))
+    assert accs[-1] > 0.8
+    ckpt = torch.load(tmp_path / "checkpoint_epoch2.pt")
+    assert all(v.dtype == torch.float32 for v in ckpt["model_state_dict"].values())
+    # un checkpoint bf16 se reanuda en fp32 (y viceversa) sin conversión
+    train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=3, batch_size=64, save_dir=str(tmp_path), patience=5,
+                resume_path=str(tmp_path / "checkpoint_epoch2.pt"), amp="none")
+    assert (tmp_path / "checkpoint_epoch3.pt").exists()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Ajuste automático de hilos de CPU para `Net` (entrenamiento e inferencia).
+
+`python train.py autotune` mide con datos sintéticos cada combinación de:
+- hilos intra-op (`torch.set_num_threads`),
+- hilos inter-op (`torch.set_num_interop_threads`),
+- afinidad de CPU: `none` (sin fijar) o `pinned` (el proceso se fija a un bloque contiguo de
+  tantas CPUs como hilos intra-op),
+para dos cargas: `train` (forward + backward + Adam con `--batch-size`) y `predict` (forward
+sin gradientes con `--predict-batch`). Cada combinación se mide en un proceso nuevo, porque los
+hilos inter-op solo se pueden fijar una vez por proceso. La mejor combinación de cada carga
+(más samples/sec) se guarda en un perfil JSON.
+
+Con `--concurrent K` se limitan los hilos a CPUs/K, para hosts donde se lanzan K entrenamientos
+o inferencias a la vez sin sobresuscribir los cores. Una configuración `pinned` solo fija CPUs si
+el proceso indica su bloque con `$ML_CPU_SLOT` (0..K-1); sin esa variable se aplican los hilos pero
+no la afinidad, porque todos los procesos acabarían en el mismo bloque (y la afinidad la heredan
+los workers del DataLoader y los pools de sweep/kfold).
+
+`train.py` y `predict.py` cargan el perfil al arrancar (`apply_profile`), salvo que se indique
+`--threads` o `--no-thread-profile`. El perfil se ignora si se generó con otro número de CPUs.
+Ruta por defecto: `~/.cache/my-ml/threads.json` (o `$ML_THREAD_PROFILE`).
+
+Uso:
+    python train.py autotune
+    python train.py autotune --concurrent 4 --threads 1,2,4,8,16
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+
+PROFILE_VERSION = 1
+MODES = ("train", "predict")
+AFFINITIES = ("none", "pinned")
+
+
+def default_profile_path():
+    return os.environ.get("ML_THREAD_PROFILE", os.path.join(os.path.expanduser("~"), ".cache", "my-ml", "threads.json"))
+
+
+def available_cpus():
+    """CPUs que puede usar este proceso (respeta taskset/cgroups en Linux)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def candidate_threads(n_cpus):
+    """Potencias de 2 hasta `n_cpus`, más `n_cpus`."""
+    out, t = [], 1
+    while t < n_cpus:
+        out.append(t)
+        t *= 2
+    return out + [n_cpus]
+
+
+def pin_cpus(n_threads, slot=0, cpus=None):
+    """Fija el proceso al bloque `slot` de `n_threads` CPUs contiguas. Devuelve las CPUs o None si no se pudo."""
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    cpus = cpus if cpus is not None else available_cpus()
+    if n_threads > len(cpus):
+        return None
+    n_blocks = len(cpus) // n_threads
+    block = cpus[(slot % n_blocks) * n_threads:(slot % n_blocks + 1) * n_threads]
+    try:
+        os.sched_setaffinity(0, block)
+    except OSError:
+        return None
+    return block
+
+
+def set_threads(intra, interop=None):
+    """Hilos de torch y de BLAS (numpy/sklearn). Los inter-op solo se pueden cambiar antes del primer trabajo paralelo.
+
+    torch solo se configura si ya está importado (importarlo cuesta segundos y un proceso de sklearn no lo necesita):
+    hay que llamar a esta función después de cargar el modelo.
+    """
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(intra)
+        if interop:
+            try:
+                torch.set_num_interop_threads(interop)
+            except RuntimeError:
+                pass
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=intra)
+    except Exception:
+        pass
+
+
+def _bench_config(config, mode, batch_size, hidden, depth, input_dim, num_classes, seconds, seed):
+    """Se ejecuta en un proceso hijo: samples/sec de `Net` con la configuración de hilos dada."""
+    if config["affinity"] == "pinned" and pin_cpus(config["intra"]) is None:
+        return None
+    import torch
+    import torch.nn as nn
+    import torch.optim as optim
+    from train import Net
+
+    set_threads(config["intra"], config["interop"])
+
+    torch.manual_seed(seed)
+    net = Net(input_dim=input_dim, hidden=hidden, num_classes=num_classes, depth=depth)
+    x = torch.rand(batch_size, input_dim)
+    y = torch.randint(0, num_classes, (batch_size,))
+    if mode == "train":
+        opt = optim.Adam(net.parameters(), lr=1e-3)
+        loss_fn = nn.CrossEntropyLoss()
+
+        def step():
+            opt.zero_grad()
+            loss_fn(net(x), y).backward()
+            opt.step()
+    else:
+        net.eval()
+
+        def step():
+            with torch.no_grad():
+                net(x)
+
+    for _ in range(10):
+        step()
+    # 5 tramos de ~seconds/5 cada uno; se usa la mediana para filtrar ruido de otros procesos
+    rates = []
+    for _ in range(5):
+        n, t0 = 0, time.perf_counter()
+        while time.perf_counter() - t0 < seconds / 5:
+            step()
+            n += 1
+        rates.append(n * batch_size / (time.perf_counter() - t0))
+    return statistics.median(rates)
+
+
+def autotune(modes=MODES, threads=None, interops=(1, 2), affinities=AFFINITIES, concurrent=1, batch_size=64, predict_batch=1024,
+             hidden=128, depth=1, input_dim=64, num_classes=10, seconds=1.0, seed=0, log=print):
+    """Mide todas las combinaciones y devuelve el perfil ({"modes": {modo: mejor config}, "results": [...]})."""
+    cpus = available_cpus()
+    budget = max(1, len(cpus) // max(1, concurrent))
+    threads = sorted({t for t in (threads or candidate_threads(budget)) if t <= budget}) or [budget]
+    ctx = multiprocessing.get_context("spawn")
+    results, best = [], {}
+    for mode in modes:
+        bs = batch_size if mode == "train" else predict_batch
+        for intra, interop, affinity in itertools.product(threads, interops, affinities):
+            config = {"intra": intra, "interop": interop, "affinity": affinity}
+            with ctx.Pool(1) as pool:
+                rate = pool.apply(_bench_config, (config, mode, bs, hidden, depth, input_dim, num_classes, seconds, seed))
+            if rate is None:
+                continue
+            row = dict(config, mode=mode, batch_size=bs, samples_per_sec=round(rate, 1))
+            results.append(row)
+            log(f"[autotune] {mode:>7}: intra={intra:<3} interop={interop} affinity={affinity:<6} {rate:12.0f} samples/s")
+            if mode not in best or rate > best[mode]["samples_per_sec"]:
+                best[mode] = row
+    return {
+        "version": PROFILE_VERSION,
+        "host": platform.node(),
+        "n_cpus": len(cpus),
+        "concurrent": concurrent,
+        "net": {"hidden": hidden, "depth": depth, "input_dim": input_dim},
+        "modes": {m: {k: best[m][k] for k in ("intra", "interop", "affinity", "batch_size", "samples_per_sec")} for m in best},
+        "results": results,
+    }
+
+
+def save_profile(profile, path=None):
+    path = path or default_profile_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_profile(path=None):
+    """El perfil guardado o None si no existe, no se puede leer o es de otra versión."""
+    path = path or default_profile_path()
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return profile if profile.get("version") == PROFILE_VERSION else None
+
+
+def profile_config(mode, path=None, log=print):
+    """La configuración de `mode` del perfil, sin aplicarla; None si no hay perfil o es de otro número de CPUs."""
+    profile = load_profile(path)
+    if profile is None or mode not in profile.get("modes", {}):
+        return None
+    n_cpus = len(available_cpus())
+    if profile.get("n_cpus") != n_cpus:
+        log(f"Perfil de hilos ignorado: se generó con {profile.get('n_cpus')} CPUs y hay {n_cpus}")
+        return None
+    return profile["modes"][mode]
+
+
+def apply_profile(mode, path=None, log=print):
+    """Aplica la configuración de `mode` del perfil (hilos y afinidad). Devuelve la config aplicada o None.
+
+    La afinidad `pinned` solo se aplica con `$ML_CPU_SLOT` definido.
+    """
+    config = profile_config(mode, path=path, log=log)
+    if config is None:
+        return None
+    pinned, note = None, ""
+    if config["affinity"] == "pinned":
+        slot = os.environ.get("ML_CPU_SLOT")
+        if slot is None:
+            note = " (afinidad del perfil no aplicada: define $ML_CPU_SLOT para fijar CPUs)"
+        else:
+            pinned = pin_cpus(config["intra"], slot=int(slot))
+    set_threads(config["intra"], config["interop"])
+    log(f"Perfil de hilos ({mode}): {config['intra']} intra-op, {config['interop']} inter-op"
+        + (f", CPUs {pinned[0]}-{pinned[-1]}" if pinned else "") + note)
+    return config
+
+
+def apply_threads(mode, threads=None, use_profile=True, path=None, log=print):
+    """`--threads` explícito si se indica; si no, el perfil de `autotune` (si existe y `use_profile`)."""
+    if threads:
+        set_threads(threads)
+        return {"intra": threads}
+    return apply_profile(mode, path=path, log=log) if use_profile else None
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="train.py autotune", description="Ajuste automático de hilos de CPU para Net")
+    p.add_argument("--modes", type=str, default="train,predict", help="Cargas a medir: train y/o predict")
+    p.add_argument("--threads", type=str, default=None, help="Hilos intra-op a probar (por defecto potencias de 2 hasta CPUs/concurrent)")
+    p.add_argument("--interop", type=str, default="1,2", help="Hilos inter-op a probar")
+    p.add_argument("--affinity", type=str, default="none,pinned", help="Afinidades a probar: none, pinned")
+    p.add_argument("--concurrent", type=int, default=1, help="Procesos que se ejecutarán a la vez en el host")
+    p.add_argument("--batch-size", type=int, default=64, help="Batch de entrenamiento")
+    p.add_argument("--predict-batch", type=int, default=1024, help="Batch de inferencia")
+    p.add_argument("--hidden", type=int, default=128)
+    p.add_argument("--depth", type=int, default=1)
+    p.add_argument("--seconds", type=float, default=1.0, help="Duración de la medida de cada combinación")
+    p.add_argument("--out", type=str, default=None, help="Ruta del perfil (por defecto ~/.cache/my-ml/threads.json)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    modes = [m for m in args.modes.split(",") if m]
+    for m in modes:
+        if m not in MODES:
+            raise SystemExit(f"Modo desconocido: {m} (opciones: {', '.join(MODES)})")
+    affinities = [a for a in args.affinity.split(",") if a]
+    for a in affinities:
+        if a not in AFFINITIES:
+            raise SystemExit(f"Afinidad desconocida: {a} (opciones: {', '.join(AFFINITIES)})")
+    threads = [int(t) for t in args.threads.split(",")] if args.threads else None
+    profile = autotune(modes=modes, threads=threads, interops=[int(i) for i in args.interop.split(",")], affinities=affinities,
+                       concurrent=args.concurrent, batch_size=args.batch_size, predict_batch=args.predict_batch,
+                       hidden=args.hidden, depth=args.depth, seconds=args.seconds)
+    path = save_profile(profile, args.out)
+    for mode, config in profile["modes"].items():
+        print(f"Mejor ({mode}): {config['intra']} intra-op, {config['interop']} inter-op, afinidad {config['affinity']} "
+              f"({config['samples_per_sec']:.0f} samples/s)")
+    print(f"Perfil guardado en: {path}")
+
+
+if __name__ == "__main__":
+    main()
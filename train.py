@@ -6,6 +6,10 @@ Script base de entrenamiento.
 
 Uso:
     python train.py
+    python train.py sweep --lr 1e-3,3e-3 --hidden 64,128   (búsqueda de hiperparámetros, ver sweep.py)
+    python train.py distill --teacher checkpoints/best_model.pt --widths 16,32,64   (destilación, ver distill.py)
+    python train.py lr-find   (range test del learning rate, ver lr_finder.py)
+    python train.py kfold --folds 5 --workers 5   (validación cruzada en paralelo, ver kfold.py)
 
 Notas:
 - Instala dependencias con: pip install -r requirements.txt
@@ -15,29 +19,48 @@ Notas:
 import sys
 import numpy as np
 import argparse
+import contextlib
+import itertools
+import math
 import os
 import random
+import socket
+import time
+import sklearn
 from sklearn.datasets import load_digits
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
+from shards import ArrayBatches, ShardSubset, load_shards
+from schedules import SCALING_RULES, SCHEDULES, lr_at, scale_lr, set_lr
+from split_cache import cached_splits
+from metrics_sink import MetricsSink, TensorBoardBackend, open_sink
+from thread_tune import apply_threads, available_cpus, pin_cpus
+
 # Intentar usar PyTorch; si falla, usaremos scikit-learn
 try:
     import torch
     import torch.nn as nn
     import torch.optim as optim
-    from torch.utils.data import TensorDataset, DataLoader
+    import torch.distributed as dist
+    import torch.multiprocessing as mp
+    from torch.nn.parallel import DistributedDataParallel as DDP
+    from input_pipeline import make_train_loader, set_loader_epoch
+    from profiling import NullProfiler, TrainingProfiler
+    from checkpointing import AsyncCheckpointWriter, CheckpointRetention, capture_rng_state, restore_rng_state
+    from model_export import compile_model, export_torchscript as export_torchscript_model
+    from augment import BatchAugmenter
     USE_TORCH = True
 except Exception:
     USE_TORCH = False
 
 
-def load_data(test_size=0.2, val_size=0.1, random_state=42):
-    """Carga el dataset y devuelve splits: X_train, X_val, X_test, y_train, y_val, y_test.
-    val_size es la fracción del total dedicada a validación; test_size es fracción para test.
-    """
+DIGITS_SCALE = 1.0 / 16.0  # los píxeles de digits van de 0..16
+
+
+def _split_digits(test_size, val_size, random_state):
     X, y = load_digits(return_X_y=True)
-    X = X.astype("float32") / 16.0  # los píxeles van de 0..16
+    X = X.astype("float32") * DIGITS_SCALE
     # Primero separar test
     X_rest, X_test, y_rest, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
     # Ahora separar validación desde el resto
@@ -51,159 +74,501 @@ def load_data(test_size=0.2, val_size=0.1, random_state=42):
     return X_train, X_val, X_test, y_train, y_val, y_test
 
 
+def load_data(test_size=0.2, val_size=0.1, random_state=42, data_path=None, data_scale=None, use_cache=False, cache_dir=None):
+    """Carga el dataset y devuelve splits: X_train, X_val, X_test, y_train, y_val, y_test.
+    val_size es la fracción del total dedicada a validación; test_size es fracción para test.
+    Si se indica data_path (directorio/glob de shards .npy/.npz) las X son `ShardSubset`
+    memory-mapped en lugar de arrays en memoria (ver shards.py).
+    Con use_cache los splits de digits se leen de la caché en disco (memory-mapped, ver split_cache.py);
+    la primera vez se generan y se guardan en `cache_dir`. Desactivado por defecto para no escribir en $HOME
+    sin pedirlo: lo activan los CLI de `train.py` y `train.py sweep` (salvo `--no-cache`).
+    """
+    if data_path:
+        return load_shards(data_path, test_size=test_size, val_size=val_size, random_state=random_state, scale=data_scale)
+
+    if not use_cache:
+        return _split_digits(test_size, val_size, random_state)
+    return cached_splits(lambda: _split_digits(test_size, val_size, random_state), cache_dir=cache_dir,
+                         dataset="digits", test_size=test_size, val_size=val_size, random_state=random_state,
+                         preprocessing="float32/16", sklearn=sklearn.__version__)
+
+
 if USE_TORCH:
     class Net(nn.Module):
-        def __init__(self, input_dim=64, hidden=128, num_classes=10):
+        # depth: número de capas ocultas de `hidden` neuronas (con depth=1 los nombres de los pesos son los originales)
+        def __init__(self, input_dim=64, hidden=128, num_classes=10, depth=1):
             super().__init__()
-            self.net = nn.Sequential(
-                nn.Linear(input_dim, hidden),
-                nn.ReLU(),
-                nn.Linear(hidden, num_classes)
-            )
+            layers = [nn.Linear(input_dim, hidden), nn.ReLU()]
+            for _ in range(depth - 1):
+                layers += [nn.Linear(hidden, hidden), nn.ReLU()]
+            layers.append(nn.Linear(hidden, num_classes))
+            self.net = nn.Sequential(*layers)
 
         def forward(self, x):
             return self.net(x)
 
 
-    def train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=10, batch_size=64, lr=1e-3, save_dir=None, save_every=1, device=None, resume_path=None, tb_writer=None, patience=3, monitor="accuracy"):
+    def net_config_from_state(state_dict):
+        """Deduce input_dim/hidden/num_classes/depth de un state_dict plano de `Net`."""
+        weights = sorted((int(k.split(".")[1]), v) for k, v in state_dict.items() if k.startswith("net.") and k.endswith(".weight"))
+        first, last = weights[0][1], weights[-1][1]
+        return {"input_dim": int(first.shape[1]), "hidden": int(first.shape[0]), "num_classes": int(last.shape[0]), "depth": len(weights) - 1}
+
+
+    def distillation_loss(student_logits, teacher_logits, hard_loss, temperature=4.0, alpha=0.5):
+        """Loss de destilación (Hinton et al.): KL entre las distribuciones suavizadas con `temperature`
+        (escalada por T^2 para que los gradientes no dependan de T), mezclada con la loss de las etiquetas."""
+        soft = nn.functional.kl_div(nn.functional.log_softmax(student_logits / temperature, dim=1),
+                                    nn.functional.softmax(teacher_logits / temperature, dim=1), reduction="batchmean")
+        return alpha * soft * temperature ** 2 + (1 - alpha) * hard_loss
+
+
+    def predict_torch(model, X, device, batch_size=4096):
+        """Predicciones (argmax) para un array en memoria o, por bloques, para un `ShardSubset`."""
+        model.eval()
+        with torch.no_grad():
+            if isinstance(X, ShardSubset):
+                preds = [model(torch.from_numpy(Xb).to(device)).argmax(dim=1).cpu().numpy()
+                         for Xb, _ in X.iter_batches(batch_size)]
+                return np.concatenate(preds) if preds else np.empty(0, dtype=np.int64)
+            logits = model(torch.from_numpy(X).to(device))
+            return logits.argmax(dim=1).cpu().numpy()
+
+
+    def train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=10, batch_size=64, lr=1e-3, save_dir=None, save_every=1, device=None, resume_path=None, tb_writer=None, patience=3, monitor="accuracy", num_workers=0, prefetch_factor=2, persistent_workers=False, seed=None, checkpoint_queue=2, save_every_steps=0, keep_last=0, keep_best=0, hidden=128, depth=1, epoch_callback=None, profile_path=None, profile_trace_steps=0, profile_trace_start=5, amp=None, compile_net=False, export_torchscript=False, teacher=None, distill_temperature=4.0, distill_alpha=0.5, accum_steps=1, warmup_steps=0, lr_scaling="none", base_batch_size=64, lr_schedule="constant", target_accuracy=None, augment=None, metrics=None, log_histograms=False):
+        # epoch_callback(epoch, metrics) se llama tras evaluar cada epoch; si devuelve True se detiene el entrenamiento
+        # profile_path: JSONL con tiempos por fase, samples/sec y pico de RSS por epoch (ver profiling.py)
+        # amp="bf16": forward y loss bajo autocast en bfloat16; los pesos, gradientes, el optimizador y los checkpoints
+        # siguen en fp32. bf16 tiene el mismo rango de exponente que fp32, así que no hace falta escalar la loss (GradScaler).
+        # compile_net: entrenar con torch.compile (o TorchScript si no está disponible); export_torchscript: al terminar,
+        # guardar el mejor modelo congelado en save_dir/model_scripted.ts para servirlo sin train.py (ver model_export.py)
+        # teacher: modelo ya entrenado; si se indica, se entrena a este modelo (el estudiante) con las soft targets del teacher
+        # (ver distillation_loss y distill.py)
+        # accum_steps: acumular gradientes de `accum_steps` batches por cada step del optimizador (batch efectivo =
+        # batch_size * accum_steps * procesos). lr_scaling ("linear"/"sqrt") escala `lr` desde `base_batch_size` a ese
+        # batch efectivo y warmup_steps sube el LR linealmente durante los primeros steps del optimizador (ver schedules.py).
+        # lr_schedule: "constant", "cosine" u "onecycle" sobre el total de steps de `epochs` epochs (ver schedules.py).
+        # target_accuracy: detener en cuanto la accuracy de validación llegue a ese valor (informa del tiempo hasta lograrlo).
+        # augment: dict con max_shift/max_rotation/noise_std para aumentar cada batch de entrenamiento con `BatchAugmenter`
+        # (ops de tensor sobre el batch entero; el coste medio por step se muestra en el log de cada epoch)
+        # metrics: MetricsSink (metrics_sink.py) donde registrar las métricas por epoch sin bloquear el entrenamiento;
+        # un `tb_writer` se envuelve en uno. log_histograms: registrar además histogramas de los pesos en cada epoch.
+        # Si torch.distributed está inicializado (train_distributed), este proceso es un rank de DDP:
+        # cada rank entrena sobre su parte de los datos y solo el rank 0 imprime, guarda y escribe en TensorBoard.
+        world_size = dist.get_world_size() if dist.is_available() and dist.is_initialized() else 1
+        rank = dist.get_rank() if world_size > 1 else 0
+        is_main = rank == 0
+        log = print if is_main else (lambda *a, **k: None)
+        if not is_main:
+            save_dir = None
+            tb_writer = None
+            metrics = None
+        own_metrics = metrics is None and tb_writer is not None
+        if own_metrics:
+            metrics = MetricsSink([TensorBoardBackend(writer=tb_writer)])
+
         # device: torch.device or None (auto)
         if device is None:
             device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"Usando PyTorch en: {device}")
-
-        X_train_t = torch.from_numpy(X_train)
-        y_train_t = torch.from_numpy(y_train).long()
-        X_test_t = torch.from_numpy(X_test)
-        y_test_t = torch.from_numpy(y_test).long()
-
-        train_ds = TensorDataset(X_train_t, y_train_t)
-        train_dl = DataLoader(train_ds, batch_size=batch_size, shuffle=True)
-
-        # tensores de validación y test
-        X_val_t = torch.from_numpy(X_val) if X_val is not None else None
-        y_val_t = torch.from_numpy(y_val).long() if y_val is not None else None
-        X_test_t = torch.from_numpy(X_test)
-        y_test_t = torch.from_numpy(y_test).long()
-
-        model = Net().to(device)
+        t_start = time.perf_counter()
+        log(f"Usando PyTorch en: {device}" + (f" ({world_size} procesos)" if world_size > 1 else ""))
+
+        if amp not in (None, "none", "bf16"):
+            raise ValueError(f"amp no soportado: {amp} (usa 'bf16')")
+        use_amp = amp == "bf16"
+        if use_amp:
+            log("Precisión mixta: autocast bfloat16 (pesos maestros en fp32)")
+
+        prof = NullProfiler()
+        if is_main and (profile_path or profile_trace_steps > 0):
+            prof = TrainingProfiler(profile_path, tb_writer=metrics, trace_steps=profile_trace_steps,
+                                    trace_start=profile_trace_start, sync_cuda=(device.type == "cuda"))
+
+        # `net` es el modelo en sí (se guarda/evalúa); `model` puede ser su envoltorio DDP
+        model_config = {"input_dim": int(X_train.shape[1]), "hidden": int(hidden), "num_classes": int(y_train.max()) + 1, "depth": int(depth)}
+        net = Net(**model_config).to(device)
+        model = net
         loss_fn = nn.CrossEntropyLoss()
-        opt = optim.Adam(model.parameters(), lr=lr)
-
-        # Crear directorio de guardado si se especifica
+        if teacher is not None:
+            teacher = teacher.to(device).eval()
+        augmenter = BatchAugmenter.for_input_dim(model_config["input_dim"], **augment) if augment else None
+        if augmenter is not None and not augmenter.enabled:
+            augmenter = None
+        accum_steps = max(1, int(accum_steps))
+        peak_lr = scale_lr(lr, batch_size * accum_steps * world_size, rule=lr_scaling, base_batch_size=base_batch_size)
+        if accum_steps > 1 or peak_lr != lr or warmup_steps > 0:
+            log(f"Batch efectivo: {batch_size * accum_steps * world_size} ({accum_steps} pasos de acumulación), "
+                f"lr: {peak_lr:.3g}" + (f", warmup de {warmup_steps} steps" if warmup_steps > 0 else ""))
+        opt = optim.Adam(net.parameters(), lr=peak_lr)
+        # steps del optimizador por epoch (para cosine/onecycle); con DDP cada rank ve ~1/world_size de los datos
+        micro_per_epoch = math.ceil(math.ceil(len(y_train) / world_size) / batch_size)
+        steps_per_epoch = math.ceil(micro_per_epoch / accum_steps) if world_size == 1 else max(1, micro_per_epoch // accum_steps)
+        total_steps = steps_per_epoch * epochs
+
+        def current_lr(step):
+            return lr_at(step, peak_lr, warmup_steps, schedule=lr_schedule, total_steps=total_steps)
+
+        # Crear directorio de guardado si se especifica; los checkpoints se escriben en segundo plano
+        ckpt_writer = None
+        retention = None
         if save_dir:
             os.makedirs(save_dir, exist_ok=True)
+            ckpt_writer = AsyncCheckpointWriter(max_pending=checkpoint_queue)
+            retention = CheckpointRetention(save_dir, keep_last=keep_last, keep_best=keep_best, mode=("max" if monitor == "accuracy" else "min"))
+
+        best_value = None
+        if monitor == "accuracy":
+            best_value = -1.0
+        else:
+            best_value = float("inf")
+        no_improve = 0
 
         # Si se pide reanudar desde checkpoint
         start_epoch = 1
+        skip_batches = 0
+        global_step = 0
+        resumed = None
         if resume_path:
             if os.path.exists(resume_path):
                 ckpt = torch.load(resume_path, map_location=device)
                 if "model_state_dict" in ckpt:
-                    model.load_state_dict(ckpt.get("model_state_dict", {}))
+                    net.load_state_dict(ckpt.get("model_state_dict", {}))
                 if "optimizer_state_dict" in ckpt:
                     try:
                         opt.load_state_dict(ckpt["optimizer_state_dict"])
                     except Exception:
-                        print("Advertencia: no se pudo cargar el estado del optimizador del checkpoint.")
+                        log("Advertencia: no se pudo cargar el estado del optimizador del checkpoint.")
                 start_epoch = ckpt.get("epoch", 0) + 1
-                print(f"Reanudando desde checkpoint {resume_path}, comenzando en epoch {start_epoch}")
+                # checkpoints por step: continuar a mitad de epoch con el mismo orden de datos
+                skip_batches = ckpt.get("batch_in_epoch", 0)
+                global_step = ckpt.get("global_step", 0)
+                if "data_seed" in ckpt:
+                    seed = ckpt["data_seed"]
+                if "rng_state" in ckpt:
+                    restore_rng_state(ckpt["rng_state"])
+                if "best_value" in ckpt:
+                    best_value, no_improve = ckpt["best_value"], ckpt.get("no_improve", 0)
+                resumed = ckpt
+                log(f"Reanudando desde checkpoint {resume_path}, comenzando en epoch {start_epoch}"
+                    + (f" (batch {skip_batches})" if skip_batches else ""))
             else:
-                print(f"Resume path {resume_path} no encontrado, empezando desde cero.")
+                log(f"Resume path {resume_path} no encontrado, empezando desde cero.")
+
+        if seed is None:
+            # semilla del orden de datos; se guarda en los checkpoints para poder reproducirlo
+            seed = int(torch.randint(0, 2 ** 31 - 1, (1,)).item())
+
+        # batches contiguos pre-barajados (en memoria) o lectura por shards; workers opcionales
+        train_dl = make_train_loader(X_train, y_train, batch_size, num_workers=num_workers, prefetch_factor=prefetch_factor,
+                                     persistent_workers=persistent_workers, pin_memory=(device.type == "cuda"),
+                                     seed=seed, rank=rank, world_size=world_size)
+
+        if world_size > 1:
+            # DDP sincroniza los pesos iniciales desde el rank 0 y promedia gradientes con all-reduce
+            model = DDP(net, device_ids=[device.index] if device.type == "cuda" else None)
+        if compile_net:
+            model, _ = compile_model(model, torch.zeros(batch_size, model_config["input_dim"], device=device), log=log)
+
+        def training_state(epochs_done, batch_in_epoch, running_loss, n_seen, **extra):
+            # todo lo necesario para reanudar exactamente: pesos, optimizador, orden de datos y RNG
+            state = {
+                "epoch": epochs_done,
+                "batch_in_epoch": batch_in_epoch,
+                "global_step": global_step,
+                "data_seed": seed,
+                "rng_state": capture_rng_state(),
+                "best_value": float(best_value),
+                "no_improve": no_improve,
+                "running_loss": running_loss,
+                "n_seen": n_seen,
+                "model_state_dict": net.state_dict(),
+                "optimizer_state_dict": opt.state_dict(),
+                "model_config": model_config,
+            }
+            state.update(extra)
+            return state
+
+        def save_periodic(path, state, metric=None):
+            with prof.phase("checkpoint"):
+                ckpt_writer.save(state, path)
+                for old_path in retention.add(path, metric):
+                    ckpt_writer.remove(old_path)
+            log(f"Checkpoint guardado en: {path}")
 
-        best_value = None
-        if monitor == "accuracy":
-            best_value = -1.0
-        else:
-            best_value = float("inf")
-        no_improve = 0
         for epoch in range(start_epoch, epochs + 1):
             model.train()
             running_loss = 0.0
-            for xb, yb in train_dl:
-                xb = xb.to(device)
-                yb = yb.to(device)
+            n_seen = 0
+            batch_in_epoch = 0
+            if skip_batches and resumed is not None:
+                running_loss, n_seen = resumed.get("running_loss", 0.0), resumed.get("n_seen", 0)
+            set_loader_epoch(train_dl, epoch)
+            prof.start_epoch()
+            aug_time, aug_steps = 0.0, 0
+            batches = itertools.islice(train_dl, skip_batches, None) if skip_batches else train_dl
+            batch_in_epoch, skip_batches = skip_batches, 0
+            opt.zero_grad()
+            pending = 0  # batches acumulados desde el último step del optimizador
+            # join() tolera que los ranks tengan distinto número de batches (p. ej. shards desiguales)
+            with (model.join() if world_size > 1 else contextlib.nullcontext()):
+                for xb, yb in prof.iter_data(batches):
+                    xb = xb.to(device, non_blocking=True)
+                    yb = yb.to(device, non_blocking=True)
+                    if augmenter is not None:
+                        t_aug = time.perf_counter()
+                        with prof.phase("augment"):
+                            xb = augmenter(xb)
+                        aug_time += time.perf_counter() - t_aug
+                        aug_steps += 1
+                    # con DDP solo el último micro-batch de cada step sincroniza gradientes (all-reduce);
+                    # los anteriores acumulan localmente dentro de no_sync(), que debe incluir el forward
+                    sync = world_size == 1 or pending + 1 >= accum_steps
+                    with (contextlib.nullcontext() if sync else model.no_sync()):
+                        with prof.phase("forward"), torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=use_amp):
+                            out = model(xb)
+                            loss = loss_fn(out, yb)
+                            if teacher is not None:
+                                with torch.no_grad():
+                                    teacher_out = teacher(xb)
+                                loss = distillation_loss(out, teacher_out, loss, distill_temperature, distill_alpha)
+                        with prof.phase("backward"):
+                            (loss / accum_steps).backward()
+                    prof.step(xb.size(0))
+                    running_loss += loss.item() * xb.size(0)
+                    n_seen += xb.size(0)
+                    batch_in_epoch += 1
+                    pending += 1
+                    if pending < accum_steps:
+                        continue
+                    with prof.phase("optimizer"):
+                        set_lr(opt, current_lr(global_step))
+                        opt.step()
+                        opt.zero_grad()
+                    pending = 0
+                    global_step += 1
+
+                    # checkpoint a mitad de epoch cada `save_every_steps` steps (siempre justo tras un step del optimizador)
+                    if save_dir and save_every_steps > 0 and global_step % save_every_steps == 0:
+                        save_periodic(os.path.join(save_dir, f"checkpoint_step{global_step}.pt"),
+                                      training_state(epoch - 1, batch_in_epoch, running_loss, n_seen))
+
+            if pending:
+                # batches sobrantes al final de la epoch: un step con lo acumulado en proceso único; con DDP se descartan
+                # para que todos los ranks den el mismo número de steps
+                if world_size == 1:
+                    with prof.phase("optimizer"):
+                        set_lr(opt, current_lr(global_step))
+                        opt.step()
+                    global_step += 1
                 opt.zero_grad()
-                out = model(xb)
-                loss = loss_fn(out, yb)
-                loss.backward()
-                opt.step()
-                running_loss += loss.item() * xb.size(0)
-
-            avg_loss = running_loss / len(train_dl.dataset)
-
-            # evaluar
-            model.eval()
-            with torch.no_grad():
-                logits = model(X_val_t.to(device))
-                preds = logits.argmax(dim=1).cpu().numpy()
-                acc = (preds == y_val).mean()
 
-            print(f"Epoch {epoch}/{epochs} - loss: {avg_loss:.4f} - val_acc: {acc:.4f}")
+            if world_size > 1:
+                # loss medio global para que todos los ranks tomen la misma decisión de early stopping
+                totals = torch.tensor([running_loss, n_seen], dtype=torch.float64)
+                dist.all_reduce(totals)
+                running_loss, n_seen = totals.tolist()
+            avg_loss = running_loss / max(n_seen, 1)
 
-            # TensorBoard: escribir métricas si se proporcionó un writer
-            if tb_writer is not None:
-                try:
-                    tb_writer.add_scalar("train/loss", float(avg_loss), epoch)
-                    tb_writer.add_scalar("val/accuracy", float(acc), epoch)
-                except Exception:
-                    pass
+            # evaluar (todos los ranks tienen los mismos pesos y obtienen la misma accuracy)
+            with prof.phase("eval"):
+                preds = predict_torch(net, X_val, device)
+                acc = (preds == y_val).mean()
 
-            # Guardar checkpoint cada `save_every` epocas (si se indica save_dir)
-            if save_dir and (save_every > 0) and (epoch % save_every == 0):
-                ckpt_path = os.path.join(save_dir, f"checkpoint_epoch{epoch}.pt")
-                torch.save({
-                    "epoch": epoch,
-                    "model_state_dict": model.state_dict(),
-                    "optimizer_state_dict": opt.state_dict(),
-                }, ckpt_path)
-                print(f"Checkpoint guardado en: {ckpt_path}")
-
-            # Comprobar mejora según monitor y guardar
+            log(f"Epoch {epoch}/{epochs} - loss: {avg_loss:.4f} - val_acc: {acc:.4f}"
+                + (f" - augment: {1e6 * aug_time / aug_steps:.0f} us/step" if aug_steps else ""))
+
+            # métricas: solo se encolan; el MetricsSink las escribe en un hilo de fondo
+            if metrics is not None:
+                metrics.add_scalar("train/loss", float(avg_loss), epoch)
+                metrics.add_scalar("val/accuracy", float(acc), epoch)
+                metrics.add_scalar("train/lr", opt.param_groups[0]["lr"], epoch)
+                if aug_steps:
+                    metrics.add_scalar("train/augment_us_per_step", 1e6 * aug_time / aug_steps, epoch)
+                if log_histograms:
+                    for name, param in net.named_parameters():
+                        metrics.add_histogram("weights/" + name, param, epoch)
+
+            # Comprobar mejora según monitor
             current_value = acc if monitor == "accuracy" else avg_loss
             improved = (current_value > best_value) if monitor == "accuracy" else (current_value < best_value)
             if improved:
                 best_value = current_value
                 no_improve = 0
-                if save_dir:
-                    best_path = os.path.join(save_dir, "best_model.pt")
-                    torch.save({"epoch": epoch, "model_state_dict": model.state_dict(), monitor: float(current_value)}, best_path)
-                    print(f"Mejor modelo guardado en: {best_path} ({monitor}={float(current_value):.4f})")
             else:
                 no_improve += 1
 
+            # Guardar checkpoint cada `save_every` epocas (si se indica save_dir)
+            ckpt_path = None
+            if save_dir and (save_every > 0) and (epoch % save_every == 0):
+                ckpt_path = os.path.join(save_dir, f"checkpoint_epoch{epoch}.pt")
+                save_periodic(ckpt_path, training_state(epoch, 0, 0.0, 0, **{monitor: float(current_value)}), float(current_value))
+
+            # Guardar el mejor modelo; si coincide con el checkpoint de esta epoch se enlaza en lugar de reescribirlo
+            if improved and save_dir:
+                best_path = os.path.join(save_dir, "best_model.pt")
+                with prof.phase("checkpoint"):
+                    if ckpt_path is not None:
+                        ckpt_writer.link(ckpt_path, best_path)
+                    else:
+                        ckpt_writer.save({"epoch": epoch, "model_state_dict": net.state_dict(), "model_config": model_config, monitor: float(current_value)}, best_path)
+                log(f"Mejor modelo guardado en: {best_path} ({monitor}={float(current_value):.4f})")
+
+            prof.end_epoch(epoch, {"loss": float(avg_loss), "val_accuracy": float(acc)})
+
             # Early stopping
             if no_improve >= patience:
-                print(f"No hay mejora en {patience} epochs; terminando por early stopping.")
+                log(f"No hay mejora en {patience} epochs; terminando por early stopping.")
                 break
 
+            if epoch_callback is not None and epoch_callback(epoch, {"loss": float(avg_loss), "val_accuracy": float(acc)}):
+                log("Entrenamiento detenido por epoch_callback.")
+                break
+
+            if target_accuracy is not None and acc >= target_accuracy:
+                log(f"Accuracy objetivo {target_accuracy:.4f} alcanzada en la epoch {epoch} ({global_step} steps, "
+                    f"{time.perf_counter() - t_start:.2f}s)")
+                break
+
+        prof.close()
+        if own_metrics:
+            metrics.close()
+
         # Guardar modelo final
         if save_dir:
             final_path = os.path.join(save_dir, "model_final.pt")
-            torch.save(model.state_dict(), final_path)
-            print(f"Modelo final guardado en: {final_path}")
+            ckpt_writer.save(net.state_dict(), final_path)
+            ckpt_writer.close()
+            log(f"Modelo final guardado en: {final_path}")
+
+            if export_torchscript:
+                # exportar los pesos del mejor modelo (o los finales si no se guardó ninguno)
+                best_path = os.path.join(save_dir, "best_model.pt")
+                export_net = Net(**model_config)
+                if os.path.exists(best_path):
+                    export_net.load_state_dict(torch.load(best_path, map_location="cpu")["model_state_dict"])
+                else:
+                    export_net.load_state_dict(net.state_dict())
+                ts_path = export_torchscript_model(export_net, os.path.join(save_dir, "model_scripted.ts"),
+                                                   torch.zeros(1, model_config["input_dim"]), model_config=model_config)
+                log(f"Modelo TorchScript guardado en: {ts_path}")
+
+
+    def _free_port():
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+
+    def _pin_rank_cpus(rank, world_size):
+        """Asigna a cada rank un bloque contiguo de CPUs (Linux) para no compartir cores entre procesos."""
+        cpus = available_cpus()
+        if len(cpus) < world_size:
+            return None
+        return pin_cpus(len(cpus) // world_size, slot=rank, cpus=cpus)
+
+
+    def _ddp_worker(rank, world_size, port, data, kwargs, metrics_opts, threads):
+        os.environ["MASTER_ADDR"] = "127.0.0.1"
+        os.environ["MASTER_PORT"] = str(port)
+        dist.init_process_group("gloo", rank=rank, world_size=world_size)
+        _pin_rank_cpus(rank, world_size)
+        torch.set_num_threads(threads)
+        torch.manual_seed(kwargs["seed"])
+        metrics = open_sink(**metrics_opts) if rank == 0 else None
+        try:
+            train_torch(*data, metrics=metrics, **kwargs)
+        finally:
+            if metrics is not None:
+                metrics.close()
+            dist.destroy_process_group()
+
+
+    def train_distributed(X_train, X_val, X_test, y_train, y_val, y_test, nprocs=2, threads_per_proc=None, tb_dir=None, seed=None,
+                          metrics_paths=(), metrics_queue=1024, **kwargs):
+        """Entrenamiento data-parallel en CPU: lanza `nprocs` procesos (backend gloo) que ejecutan
+        `train_torch` con DistributedDataParallel. `batch_size` es por proceso (batch global = nprocs * batch_size).
+        Los datos en memoria se copian a cada proceso; los `ShardSubset` solo pasan rutas e índices.
+        Las métricas (TensorBoard en `tb_dir` y ficheros `metrics_paths`) las escribe el rank 0.
+        """
+        if threads_per_proc is None:
+            threads_per_proc = max(1, (os.cpu_count() or 1) // nprocs)
+        if seed is None:
+            # todos los ranks deben barajar con la misma semilla para repartirse la misma permutación
+            seed = random.randrange(2 ** 31 - 1)
+        kwargs = dict(kwargs, seed=seed, device=torch.device("cpu"))
+        print(f"Entrenamiento distribuido: {nprocs} procesos x {threads_per_proc} hilos (gloo)")
+        data = (X_train, X_val, X_test, y_train, y_val, y_test)
+        metrics_opts = {"tb_dir": tb_dir, "paths": list(metrics_paths or ()), "max_pending": metrics_queue}
+        mp.spawn(_ddp_worker, args=(nprocs, _free_port(), data, kwargs, metrics_opts, threads_per_proc), nprocs=nprocs, join=True)
 
 
 from sklearn.neural_network import MLPClassifier
 
 
-def train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=None, patience=3, monitor="accuracy", tb_writer=None):
+def _score_sklearn_stream(clf, scaler, source, batch_size=4096):
+    """Accuracy de `clf` sobre una fuente por bloques (ShardSubset, ArrayBatches, BatchStream)."""
+    correct = 0
+    total = 0
+    for Xb, yb in source.iter_batches(batch_size):
+        correct += int((clf.predict(scaler.transform(Xb)) == yb).sum())
+        total += len(yb)
+    return correct / max(total, 1)
+
+
+def train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=None, patience=3, monitor="accuracy", tb_writer=None, batch_size=200, hidden=128, depth=1, lr=1e-3, epoch_callback=None, streaming=False, classes=None, metrics=None, epochs=50, seed=None):
+    # streaming: scaler y MLP con partial_fit sobre mini-batches de `batch_size`, con memoria constante.
+    #   Se activa solo si las X son fuentes por bloques (ShardSubset, ArrayBatches, BatchStream);
+    #   con streaming=True los arrays en memoria se envuelven en ArrayBatches.
+    # classes: etiquetas posibles (obligatorio con BatchStream, que no conoce `y` de antemano)
+    # epoch_callback(epoch, metrics): igual que en train_torch; si devuelve True se detiene el entrenamiento
+    # metrics: MetricsSink para las métricas por epoch (un `tb_writer` se envuelve en uno), como en train_torch
+    # epochs: máximo de epochs (sin contar el early stopping); seed: random_state del MLP (42 si no se indica)
+    #   y semilla del barajado por epoch en streaming
+    streaming = streaming or hasattr(X_train, "iter_batches")
+    own_metrics = metrics is None and tb_writer is not None
+    if own_metrics:
+        metrics = MetricsSink([TensorBoardBackend(writer=tb_writer)])
     scaler = StandardScaler()
+    random_state = 42 if seed is None else seed
+
+    if streaming:
+        if isinstance(X_train, np.ndarray):
+            X_train = ArrayBatches(X_train, y_train)
+            X_val = ArrayBatches(X_val, y_val) if X_val is not None else None
+            X_test = ArrayBatches(X_test, y_test)
+        # media/varianza acumuladas bloque a bloque
+        for Xb, _ in X_train.iter_shards():
+            scaler.partial_fit(Xb)
+        X_train_s = X_val_s = X_test_s = None
+        if classes is None:
+            classes = getattr(X_train, "classes", None)
+        if classes is None:
+            classes = np.unique(y_train)
+        clf = MLPClassifier(hidden_layer_sizes=(hidden,) * depth, learning_rate_init=lr, batch_size=batch_size, random_state=random_state)
+    else:
+        X_train_s = scaler.fit_transform(X_train)
+        X_val_s = scaler.transform(X_val) if X_val is not None else None
+        X_test_s = scaler.transform(X_test)
 
-    X_train_s = scaler.fit_transform(X_train)
-    X_val_s = scaler.transform(X_val) if X_val is not None else None
-    X_test_s = scaler.transform(X_test)
-
-    # Usaremos warm_start para simular epochs
-    clf = MLPClassifier(hidden_layer_sizes=(128,), max_iter=1, warm_start=True, random_state=42)
+        # Usaremos warm_start para simular epochs
+        clf = MLPClassifier(hidden_layer_sizes=(hidden,) * depth, learning_rate_init=lr, batch_size=batch_size, max_iter=1, warm_start=True,
+                            random_state=random_state)
 
     best_value = -1.0 if monitor == "accuracy" else float("inf")
     no_improve = 0
 
-    for epoch in range(1, 51):  # límite razonable de epochs para sklearn
-        clf.fit(X_train_s, y_train)
+    for epoch in range(1, epochs + 1):
+        if streaming:
+            for Xb, yb in X_train.iter_batches(batch_size, shuffle=True, seed=epoch if seed is None else seed * 1000003 + epoch):
+                clf.partial_fit(scaler.transform(Xb), yb, classes=classes)
+        else:
+            clf.fit(X_train_s, y_train)
 
         # evaluar en validación
-        if X_val_s is not None:
+        if streaming:
+            acc = _score_sklearn_stream(clf, scaler, X_val if X_val is not None else X_test)
+            val_metric = acc if monitor == "accuracy" else 1.0 - acc
+        elif X_val_s is not None:
             if monitor == "accuracy":
                 val_metric = clf.score(X_val_s, y_val)
             else:
@@ -214,12 +579,8 @@ def train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=None,
 
         print(f"sklearn Epoch {epoch} - val_{monitor}: {val_metric:.4f}")
 
-        # TensorBoard
-        if tb_writer is not None:
-            try:
-                tb_writer.add_scalar("val/" + monitor, float(val_metric), epoch)
-            except Exception:
-                pass
+        if metrics is not None:
+            metrics.add_scalar("val/" + monitor, float(val_metric), epoch)
 
         # comprobar mejora
         improved = (val_metric > best_value) if monitor == "accuracy" else (val_metric < best_value)
@@ -246,6 +607,14 @@ def train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=None,
             print(f"No hay mejora en {patience} epochs; terminando por early stopping (sklearn).")
             break
 
+        val_acc = val_metric if monitor == "accuracy" else 1.0 - val_metric
+        if epoch_callback is not None and epoch_callback(epoch, {"val_accuracy": float(val_acc)}):
+            print("Entrenamiento sklearn detenido por epoch_callback.")
+            break
+
+    if own_metrics:
+        metrics.close()
+
     # guardar modelo final si no se guardó
     if save_dir:
         final_path = os.path.join(save_dir, "sklearn_final.joblib")
@@ -265,22 +634,88 @@ def parse_args():
     p.add_argument("--epochs", type=int, default=10)
     p.add_argument("--batch-size", type=int, default=64)
     p.add_argument("--lr", type=float, default=1e-3)
+    p.add_argument("--hidden", type=int, default=128, help="Neuronas de la capa oculta")
+    p.add_argument("--depth", type=int, default=1, help="Número de capas ocultas")
+    p.add_argument("--accum-steps", type=int, default=1, help="Batches acumulados por step del optimizador (solo PyTorch)")
+    p.add_argument("--warmup-steps", type=int, default=0, help="Steps del optimizador con warmup lineal del LR (solo PyTorch)")
+    p.add_argument("--lr-scaling", choices=SCALING_RULES, default="none",
+                   help="Escalar --lr al batch efectivo (batch-size * accum-steps * procesos) respecto a --base-batch-size")
+    p.add_argument("--base-batch-size", type=int, default=64, help="Batch para el que está pensado --lr (con --lr-scaling)")
+    p.add_argument("--lr-schedule", choices=SCHEDULES, default="constant", help="Schedule del LR (cosine y onecycle usan --epochs como duración)")
+    p.add_argument("--augment-shift", type=float, default=0.0, help="Augmentation: desplazamiento máximo en píxeles (solo PyTorch)")
+    p.add_argument("--augment-rotate", type=float, default=0.0, help="Augmentation: rotación máxima en grados")
+    p.add_argument("--augment-noise", type=float, default=0.0, help="Augmentation: desviación típica del ruido gaussiano")
+    p.add_argument("--target-accuracy", type=float, default=None, help="Detener al alcanzar esta accuracy de validación (solo PyTorch)")
     p.add_argument("--save-dir", type=str, default=None, help="Directorio donde guardar checkpoints/modelos")
     p.add_argument("--save-every", type=int, default=1, help="Guardar checkpoint cada N epocas (PyTorch)")
+    p.add_argument("--save-every-steps", type=int, default=0, help="Guardar además un checkpoint cada N steps, reanudable a mitad de epoch (PyTorch; 0 = desactivado)")
+    p.add_argument("--keep-last", type=int, default=0, help="Conservar solo los K checkpoints periódicos más recientes (0 = todos)")
+    p.add_argument("--keep-best", type=int, default=0, help="Conservar además los N checkpoints periódicos con mejor métrica")
+    p.add_argument("--checkpoint-queue", type=int, default=2, help="Checkpoints pendientes de escribir en segundo plano (0 = guardado síncrono)")
     p.add_argument("--backend", choices=["auto", "torch", "sklearn"], default="auto", help="Forzar backend")
     p.add_argument("--device", choices=["auto", "cpu", "cuda"], default="auto", help="Seleccionar dispositivo (solo PyTorch)")
     p.add_argument("--seed", type=int, default=None, help="Semilla para reproducibilidad (numpy, random, torch)")
     p.add_argument("--resume", type=str, default=None, help="Ruta al checkpoint para reanudar (PyTorch)")
-    p.add_argument("--tb", action="store_true", help="Activar logging a TensorBoard (solo PyTorch)")
+    p.add_argument("--tb", action="store_true", help="Activar logging a TensorBoard (en --save-dir o runs/)")
+    p.add_argument("--metrics", action="append", default=[], metavar="PATH",
+                   help="Fichero de métricas .jsonl o .csv (se puede repetir); se escribe en segundo plano")
+    p.add_argument("--metrics-queue", type=int, default=1024, help="Registros de métricas en cola como máximo (los que no caben se descartan)")
+    p.add_argument("--metrics-histograms", action="store_true", help="Registrar histogramas de los pesos en cada epoch (PyTorch)")
     p.add_argument("--val-size", type=float, default=0.1, help="Fracción del dataset para validación (por defecto 0.1)")
     p.add_argument("--patience", type=int, default=3, help="Paciencia para early stopping (número de epochs sin mejora)")
     p.add_argument("--monitor", choices=["accuracy", "loss"], default="accuracy", help="Métrica a monitorizar para early stopping y guardado de mejor modelo")
+    p.add_argument("--num-workers", type=int, default=0, help="Procesos worker para preparar batches (PyTorch; 0 = en el proceso principal)")
+    p.add_argument("--prefetch-factor", type=int, default=2, help="Batches precargados por worker (requiere --num-workers > 0)")
+    p.add_argument("--persistent-workers", action="store_true", help="Mantener los workers vivos entre epochs")
+    p.add_argument("--distributed", action="store_true", help="Entrenamiento data-parallel en CPU con varios procesos (PyTorch, gloo)")
+    p.add_argument("--nprocs", type=int, default=2, help="Número de procesos con --distributed")
+    p.add_argument("--threads-per-proc", type=int, default=None, help="Hilos de torch por proceso con --distributed (por defecto CPUs/nprocs)")
+    p.add_argument("--threads", type=int, default=None, help="Hilos de CPU (torch y BLAS); por defecto los del perfil de `train.py autotune`")
+    p.add_argument("--no-thread-profile", action="store_true", help="No cargar el perfil de hilos de `train.py autotune`")
+    p.add_argument("--sklearn-streaming", action="store_true", help="sklearn: scaler y MLP con partial_fit por mini-batches (memoria constante)")
+    p.add_argument("--profile", type=str, default=None, help="Fichero JSONL con tiempos por fase, samples/sec y pico de RSS por epoch (PyTorch)")
+    p.add_argument("--profile-trace-steps", type=int, default=0, help="Grabar una traza de torch.profiler de N steps (0 = desactivado)")
+    p.add_argument("--profile-trace-start", type=int, default=5, help="Steps a esperar antes de empezar la traza")
+    p.add_argument("--compile", action="store_true", help="Entrenar con torch.compile (TorchScript si no está disponible)")
+    p.add_argument("--export-torchscript", action="store_true", help="Exportar el mejor modelo a <save-dir>/model_scripted.ts (requiere --save-dir)")
+    p.add_argument("--export-artifact", action="store_true",
+                   help="Al terminar, exportar el mejor modelo a <save-dir>/model.mlm (un solo fichero para predict.py, ver model_artifact.py)")
+    p.add_argument("--amp", choices=["none", "bf16"], default="none", help="Precisión mixta en CPU/GPU: autocast bfloat16 con pesos en fp32 (solo PyTorch)")
+    p.add_argument("--data", type=str, default=None, help="Directorio o patrón glob de shards .npy/.npz (memory-mapped) en lugar de digits")
+    p.add_argument("--data-scale", type=float, default=None, help="Factor aplicado a las features de --data al leerlas (p. ej. 0.0625)")
+    p.add_argument("--no-cache", action="store_true", help="No usar la caché en disco de los splits de digits")
+    p.add_argument("--cache-dir", type=str, default=None, help="Directorio de la caché de splits (por defecto ~/.cache/my-ml/splits)")
     return p.parse_args()
 
 
 def main():
+    # subcomandos: `python train.py sweep ...`, `python train.py distill ...`, `python train.py lr-find ...`,
+    # `python train.py kfold ...`, `python train.py autotune ...`
+    if len(sys.argv) > 1 and sys.argv[1] == "sweep":
+        import sweep
+        return sweep.main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "distill":
+        import distill
+        return distill.main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "lr-find":
+        import lr_finder
+        return lr_finder.main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "kfold":
+        import kfold
+        return kfold.main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "autotune":
+        import thread_tune
+        return thread_tune.main(sys.argv[2:])
+
     args = parse_args()
-    X_train, X_val, X_test, y_train, y_val, y_test = load_data(test_size=0.2, val_size=args.val_size)
+    if not args.distributed:
+        # con --distributed cada proceso usa --threads-per-proc
+        apply_threads("train", threads=args.threads, use_profile=not args.no_thread_profile)
+    # digits/16 está en [0, 1]; con --data el ruido se recorta al rango de cada batch
+    augment = {"max_shift": args.augment_shift, "max_rotation": args.augment_rotate, "noise_std": args.augment_noise,
+               "value_range": None if args.data else (0.0, 1.0)}
+    X_train, X_val, X_test, y_train, y_val, y_test = load_data(test_size=0.2, val_size=args.val_size, data_path=args.data, data_scale=args.data_scale,
+                                                               use_cache=not args.no_cache, cache_dir=args.cache_dir)
 
     # decidir backend
     backend = args.backend
@@ -308,34 +743,43 @@ def main():
         elif args.device == "cuda":
             device = (torch.device("cuda") if USE_TORCH and torch.cuda.is_available() else (torch.device("cpu") if USE_TORCH else None))
 
-    if use_torch:
-        # Si se solicita TensorBoard y está disponible, crear SummaryWriter
-        tb_writer = None
-        if args.tb:
-            try:
-                from torch.utils.tensorboard import SummaryWriter
-                tb_writer = SummaryWriter(log_dir=(args.save_dir if args.save_dir else "runs"))
-                print(f"TensorBoard activo en: {args.save_dir if args.save_dir else 'runs'}")
-            except Exception:
-                print("TensorBoard no disponible (instala 'tensorboard' si quieres usar --tb)")
-
-        train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=args.epochs, batch_size=args.batch_size, lr=args.lr, save_dir=args.save_dir, save_every=args.save_every, device=device, resume_path=args.resume, tb_writer=tb_writer, patience=args.patience, monitor=args.monitor)
-        if tb_writer is not None:
-            tb_writer.close()
+    tb_dir = (args.save_dir if args.save_dir else "runs") if args.tb else None
+    if use_torch and args.distributed:
+        # el rank 0 abre su propio MetricsSink
+        train_distributed(X_train, X_val, X_test, y_train, y_val, y_test, nprocs=args.nprocs, threads_per_proc=args.threads_per_proc, tb_dir=tb_dir, seed=args.seed,
+                          metrics_paths=args.metrics, metrics_queue=args.metrics_queue, log_histograms=args.metrics_histograms,
+                          epochs=args.epochs, batch_size=args.batch_size, lr=args.lr, save_dir=args.save_dir, save_every=args.save_every, resume_path=args.resume, patience=args.patience, monitor=args.monitor, checkpoint_queue=args.checkpoint_queue,
+                          hidden=args.hidden, depth=args.depth, save_every_steps=args.save_every_steps, keep_last=args.keep_last, keep_best=args.keep_best,
+                          profile_path=args.profile, profile_trace_steps=args.profile_trace_steps, profile_trace_start=args.profile_trace_start,
+                          num_workers=args.num_workers, prefetch_factor=args.prefetch_factor, persistent_workers=args.persistent_workers, amp=args.amp,
+                          compile_net=args.compile, export_torchscript=args.export_torchscript, accum_steps=args.accum_steps, warmup_steps=args.warmup_steps,
+                          lr_scaling=args.lr_scaling, base_batch_size=args.base_batch_size,
+                          lr_schedule=args.lr_schedule, target_accuracy=args.target_accuracy, augment=augment)
+    elif use_torch:
+        # métricas a TensorBoard y/o ficheros, escritas en un hilo de fondo
+        metrics = open_sink(tb_dir, args.metrics, max_pending=args.metrics_queue)
+        train_torch(X_train, X_val, X_test, y_train, y_val, y_test, epochs=args.epochs, batch_size=args.batch_size, lr=args.lr, save_dir=args.save_dir, save_every=args.save_every, device=device, resume_path=args.resume, patience=args.patience, monitor=args.monitor, num_workers=args.num_workers, prefetch_factor=args.prefetch_factor, persistent_workers=args.persistent_workers, checkpoint_queue=args.checkpoint_queue, hidden=args.hidden, depth=args.depth, save_every_steps=args.save_every_steps, keep_last=args.keep_last, keep_best=args.keep_best, seed=args.seed, profile_path=args.profile, profile_trace_steps=args.profile_trace_steps, profile_trace_start=args.profile_trace_start, amp=args.amp, compile_net=args.compile, export_torchscript=args.export_torchscript, accum_steps=args.accum_steps, warmup_steps=args.warmup_steps, lr_scaling=args.lr_scaling, base_batch_size=args.base_batch_size, lr_schedule=args.lr_schedule, target_accuracy=args.target_accuracy, augment=augment, metrics=metrics, log_histograms=args.metrics_histograms)
+        if metrics is not None:
+            metrics.close()
     else:
-        # Para sklearn también pasamos validation set y TensorBoard writer opcional
-        tb_writer = None
-        if args.tb:
-            try:
-                from torch.utils.tensorboard import SummaryWriter
-                tb_writer = SummaryWriter(log_dir=(args.save_dir if args.save_dir else "runs"))
-                print(f"TensorBoard activo en: {args.save_dir if args.save_dir else 'runs'}")
-            except Exception:
-                print("TensorBoard no disponible (instala 'tensorboard' si quieres usar --tb)")
-
-        train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=args.save_dir, patience=args.patience, monitor=args.monitor, tb_writer=tb_writer)
-        if tb_writer is not None:
-            tb_writer.close()
+        # Para sklearn también pasamos validation set y las métricas opcionales
+        metrics = open_sink(tb_dir, args.metrics, max_pending=args.metrics_queue)
+        train_sklearn(X_train, X_val, X_test, y_train, y_val, y_test, save_dir=args.save_dir, patience=args.patience, monitor=args.monitor, metrics=metrics, batch_size=args.batch_size, hidden=args.hidden, depth=args.depth, lr=args.lr, streaming=args.sklearn_streaming)
+        if metrics is not None:
+            metrics.close()
+
+    if args.export_artifact and args.save_dir:
+        # el mejor modelo guardado (o el final) en un único fichero con cabecera y pesos memory-mappables
+        from numpy_engine import export_artifact
+        candidates = ["best_model.pt", "model_final.pt"] if use_torch else ["sklearn_mlp.joblib", "sklearn_mlp.pkl"]
+        source = next((os.path.join(args.save_dir, c) for c in candidates if os.path.exists(os.path.join(args.save_dir, c))), None)
+        if source is None:
+            print("No hay modelo guardado que exportar a .mlm")
+        else:
+            artifact_path = os.path.join(args.save_dir, "model.mlm")
+            # escala que se aplicó a las features en entrenamiento: --data-scale con --data, 1/16 con digits
+            export_artifact(source, artifact_path, input_scale=args.data_scale if args.data else DIGITS_SCALE)
+            print(f"Modelo en un solo fichero guardado en: {artifact_path} (desde {os.path.basename(source)})")
 
 
 if __name__ == "__main__":